@@ -4,5 +4,136 @@ from dotenv import load_dotenv
 load_dotenv()
 
 RPC_URL = os.getenv("RPC_URL")
+# Beberapa endpoint dipisah koma untuk failover, opsional dengan limit per endpoint: "url|rps"
+RPC_URLS = os.getenv("RPC_URLS", RPC_URL or "")
 # PRIVATE_KEY = os.getenv("PRIVATE_KEY_SEPOLIA")
-CONTRACT_ADDRESS = os.getenv("CONTRACT_ADDRESS")
\ No newline at end of file
+CONTRACT_ADDRESS = os.getenv("CONTRACT_ADDRESS")
+
+# Backend chain: rpc (RPC_URLS), eth-tester (EVM in-process) atau anvil (node lokal)
+CHAIN_BACKEND = os.getenv("CHAIN_BACKEND", "rpc").lower()
+# Artifact hasil `forge build`, dipakai untuk deploy Pemilu di backend lokal
+CONTRACT_ARTIFACT = os.getenv(
+    "CONTRACT_ARTIFACT",
+    os.path.join(os.path.dirname(__file__), "..", "..", "contract", "out", "Pemilu.sol", "Pemilu.json"),
+)
+ANVIL_PATH = os.getenv("ANVIL_PATH", "anvil")
+ANVIL_PORT = int(os.getenv("ANVIL_PORT", "0"))  # 0 = port bebas
+
+# Logging (antrian non-blocking, format json atau text)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+# Event indexer
+INDEXER_ENABLED = os.getenv("INDEXER_ENABLED", "true").lower() == "true"
+INDEXER_START_BLOCK = int(os.getenv("INDEXER_START_BLOCK", "0"))  # block kontrak di-deploy
+INDEXER_CONFIRMATIONS = int(os.getenv("INDEXER_CONFIRMATIONS", "6"))
+INDEXER_POLL_INTERVAL = float(os.getenv("INDEXER_POLL_INTERVAL", "4"))
+INDEXER_MAX_BLOCK_RANGE = int(os.getenv("INDEXER_MAX_BLOCK_RANGE", "2000"))  # batas atas window adaptif per chunk
+INDEXER_DB_PATH = os.getenv("INDEXER_DB_PATH", "indexer.db")  # SQLite (WAL) berisi kandidat, pemilih & suara
+INDEXER_SNAPSHOT_PATH = os.getenv("INDEXER_SNAPSHOT_PATH", "")  # kosong = tanpa snapshot
+INDEXER_SNAPSHOT_INTERVAL = float(os.getenv("INDEXER_SNAPSHOT_INTERVAL", "300"))
+
+# Backfill event: eth_getLogs dipecah per rentang block yang membesar saat sukses
+# dan dibelah dua saat provider menolak (batas hasil / rentang)
+LOG_FETCH_INITIAL_RANGE = int(os.getenv("LOG_FETCH_INITIAL_RANGE", "2000"))
+LOG_FETCH_MAX_RANGE = int(os.getenv("LOG_FETCH_MAX_RANGE", "100000"))
+LOG_FETCH_CONCURRENCY = int(os.getenv("LOG_FETCH_CONCURRENCY", "4"))
+
+# Hasil & analitik (/results) dari suara yang sudah di-index
+RESULTS_BUCKET_SECONDS = int(os.getenv("RESULTS_BUCKET_SECONDS", "3600"))
+RESULTS_MAX_BUCKETS = int(os.getenv("RESULTS_MAX_BUCKETS", "1000"))
+
+# Multicall3 batching (fallback ke JSON-RPC batch jika tidak ter-deploy)
+MULTICALL_ENABLED = os.getenv("MULTICALL_ENABLED", "true").lower() == "true"
+MULTICALL_ADDRESS = os.getenv("MULTICALL_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11")
+
+# Read cache untuk view call (diinvalidasi setiap blok baru)
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))
+CACHE_BLOCK_POLL_INTERVAL = float(os.getenv("CACHE_BLOCK_POLL_INTERVAL", "2"))
+
+# Respons read route: ETag dari nomor blok / checkpoint indexer (304 bila tidak berubah),
+# JSON lewat orjson dan gzip untuk body di atas ukuran minimum
+HTTP_ETAG_ENABLED = os.getenv("HTTP_ETAG_ENABLED", "true").lower() == "true"
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))  # byte, 0 = gzip nonaktif
+GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", "5"))
+
+# Single-flight: read identik yang berjalan bersamaan berbagi satu panggilan RPC
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+# Fee oracle (base fee & priority fee di-refresh sekali per blok)
+FEE_ORACLE_ENABLED = os.getenv("FEE_ORACLE_ENABLED", "true").lower() == "true"
+FEE_ORACLE_POLL_INTERVAL = float(os.getenv("FEE_ORACLE_POLL_INTERVAL", "2"))
+FEE_HISTORY_BLOCKS = int(os.getenv("FEE_HISTORY_BLOCKS", "10"))
+FEE_REWARD_PERCENTILE = float(os.getenv("FEE_REWARD_PERCENTILE", "50"))
+FEE_BASE_FEE_MULTIPLIER = int(os.getenv("FEE_BASE_FEE_MULTIPLIER", "2"))
+
+# Cache estimasi gas untuk vote/registerAsVoter/removeVoter/addCandidate, margin
+# adaptif dari varians gasUsed receipt yang diamati indexer
+GAS_CACHE_ENABLED = os.getenv("GAS_CACHE_ENABLED", "true").lower() == "true"
+GAS_CACHE_TTL = float(os.getenv("GAS_CACHE_TTL", "600"))
+GAS_MIN_MARGIN = int(os.getenv("GAS_MIN_MARGIN", "10000"))
+GAS_MARGIN_SIGMAS = float(os.getenv("GAS_MARGIN_SIGMAS", "4"))
+GAS_MIN_SAMPLES = int(os.getenv("GAS_MIN_SAMPLES", "5"))
+GAS_SAMPLE_WINDOW = int(os.getenv("GAS_SAMPLE_WINDOW", "50"))
+GAS_CALIBRATION_SAMPLES = int(os.getenv("GAS_CALIBRATION_SAMPLES", "8"))  # receipt per chunk indexer
+
+# Ballot bertanda tangan (EIP-712): diverifikasi di process pool, dikirim relayer lewat voteBatch
+RELAYER_PRIVATE_KEY = os.getenv("RELAYER_PRIVATE_KEY", "")  # kosong = endpoint /ballots nonaktif
+RELAYER_BATCH_SIZE = int(os.getenv("RELAYER_BATCH_SIZE", "100"))  # ballot per transaksi voteBatch
+RELAYER_FLUSH_INTERVAL = float(os.getenv("RELAYER_FLUSH_INTERVAL", "5"))  # detik, batch yang belum penuh
+RELAYER_MAX_QUEUE = int(os.getenv("RELAYER_MAX_QUEUE", "10000"))
+RELAYER_MAX_ATTEMPTS = int(os.getenv("RELAYER_MAX_ATTEMPTS", "5"))
+RELAYER_RECEIPT_TIMEOUT = float(os.getenv("RELAYER_RECEIPT_TIMEOUT", "180"))
+RELAYER_MAX_STATUSES = int(os.getenv("RELAYER_MAX_STATUSES", "100000"))  # status ballot yang disimpan di memori
+BALLOT_DEADLINE_SECONDS = int(os.getenv("BALLOT_DEADLINE_SECONDS", "3600"))  # default deadline typed data
+BALLOT_VERIFY_WORKERS = int(os.getenv("BALLOT_VERIFY_WORKERS", str(min(4, os.cpu_count() or 1))))  # 0 = thread
+BALLOT_VERIFY_BATCH_SIZE = int(os.getenv("BALLOT_VERIFY_BATCH_SIZE", "64"))
+
+# Pelacakan transaksi yang dilaporkan klien (/tx): receipt di-resolve per blok dalam satu JSON-RPC batch
+TX_TRACKER_ENABLED = os.getenv("TX_TRACKER_ENABLED", "true").lower() == "true"
+TX_TRACKER_DB_PATH = os.getenv("TX_TRACKER_DB_PATH", "tx_tracker.db")  # SQLite (WAL), dibagi antar worker
+TX_TRACKER_POLL_INTERVAL = float(os.getenv("TX_TRACKER_POLL_INTERVAL", "2"))  # detik antar cek blok baru
+TX_TRACKER_BATCH_SIZE = int(os.getenv("TX_TRACKER_BATCH_SIZE", "100"))  # hash per JSON-RPC batch
+TX_TRACKER_MAX_PENDING = int(os.getenv("TX_TRACKER_MAX_PENDING", "100000"))
+TX_TRACKER_DROP_AFTER = float(os.getenv("TX_TRACKER_DROP_AFTER", "900"))  # detik tanpa receipt = dropped
+TX_TRACKER_RETENTION = float(os.getenv("TX_TRACKER_RETENTION", "86400"))  # detik status final disimpan
+
+# Nonce manager (seed lokal dipercaya selama NONCE_TTL detik)
+NONCE_TTL = float(os.getenv("NONCE_TTL", "30"))
+
+# Bulk import (jumlah baris per transaksi batch)
+BULK_VOTER_CHUNK_SIZE = int(os.getenv("BULK_VOTER_CHUNK_SIZE", "100"))
+BULK_CANDIDATE_CHUNK_SIZE = int(os.getenv("BULK_CANDIDATE_CHUNK_SIZE", "25"))
+
+# Allowlist pemilih (pohon Merkle dari daftar pemilih, layer disimpan di file mmap)
+VOTER_ALLOWLIST_PATH = os.getenv("VOTER_ALLOWLIST_PATH", "voter_allowlist.bin")
+VOTER_ALLOWLIST_WORKERS = int(os.getenv("VOTER_ALLOWLIST_WORKERS", str(os.cpu_count() or 1)))
+VOTER_ALLOWLIST_CHUNK_SIZE = int(os.getenv("VOTER_ALLOWLIST_CHUNK_SIZE", "50000"))  # baris/node per task hashing
+
+# Paginasi daftar pemilih
+VOTERS_PAGE_SIZE = int(os.getenv("VOTERS_PAGE_SIZE", "500"))
+VOTERS_MAX_LIMIT = int(os.getenv("VOTERS_MAX_LIMIT", "1000"))
+
+# Live tally stream (/candidates/stream)
+TALLY_STREAM_BUFFER_SIZE = int(os.getenv("TALLY_STREAM_BUFFER_SIZE", "256"))
+TALLY_STREAM_KEEPALIVE = float(os.getenv("TALLY_STREAM_KEEPALIVE", "15"))
+
+# Deployment multi-worker: SQLite bersama (taruh di /dev/shm), satu worker jadi leader
+# yang men-tail chain dan polling, worker lain membaca hasilnya
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "")  # kosong = setiap worker berdiri sendiri
+SHARED_LEASE_TTL = float(os.getenv("SHARED_LEASE_TTL", "10"))
+SHARED_POLL_INTERVAL = float(os.getenv("SHARED_POLL_INTERVAL", "0.5"))
+SHARED_CHANGES_SIZE = int(os.getenv("SHARED_CHANGES_SIZE", "1024"))  # chunk perubahan indexer yang disimpan
+
+# Pool koneksi RPC (keep-alive, failover & rate limit per endpoint)
+RPC_TIMEOUT = float(os.getenv("RPC_TIMEOUT", "10"))
+RPC_POOL_SIZE = int(os.getenv("RPC_POOL_SIZE", "20"))
+RPC_KEEPALIVE_TIMEOUT = float(os.getenv("RPC_KEEPALIVE_TIMEOUT", "30"))
+RPC_RATE_LIMIT = float(os.getenv("RPC_RATE_LIMIT", "25"))  # request per detik, 0 = tanpa batas
+RPC_RATE_BURST = int(os.getenv("RPC_RATE_BURST", "50"))
+RPC_FAILURE_COOLDOWN = float(os.getenv("RPC_FAILURE_COOLDOWN", "2"))
+RPC_MAX_COOLDOWN = float(os.getenv("RPC_MAX_COOLDOWN", "60"))
+RPC_HEALTH_CHECK_INTERVAL = float(os.getenv("RPC_HEALTH_CHECK_INTERVAL", "10"))
+RPC_MAX_BLOCK_LAG = int(os.getenv("RPC_MAX_BLOCK_LAG", "5"))
@@ -0,0 +1,175 @@
+import json
+import os
+from functools import lru_cache
+from eth_abi.decoding import ContextFramesBytesIO
+from eth_abi.registry import registry
+from eth_utils import event_abi_to_log_topic, function_abi_to_4byte_selector, keccak
+from eth_utils.abi import collapse_if_tuple
+from hexbytes import HexBytes
+from web3._utils.abi import map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ABI_PATH = os.path.join(BASE_DIR, 'abis', 'Pemilu.json')
+
+with open(ABI_PATH, 'r') as f:
+    abi = json.load(f)
+
+
+def _to_bytes(value):
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+
+
+@lru_cache(maxsize=65536)
+def to_checksum_address(address):
+    """EIP-55 checksum of a 0x-prefixed hex address, without eth_utils' input validation"""
+    address = address.lower().removeprefix("0x")
+    digest = keccak(text=address).hex()
+    return "0x" + "".join(char.upper() if nibble in "89abcdef" else char for char, nibble in zip(address, digest))
+
+
+def _normalizer(abi_type):
+    """Same address checksumming web3 applies to decoded values; None if the type needs none"""
+    if abi_type == "address":
+        return to_checksum_address
+    if abi_type == "address[]":
+        return lambda values: [to_checksum_address(value) for value in values]
+    if "address" in abi_type:
+        # Tuple/array bersarang: serahkan ke normalizer web3
+        return lambda value: map_abi_data(BASE_RETURN_NORMALIZERS, [abi_type], [value])[0]
+    return None
+
+
+class _TupleDecoder:
+    """Decoder for a fixed list of ABI types, built once"""
+
+    def __init__(self, types):
+        self.types = tuple(types)
+        # Decoder tuple dari registry eth_abi, tanpa validasi ulang setiap panggilan
+        self._decoder = registry.get_tuple_decoder(*self.types)
+        self._normalizers = [(i, fn) for i, fn in enumerate(map(_normalizer, self.types)) if fn is not None]
+
+    def __call__(self, data):
+        values = self._decoder(ContextFramesBytesIO(data))
+        if not self._normalizers:
+            return values
+        values = list(values)
+        for i, normalize in self._normalizers:
+            values[i] = normalize(values[i])
+        return tuple(values)
+
+
+class EventDecoder:
+    """Topic hash and precompiled decoders for one event"""
+
+    def __init__(self, event_abi):
+        self.name = event_abi["name"]
+        self.topic = "0x" + event_abi_to_log_topic(event_abi).hex()
+        inputs = event_abi["inputs"]
+        self.indexed = [(item["name"], collapse_if_tuple(item)) for item in inputs if item.get("indexed")]
+        self.names = [item["name"] for item in inputs if not item.get("indexed")]
+        self.data_decoder = _TupleDecoder(collapse_if_tuple(item) for item in inputs if not item.get("indexed"))
+        self._topic_decoders = [_TupleDecoder([abi_type]) for _, abi_type in self.indexed]
+
+    def decode_data(self, data):
+        return dict(zip(self.names, self.data_decoder(data)))
+
+    def decode_topics(self, topics):
+        args = {}
+        for (name, abi_type), decoder, topic in zip(self.indexed, self._topic_decoders, topics[1:]):
+            # Tipe dinamis yang di-index hanya tersimpan sebagai hash di topic
+            if abi_type in ("string", "bytes") or abi_type.endswith("]") or abi_type.startswith("("):
+                args[name] = HexBytes(topic)
+            elif abi_type == "address":
+                args[name] = to_checksum_address("0x" + _to_bytes(topic)[12:].hex())
+            else:
+                args[name] = decoder(_to_bytes(topic))[0]
+        return args
+
+    def decode(self, log):
+        """Event arguments of one log, by name"""
+        args = self.decode_topics(log["topics"]) if self.indexed else {}
+        args.update(self.decode_data(_to_bytes(log["data"])))
+        return args
+
+
+class FunctionDecoder:
+    """Selector and precompiled output decoder for one function"""
+
+    def __init__(self, function_abi):
+        self.name = function_abi["name"]
+        self.selector = "0x" + function_abi_to_4byte_selector(function_abi).hex()
+        self.output_decoder = _TupleDecoder(collapse_if_tuple(item) for item in function_abi.get("outputs", []))
+
+    def decode_output(self, return_data):
+        """Return value the way ContractFunction.call() gives it: a single value or a list"""
+        values = self.output_decoder(_to_bytes(return_data))
+        if len(values) == 1:
+            return values[0]
+        return list(values)
+
+
+events = {item["name"]: EventDecoder(item) for item in abi if item.get("type") == "event"}
+events_by_topic = {decoder.topic: decoder for decoder in events.values()}
+functions = {item["name"]: FunctionDecoder(item) for item in abi if item.get("type") == "function"}
+
+# Decoder fungsi dari ABI lain (mis. Multicall3), dibuat sekali per signature output
+_function_decoders = {}
+
+
+def event_topic(name):
+    """Topic hash (0x-prefixed hex) of a Pemilu event"""
+    return events[name].topic
+
+
+def get_function_decoder(function_abi):
+    """Cached FunctionDecoder for any function ABI entry"""
+    key = (function_abi["name"], tuple(collapse_if_tuple(item) for item in function_abi.get("inputs", [])))
+    decoder = _function_decoders.get(key)
+    if decoder is None:
+        decoder = _function_decoders[key] = FunctionDecoder(function_abi)
+    return decoder
+
+
+def _topic0(log):
+    topic = log["topics"][0]
+    return topic.lower() if isinstance(topic, str) else "0x" + bytes(topic).hex()
+
+
+def decode_log(log):
+    """(event name, args) for a Pemilu log, or None if the topic is not a Pemilu event"""
+    if not log["topics"]:
+        return None
+    decoder = events_by_topic.get(_topic0(log))
+    if decoder is None:
+        return None
+    return decoder.name, decoder.decode(log)
+
+
+def decode_logs(logs):
+    """
+    Decode a batch of logs into (event name, args, log), skipping unknown topics.
+
+    Identical data payloads are decoded once per batch: Voted logs only carry
+    the candidate id in their data, so a tally of many votes for a handful
+    of candidates decodes a handful of payloads.
+    """
+    decoded = []
+    data_cache = {}
+    for log in logs:
+        if not log["topics"]:
+            continue
+        decoder = events_by_topic.get(_topic0(log))
+        if decoder is None:
+            continue
+        data = _to_bytes(log["data"])
+        key = (decoder.topic, data)
+        data_args = data_cache.get(key)
+        if data_args is None:
+            data_args = data_cache[key] = decoder.decode_data(data)
+        args = decoder.decode_topics(log["topics"]) if decoder.indexed else {}
+        args.update(data_args)
+        decoded.append((decoder.name, args, log))
+    return decoded
@@ -0,0 +1,244 @@
+import csv
+import json
+from web3 import Web3
+from app import config
+from app.contracts import multicall
+from app.contracts import pemilu_services_async
+from app.utils.nonce_manager import nonce_manager, next_nonce_async
+
+# Batas panjang field agar satu baris rusak tidak membengkakkan transaksi
+MAX_FIELD_LENGTH = 256
+
+# =============================================
+# Upload Parsing
+# =============================================
+
+def detect_format(filename: str, content_type: str, requested: str = None):
+    """Pick "csv" or "ndjson" from the query parameter, file name or content type"""
+    if requested:
+        requested = requested.lower()
+        if requested not in ("csv", "ndjson"):
+            raise ValueError("format must be 'csv' or 'ndjson'")
+        return requested
+    if (filename or "").lower().endswith(".csv") or "csv" in (content_type or ""):
+        return "csv"
+    return "ndjson"
+
+async def iter_lines(upload, chunk_size=64 * 1024):
+    """Yield (line_number, raw bytes) from an UploadFile without reading it all into memory"""
+    buffer = b""
+    line_number = 0
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, line.rstrip(b"\r")
+    if buffer:
+        line_number += 1
+        yield line_number, buffer.rstrip(b"\r")
+
+async def iter_rows(upload, file_format: str):
+    """
+    Yield (line_number, row, error) for every non-empty line.
+
+    CSV uploads need a header row; NDJSON uploads need one JSON object per line.
+    Quoted CSV fields spanning several lines are not supported.
+    """
+    header = None
+    async for line_number, raw in iter_lines(upload):
+        if not raw.strip():
+            continue
+        try:
+            # Decode per baris: satu baris bukan UTF-8 jadi error baris itu, bukan memutus stream
+            line = raw.decode("utf-8-sig" if line_number == 1 else "utf-8")
+            if file_format == "csv":
+                values = next(csv.reader([line]))
+                if header is None:
+                    header = [value.strip() for value in values]
+                    continue
+                if len(values) != len(header):
+                    raise ValueError(f"expected {len(header)} columns, got {len(values)}")
+                row = dict(zip(header, values))
+            else:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError("each line must be a JSON object")
+        except (ValueError, UnicodeDecodeError) as e:
+            yield line_number, None, f"Invalid row: {str(e)}"
+            continue
+        yield line_number, row, None
+
+# =============================================
+# Row Validation
+# =============================================
+
+def validate_voter_row(row):
+    """Return the checksum address of a voter row or raise ValueError"""
+    address = str(row.get("address", "")).strip()
+    if not Web3.is_address(address):
+        raise ValueError("Invalid Ethereum address")
+    return Web3.to_checksum_address(address)
+
+def validate_candidate_row(row):
+    """Return (name, imageCID) of a candidate row or raise ValueError"""
+    name = str(row.get("name", "")).strip()
+    image_cid = str(row.get("imageCID", "")).strip()
+    if not name or not image_cid:
+        raise ValueError("name and imageCID are required")
+    if len(name) > MAX_FIELD_LENGTH or len(image_cid) > MAX_FIELD_LENGTH:
+        raise ValueError(f"name and imageCID must be at most {MAX_FIELD_LENGTH} characters")
+    return name, image_cid
+
+# =============================================
+# Streaming Import
+# =============================================
+
+def _line(payload):
+    return json.dumps(payload) + "\n"
+
+class _StreamNonces:
+    """
+    Nonces of one import stream, reserved as a single range up front so that
+    no reseed while the stream is still being prepared (nothing of it is
+    broadcast yet) can hand one of them out again. Chunks that build take
+    the next nonce in order; release() hands back the unused tail.
+    """
+
+    def __init__(self, address, count):
+        self.address = address
+        self.count = count
+        self.first = None
+        self.used = 0
+
+    async def reserve(self):
+        if self.count:
+            self.first = await next_nonce_async(pemilu_services_async.w3, self.address, count=self.count)
+
+    def peek(self):
+        return self.first + self.used
+
+    def advance(self):
+        self.used += 1
+
+    def release(self):
+        if self.first is not None and self.used < self.count:
+            nonce_manager.release(self.address, self.peek(), self.count - self.used)
+
+async def _prepare_voter_chunk(admin_address, chunk, summary, nonces):
+    # Lewati alamat yang sudah terdaftar (satu batched read per chunk)
+    details = await multicall.aggregate_async(
+        pemilu_services_async.w3,
+        [pemilu_services_async.contract.functions.getVoterDetails(address) for _, address in chunk],
+        allow_failure=True,
+    )
+    pending = []
+    for (line_number, address), voter_details in zip(chunk, details):
+        if voter_details is not None and voter_details[0]:
+            summary["errors"] += 1
+            yield _line({"type": "error", "line": line_number, "error": f"{address} is already registered"})
+        else:
+            pending.append((line_number, address))
+    if not pending:
+        return
+
+    tx_function = pemilu_services_async.contract.functions.registerVoters([address for _, address in pending])
+    async for line in _prepare_chunk_transaction(admin_address, tx_function, pending, summary, nonces):
+        yield line
+
+async def _prepare_candidate_chunk(admin_address, chunk, summary, nonces):
+    tx_function = pemilu_services_async.contract.functions.addCandidates(
+        [name for _, (name, _) in chunk],
+        [image_cid for _, (_, image_cid) in chunk],
+    )
+    async for line in _prepare_chunk_transaction(admin_address, tx_function, chunk, summary, nonces):
+        yield line
+
+async def _prepare_chunk_transaction(admin_address, tx_function, chunk, summary, nonces):
+    lines = [line_number for line_number, _ in chunk]
+    try:
+        tx = await pemilu_services_async.build_transact(tx_function, admin_address, nonce=nonces.peek())
+    except Exception as e:
+        summary["errors"] += len(chunk)
+        yield _line({"type": "error", "lines": lines, "error": f"Failed to prepare transaction: {str(e)}"})
+        return
+    nonces.advance()
+    summary["transactions"] += 1
+    summary["accepted"] += len(chunk)
+    yield _line({"type": "transaction", "lines": lines, "count": len(chunk), "tx": tx})
+
+async def _iter_chunks(upload, file_format, validate, chunk_size):
+    """Yield ("error", (line_number, error)) for rejected rows and ("chunk", rows) per full batch"""
+    chunk = []
+    seen = set()
+    async for line_number, row, error in iter_rows(upload, file_format):
+        if error is None:
+            try:
+                value = validate(row)
+                if value in seen:
+                    raise ValueError("Duplicate row in this batch")
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            yield "error", (line_number, error)
+            continue
+
+        seen.add(value)
+        chunk.append((line_number, value))
+        if len(chunk) >= chunk_size:
+            yield "chunk", chunk
+            chunk = []
+            seen = set()
+    if chunk:
+        yield "chunk", chunk
+
+async def _stream_import(upload, file_format, admin_address, validate, prepare_chunk, chunk_size):
+    summary = {"type": "summary", "rows": 0, "accepted": 0, "errors": 0, "transactions": 0}
+    nonces = None
+    try:
+        # Lintasan pertama hanya menghitung chunk: upload sudah di-spool, jadi bisa dibaca ulang
+        chunk_count = 0
+        async for kind, _ in _iter_chunks(upload, file_format, validate, chunk_size):
+            chunk_count += kind == "chunk"
+        await upload.seek(0)
+        nonces = _StreamNonces(admin_address, chunk_count)
+        try:
+            await nonces.reserve()
+        except Exception as e:
+            yield _line({"type": "error", "error": f"Failed to reserve nonces: {str(e)}"})
+            yield _line(summary)
+            return
+
+        async for kind, item in _iter_chunks(upload, file_format, validate, chunk_size):
+            if kind == "error":
+                line_number, error = item
+                summary["rows"] += 1
+                summary["errors"] += 1
+                yield _line({"type": "error", "line": line_number, "error": error})
+                continue
+            summary["rows"] += len(item)
+            async for line in prepare_chunk(admin_address, item, summary, nonces):
+                yield line
+        yield _line(summary)
+    finally:
+        if nonces is not None:
+            nonces.release()
+        # Upload dibaca setelah route selesai, jadi ditutup di sini
+        await upload.close()
+
+def stream_voter_import(upload, file_format, admin_address):
+    """
+    Validate an uploaded voter roll chunk by chunk and stream NDJSON lines:
+    one "transaction" line per registerVoters batch (with nonce and gas already
+    filled in), one "error" line per rejected row, and a final "summary" line.
+    """
+    return _stream_import(upload, file_format, admin_address, validate_voter_row,
+                          _prepare_voter_chunk, config.BULK_VOTER_CHUNK_SIZE)
+
+def stream_candidate_import(upload, file_format, admin_address):
+    """Same as stream_voter_import(), batching rows into addCandidates transactions"""
+    return _stream_import(upload, file_format, admin_address, validate_candidate_row,
+                          _prepare_candidate_chunk, config.BULK_CANDIDATE_CHUNK_SIZE)
@@ -0,0 +1,347 @@
+import asyncio
+import os
+import time
+import logging
+import threading
+from contextlib import closing
+from app import config
+from app.contracts import abi_codec, log_fetcher, multicall, pemilu_services
+from app.contracts.results_store import ResultsStore
+from app.utils.gas_estimator import gas_estimator
+from app.utils.shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+w3 = pemilu_services.w3
+contract = pemilu_services.contract
+
+# Event yang mengubah state kandidat dan pemilih
+INDEXED_EVENTS = ("CandidateAdded", "CandidateRemoved", "VoterRegistered", "VoterRemoved", "Voted")
+
+# Jumlah checkpoint yang disimpan untuk rollback saat terjadi reorg
+REORG_HISTORY_SIZE = 64
+
+
+class StoreMovedError(Exception):
+    """The store was advanced by another writer since this indexer last read its checkpoint"""
+
+
+class CandidateIndexer:
+    """
+    Background indexer that tails the candidate and voter events of the
+    contract into a ResultsStore (SQLite) and keeps it in sync.
+
+    Only blocks at least `confirmations` deep are applied, one chunk per
+    store transaction together with the hash of its last block. A restart
+    resumes from the stored block instead of rescanning from genesis; a
+    replica with no (or an older) database first restores the snapshot at
+    `snapshot_path` and catches up from there. If the hash of the last
+    processed block changes (a reorg deeper than the confirmation depth),
+    the store rolls back to the newest checkpoint still on the canonical chain.
+
+    With several workers sharing the database only the leader runs the
+    tailing thread and publishes its progress; the others follow() it and
+    answer from the same store. Every chunk checks that the stored
+    checkpoint is still the one this indexer wrote last, so a leader that
+    lost its lease while a chunk was in flight cannot apply it twice.
+    """
+
+    def __init__(self, db_path=config.INDEXER_DB_PATH,
+                 snapshot_path=config.INDEXER_SNAPSHOT_PATH,
+                 snapshot_interval=config.INDEXER_SNAPSHOT_INTERVAL,
+                 start_block=config.INDEXER_START_BLOCK,
+                 confirmations=config.INDEXER_CONFIRMATIONS,
+                 poll_interval=config.INDEXER_POLL_INTERVAL,
+                 max_block_range=config.INDEXER_MAX_BLOCK_RANGE):
+        self.store = ResultsStore(db_path, history_size=REORG_HISTORY_SIZE)
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.poll_interval = poll_interval
+        self.max_block_range = max_block_range
+
+        self.last_block = start_block - 1
+        self.last_block_hash = None
+        self.is_ready = False
+        self.snapshot_block = None
+        self.restored_from_snapshot = False
+
+        self._last_snapshot = time.monotonic()
+        self._listeners = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # =============================================
+    # Lifecycle
+    # =============================================
+
+    def start(self):
+        """Start tailing in a daemon thread, resuming from the stored block"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="candidate-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self, close_store=True):
+        """Stop the tailing thread; keep the store open to go on serving reads as a follower"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 5)
+            self._thread = None
+        if close_store:
+            self.store.close()
+
+    def _run(self):
+        # Store dibuka di thread ini: alamat kontrak baru di-resolve saat chain bisa dihubungi
+        store_opened = False
+        while not self._stop_event.is_set():
+            try:
+                if not store_opened:
+                    self.open_store()
+                    store_opened = True
+                self.sync()
+                self._publish_status()
+                self._maybe_snapshot()
+            except StoreMovedError:
+                logger.warning("Store advanced by another writer, reloading", extra={"block": self.last_block})
+                store_opened = False
+                continue
+            except Exception as e:
+                logger.error("Error syncing events", extra={"error": str(e)})
+            self._stop_event.wait(self.poll_interval)
+
+    def add_listener(self, listener):
+        """Register a callable that receives the list of changes applied per chunk"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def _notify(self, changes):
+        for listener in self._listeners:
+            try:
+                listener(changes)
+            except Exception as e:
+                logger.exception("Listener error")
+
+    # =============================================
+    # Sync
+    # =============================================
+
+    def sync(self):
+        """Apply all confirmed blocks since the last processed block"""
+        safe_block = w3.eth.block_number - self.confirmations
+        self._check_reorg()
+
+        advanced = False
+        if self.last_block < safe_block:
+            chunks = log_fetcher.iter_log_chunks(w3, contract.address, self.last_block + 1, safe_block,
+                                                 INDEXED_EVENTS, max_range=self.max_block_range)
+            with closing(chunks):
+                for from_block, to_block, logs in chunks:
+                    block_hash = w3.eth.get_block(to_block).hash.hex()
+
+                    decoded_logs = abi_codec.decode_logs(logs)
+                    # Waktu suara untuk analitik per rentang waktu: satu batch get_block per chunk
+                    timestamps = multicall.get_block_timestamps(
+                        w3, [log["blockNumber"] for event_name, _, log in decoded_logs if event_name == "Voted"]
+                    )
+
+                    changes = []
+                    applied = []
+                    with self.store.transaction():
+                        if self.store.get_checkpoint()[1:] != (self.last_block, self.last_block_hash):
+                            raise StoreMovedError()
+                        for event_name, args, log in decoded_logs:
+                            change = self._apply_log(event_name, args, log, timestamps)
+                            applied.append((event_name, args, log, change))
+                            if change is not None:
+                                changes.append(change)
+                        self.store.commit_checkpoint(to_block, block_hash)
+                    self.last_block = to_block
+                    self.last_block_hash = block_hash
+                    advanced = True
+
+                    if changes:
+                        self._notify(changes)
+                    if config.GAS_CACHE_ENABLED:
+                        # gasUsed dari receipt transaksi yang baru di-index mengkalibrasi cache gas
+                        gas_estimator.calibrate(w3, applied)
+                    if self._stop_event.is_set():
+                        break
+
+        if advanced:
+            # Periode voting tidak punya event dan registeredVoters tidak berkurang saat pemilih
+            # dihapus: keduanya dibaca ulang di block yang sudah diproses
+            (start_time, end_time), registered_voters = multicall.aggregate(
+                w3,
+                [contract.functions.getVotingPeriod(), contract.functions.getTotalRegisteredVoters()],
+                block_identifier=self.last_block,
+            )
+            with self.store.transaction():
+                self.store.set_voting_period(start_time, end_time, self.last_block)
+                self.store.set_registered_voters(registered_voters, self.last_block)
+
+        if self.last_block >= safe_block:
+            self.is_ready = True
+
+    def _apply_log(self, event_name, args, log, timestamps):
+        """Apply one decoded log to the store and describe the change for listeners"""
+        block_number = log["blockNumber"]
+        log_index = log["logIndex"]
+
+        if event_name == "CandidateAdded":
+            self.store.add_candidate(args["id"], args["name"], args["imageCID"], block_number, log_index)
+            candidate = {"id": args["id"], "name": args["name"], "voteCount": 0, "imageCID": args["imageCID"]}
+            return {"type": "candidateAdded", "blockNumber": block_number, "candidate": candidate}
+        elif event_name == "CandidateRemoved":
+            self.store.remove_candidate(args["id"], block_number)
+            return {"type": "candidateRemoved", "blockNumber": block_number, "candidateId": args["id"]}
+        elif event_name == "VoterRegistered":
+            self.store.register_voter(args["voter"], block_number)
+        elif event_name == "VoterRemoved":
+            self.store.remove_voter(args["voter"], block_number)
+        elif event_name == "Voted":
+            transaction_hash = "0x" + bytes(log["transactionHash"]).hex()
+            vote_count = self.store.record_vote(args["voter"], args["candidateId"], block_number, log_index,
+                                                timestamps[block_number], transaction_hash)
+            if vote_count is not None:
+                return {
+                    "type": "vote",
+                    "blockNumber": block_number,
+                    "candidateId": args["candidateId"],
+                    "delta": 1,
+                    "voteCount": vote_count,
+                }
+        return None
+
+    def _check_reorg(self):
+        """Roll back to the newest checkpoint still on the canonical chain if the last block was reorged out"""
+        if self.last_block_hash is None:
+            return
+        if w3.eth.get_block(self.last_block).hash.hex() == self.last_block_hash:
+            return
+
+        logger.warning("Reorg detected, rewinding", extra={"block": self.last_block})
+        target = self.store.rewind(lambda number, block_hash: w3.eth.get_block(number).hash.hex() == block_hash)
+        if target is None:
+            # Tidak ada checkpoint yang valid, scan ulang dari awal
+            self.store.reset(contract.address, self.start_block - 1)
+            target = (self.start_block - 1, None)
+        self.last_block, self.last_block_hash = target
+        # Delta yang sudah dikirim tidak berlaku lagi, kirim ulang seluruh tabel
+        self._notify([{"type": "snapshot", "blockNumber": self.last_block, "candidates": self.get_candidates()}])
+
+    # =============================================
+    # Followers
+    # =============================================
+
+    def _publish_status(self):
+        if shared_state is not None:
+            shared_state.put("indexer", {"isReady": self.is_ready, "lastBlock": self.last_block,
+                                         "lastBlockHash": self.last_block_hash})
+
+    def follow(self, status):
+        """Mirror the progress the leader published; the data itself is read from the shared store"""
+        if status is None or self._thread is not None:
+            return
+        self.is_ready = status["isReady"]
+        self.last_block = status["lastBlock"]
+        self.last_block_hash = status["lastBlockHash"]
+
+    # =============================================
+    # Store & snapshot
+    # =============================================
+
+    def open_store(self):
+        """
+        Resume from the local database, or from the snapshot when it is
+        further ahead (a fresh replica has no local database at all).
+        State of another contract is discarded.
+        """
+        address = contract.address
+        stored_address, last_block, last_block_hash = self.store.get_checkpoint()
+        if stored_address != address:
+            last_block = None
+
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            snapshot = ResultsStore.read_snapshot_checkpoint(self.snapshot_path)
+            if snapshot is not None and snapshot[0] == address and (last_block is None or snapshot[1] > last_block):
+                self.store.restore(self.snapshot_path)
+                stored_address, last_block, last_block_hash = self.store.get_checkpoint()
+                self.restored_from_snapshot = True
+                logger.info("Restored indexer snapshot", extra={"path": self.snapshot_path, "block": last_block})
+
+        if last_block is None:
+            self.store.reset(address, self.start_block - 1)
+            last_block, last_block_hash = self.start_block - 1, None
+
+        self.last_block = last_block
+        self.last_block_hash = last_block_hash
+
+    def _maybe_snapshot(self):
+        if not self.snapshot_path or self.last_block == self.snapshot_block:
+            return
+        if time.monotonic() - self._last_snapshot < self.snapshot_interval:
+            return
+        self.write_snapshot()
+
+    def write_snapshot(self):
+        """Write the current store to the snapshot path"""
+        started = time.perf_counter()
+        self.store.snapshot(self.snapshot_path)
+        self.snapshot_block = self.last_block
+        self._last_snapshot = time.monotonic()
+        logger.info("Indexer snapshot written", extra={
+            "path": self.snapshot_path,
+            "block": self.snapshot_block,
+            "durationMs": round((time.perf_counter() - started) * 1000, 2),
+        })
+
+    # =============================================
+    # Query
+    # =============================================
+
+    def get_candidates(self):
+        """Get all candidates from the store"""
+        return self.store.get_candidates()
+
+    def get_candidate(self, candidate_id):
+        """Get one candidate from the store, None if it is not indexed"""
+        return self.store.get_candidate(candidate_id)
+
+    def get_voter(self, address):
+        """(isRegistered, hasVoted, voteCandidateId) from the store, None if the voter is not indexed"""
+        return self.store.get_voter(abi_codec.to_checksum_address(address))
+
+    def get_vote(self, address):
+        """Indexed Voted event of a voter, None if the voter has not voted"""
+        return self.store.get_vote(abi_codec.to_checksum_address(address))
+
+    def get_status(self):
+        """Get the indexer progress"""
+        status = {
+            "isReady": self.is_ready,
+            "lastBlock": self.last_block,
+            "confirmations": self.confirmations,
+            "snapshotBlock": self.snapshot_block,
+            "restoredFromSnapshot": self.restored_from_snapshot,
+        }
+        if self._thread is not None or self.is_ready:
+            status.update(self.store.get_counts())
+        return status
+
+
+candidate_indexer = CandidateIndexer()
+
+
+async def run_indexer_follower(state, interval=config.SHARED_POLL_INTERVAL):
+    """Keep candidate_indexer in step with the leader's progress while this worker is not the leader"""
+    while True:
+        try:
+            if not state.is_leader:
+                candidate_indexer.follow(state.get("indexer"))
+                gas_estimator.load_observations(state.get("gasObservations"))
+        except Exception as e:
+            logger.warning("Error reading indexer progress", extra={"error": str(e)})
+        await asyncio.sleep(interval)
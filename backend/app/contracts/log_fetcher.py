@@ -0,0 +1,137 @@
+"""
+eth_getLogs over long block ranges.
+
+Providers cap a single eth_getLogs call by result count ("query returned
+more than 10000 results") or by block range, so a scan from the deploy
+block to `latest` is split into windows. The window doubles after every
+full-size window that succeeds and is halved when the provider rejects a
+range as too large; the rejected range is retried as two halves. Up to
+`concurrency` windows are in flight at once and the chunks are yielded
+strictly in block order, each as (from_block, to_block, logs) with the
+logs sorted by (blockNumber, logIndex).
+
+Works for any event of the Pemilu ABI: pass the event names to filter on,
+or none for all of them.
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from app import config
+from app.contracts import abi_codec
+from app.utils.metrics import LOG_RANGE_SPLITS
+from app.utils.rpc_provider import is_log_range_error
+
+
+class _Window:
+    """Block range size shared by the workers of one scan"""
+
+    def __init__(self, initial, maximum):
+        self.maximum = max(1, maximum)
+        self.size = max(1, min(initial, self.maximum))
+
+    def succeeded(self, blocks):
+        # Hanya window penuh yang membuktikan ukuran saat ini aman
+        if blocks >= self.size:
+            self.size = min(self.maximum, self.size * 2)
+
+    def failed(self, blocks):
+        self.size = max(1, min(self.size, blocks // 2))
+        LOG_RANGE_SPLITS.inc()
+
+
+def _topics(event_names):
+    names = event_names or abi_codec.events
+    return [[abi_codec.event_topic(name) for name in names]]
+
+
+def _sorted(logs):
+    return sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"]))
+
+
+def _fetch_range(get_logs, params, window, start, end):
+    try:
+        logs = get_logs({**params, "fromBlock": start, "toBlock": end})
+    except Exception as e:
+        if start == end or not is_log_range_error(e):
+            raise
+        window.failed(end - start + 1)
+        middle = (start + end) // 2
+        return _fetch_range(get_logs, params, window, start, middle) + _fetch_range(get_logs, params, window, middle + 1, end)
+    window.succeeded(end - start + 1)
+    return list(logs)
+
+
+async def _fetch_range_async(get_logs, params, window, start, end):
+    try:
+        logs = await get_logs({**params, "fromBlock": start, "toBlock": end})
+    except Exception as e:
+        if start == end or not is_log_range_error(e):
+            raise
+        window.failed(end - start + 1)
+        middle = (start + end) // 2
+        first = await _fetch_range_async(get_logs, params, window, start, middle)
+        return first + await _fetch_range_async(get_logs, params, window, middle + 1, end)
+    window.succeeded(end - start + 1)
+    return list(logs)
+
+
+def iter_log_chunks(w3, address, from_block, to_block="latest", event_names=None,
+                    initial_range=config.LOG_FETCH_INITIAL_RANGE,
+                    max_range=config.LOG_FETCH_MAX_RANGE,
+                    concurrency=config.LOG_FETCH_CONCURRENCY):
+    """Yield (from_block, to_block, logs) chunks in block order, fetched on a thread pool"""
+    if to_block == "latest":
+        to_block = w3.eth.block_number
+    params = {"address": address, "topics": _topics(event_names)}
+    window = _Window(initial_range, max_range)
+    pending = deque()
+    next_block = from_block
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="log-fetcher")
+    try:
+        while pending or next_block <= to_block:
+            while len(pending) < concurrency and next_block <= to_block:
+                start, end = next_block, min(to_block, next_block + window.size - 1)
+                future = executor.submit(_fetch_range, w3.eth.get_logs, params, window, start, end)
+                pending.append((start, end, future))
+                next_block = end + 1
+            start, end, future = pending.popleft()
+            yield start, end, _sorted(future.result())
+    finally:
+        # Pemanggil berhenti lebih awal (atau error): window yang belum jalan dibatalkan
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def aiter_log_chunks(w3, address, from_block, to_block="latest", event_names=None,
+                           initial_range=config.LOG_FETCH_INITIAL_RANGE,
+                           max_range=config.LOG_FETCH_MAX_RANGE,
+                           concurrency=config.LOG_FETCH_CONCURRENCY):
+    """Async version of iter_log_chunks for an AsyncWeb3 client, fetching windows as tasks"""
+    if to_block == "latest":
+        to_block = await w3.eth.block_number
+    params = {"address": address, "topics": _topics(event_names)}
+    window = _Window(initial_range, max_range)
+    pending = deque()
+    next_block = from_block
+    try:
+        while pending or next_block <= to_block:
+            while len(pending) < concurrency and next_block <= to_block:
+                start, end = next_block, min(to_block, next_block + window.size - 1)
+                task = asyncio.create_task(_fetch_range_async(w3.eth.get_logs, params, window, start, end))
+                pending.append((start, end, task))
+                next_block = end + 1
+            start, end, task = pending.popleft()
+            yield start, end, _sorted(await task)
+    finally:
+        for _, _, task in pending:
+            task.cancel()
+
+
+def get_logs(w3, address, from_block, to_block="latest", event_names=None, **kwargs):
+    """All matching logs of the range as one list, in block order"""
+    return [log for _, _, logs in iter_log_chunks(w3, address, from_block, to_block, event_names, **kwargs) for log in logs]
+
+
+async def get_logs_async(w3, address, from_block, to_block="latest", event_names=None, **kwargs):
+    """Async version of get_logs"""
+    return [log async for _, _, logs in aiter_log_chunks(w3, address, from_block, to_block, event_names, **kwargs)
+            for log in logs]
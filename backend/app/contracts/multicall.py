@@ -0,0 +1,287 @@
+import asyncio
+from web3 import Web3
+from app import config
+from app.contracts import abi_codec
+from app.utils import metrics
+
+# Multicall3 is deployed at the same address on Sepolia, mainnet and most
+# public chains. A plain local anvil node does not have it, in which case the
+# calls are sent as a single JSON-RPC batch instead.
+MULTICALL3_ABI = [
+    {
+        "type": "function",
+        "name": "aggregate3",
+        "stateMutability": "payable",
+        "inputs": [{
+            "name": "calls",
+            "type": "tuple[]",
+            "components": [
+                {"name": "target", "type": "address"},
+                {"name": "allowFailure", "type": "bool"},
+                {"name": "callData", "type": "bytes"},
+            ],
+        }],
+        "outputs": [{
+            "name": "returnData",
+            "type": "tuple[]",
+            "components": [
+                {"name": "success", "type": "bool"},
+                {"name": "returnData", "type": "bytes"},
+            ],
+        }],
+    },
+    {
+        "type": "function",
+        "name": "getBlockNumber",
+        "stateMutability": "view",
+        "inputs": [],
+        "outputs": [{"name": "blockNumber", "type": "uint256"}],
+    },
+    {
+        "type": "function",
+        "name": "getCurrentBlockTimestamp",
+        "stateMutability": "view",
+        "inputs": [],
+        "outputs": [{"name": "timestamp", "type": "uint256"}],
+    },
+]
+metrics.register_abi(MULTICALL3_ABI)
+
+# Hasil pengecekan kode Multicall3 per instance Web3
+_multicall_available = {}
+
+
+def is_multicall_available(w3):
+    """Check once per client whether Multicall3 is deployed on its chain"""
+    if not config.MULTICALL_ENABLED:
+        return False
+    if id(w3) not in _multicall_available:
+        code = w3.eth.get_code(Web3.to_checksum_address(config.MULTICALL_ADDRESS))
+        _multicall_available[id(w3)] = len(code) > 0
+    return _multicall_available[id(w3)]
+
+
+def decode_result(w3, fn, return_data):
+    """Decode raw return data of a view call the same way ContractFunction.call() does"""
+    return abi_codec.get_function_decoder(fn.abi).decode_output(return_data)
+
+
+def _multicall_contract(w3):
+    return w3.eth.contract(address=Web3.to_checksum_address(config.MULTICALL_ADDRESS), abi=MULTICALL3_ABI)
+
+
+def _aggregate3(w3, calls, block_identifier, allow_failure):
+    multicall = _multicall_contract(w3)
+    payload = [(fn.address, allow_failure, fn._encode_transaction_data()) for fn in calls]
+    responses = multicall.functions.aggregate3(payload).call(block_identifier=block_identifier)
+
+    results = []
+    for fn, (success, return_data) in zip(calls, responses):
+        results.append(decode_result(w3, fn, return_data) if success else None)
+    return results
+
+
+def _rpc_batch(w3, calls, block_identifier, allow_failure):
+    try:
+        with w3.batch_requests() as batch:
+            for fn in calls:
+                batch.add(fn.call(block_identifier=block_identifier))
+            return list(batch.execute())
+    except Exception:
+        if not allow_failure:
+            raise
+
+    # Salah satu call gagal: ulangi satu per satu agar call lain tetap terbaca
+    results = []
+    for fn in calls:
+        try:
+            results.append(fn.call(block_identifier=block_identifier))
+        except Exception:
+            results.append(None)
+    return results
+
+
+def aggregate(w3, calls, block_identifier="latest", allow_failure=False):
+    """
+    Execute several contract view calls in one round-trip.
+
+    Parameters:
+    - w3: Web3 instance the calls are bound to
+    - calls: list of bound ContractFunction objects (e.g. contract.functions.candidates(1))
+    - block_identifier: block to read state at
+    - allow_failure: if True, a reverting call yields None instead of raising
+
+    Returns:
+    - list of decoded results in the same order as `calls`
+    """
+    if not calls:
+        return []
+    if is_multicall_available(w3):
+        return _aggregate3(w3, calls, block_identifier, allow_failure)
+    return _rpc_batch(w3, calls, block_identifier, allow_failure)
+
+
+def aggregate_with_block(w3, calls, block_identifier="latest", allow_failure=False):
+    """
+    Same as aggregate(), but also returns the number and timestamp of the block
+    the calls were executed at.
+
+    Returns:
+    - (block_number, block_timestamp, results)
+    """
+    if is_multicall_available(w3):
+        multicall = _multicall_contract(w3)
+        block_calls = [multicall.functions.getBlockNumber(), multicall.functions.getCurrentBlockTimestamp()]
+        results = _aggregate3(w3, block_calls + list(calls), block_identifier, allow_failure)
+        return results[0], results[1], results[2:]
+
+    with w3.batch_requests() as batch:
+        batch.add(w3.eth.get_block(block_identifier))
+        for fn in calls:
+            batch.add(fn.call(block_identifier=block_identifier))
+        try:
+            block, *results = batch.execute()
+            return block.number, block.timestamp, results
+        except Exception:
+            if not allow_failure:
+                raise
+
+    block = w3.eth.get_block(block_identifier)
+    return block.number, block.timestamp, _rpc_batch(w3, calls, block.number, allow_failure)
+
+
+def get_block_timestamps(w3, block_numbers, batch_size=100):
+    """{block number: timestamp} for several blocks, fetched in JSON-RPC batches of `batch_size`"""
+    numbers = sorted(set(block_numbers))
+    timestamps = {}
+    for start in range(0, len(numbers), batch_size):
+        part = numbers[start:start + batch_size]
+        try:
+            with w3.batch_requests() as batch:
+                for block_number in part:
+                    batch.add(w3.eth.get_block(block_number))
+                blocks = batch.execute()
+        except Exception:
+            # Provider tanpa dukungan batch: satu request per block
+            blocks = [w3.eth.get_block(block_number) for block_number in part]
+        timestamps.update((block.number, block.timestamp) for block in blocks)
+    return timestamps
+
+
+def _get_by_hash(w3, method, tx_hashes, batch_size):
+    results = []
+    for start in range(0, len(tx_hashes), batch_size):
+        part = tx_hashes[start:start + batch_size]
+        try:
+            with w3.batch_requests() as batch:
+                for tx_hash in part:
+                    batch.add(getattr(w3.eth, method)(tx_hash))
+                results.extend(batch.execute())
+        except Exception:
+            results.extend(getattr(w3.eth, method)(tx_hash) for tx_hash in part)
+    return results
+
+
+def get_transaction_receipts(w3, tx_hashes, batch_size=100):
+    """Receipts of several transactions in request order, fetched in JSON-RPC batches of `batch_size`"""
+    return _get_by_hash(w3, "get_transaction_receipt", tx_hashes, batch_size)
+
+
+def get_transactions(w3, tx_hashes, batch_size=100):
+    """Transactions (with their input) of several hashes in request order, batched like get_transaction_receipts()"""
+    return _get_by_hash(w3, "get_transaction", tx_hashes, batch_size)
+
+
+# =============================================
+# Async variants (AsyncWeb3)
+# =============================================
+
+async def is_multicall_available_async(w3):
+    """Async variant of is_multicall_available()"""
+    if not config.MULTICALL_ENABLED:
+        return False
+    if id(w3) not in _multicall_available:
+        code = await w3.eth.get_code(Web3.to_checksum_address(config.MULTICALL_ADDRESS))
+        _multicall_available[id(w3)] = len(code) > 0
+    return _multicall_available[id(w3)]
+
+
+async def rpc_batch_raw_async(w3, method, params_list, batch_size=100):
+    """
+    (result, error) of one JSON-RPC method for several parameter lists, in
+    request order, sent as raw batches of `batch_size`. Results are not
+    passed through web3's formatters (hex quantities stay strings). A null
+    result comes back as (None, None) and a per-item error (e.g. a rate
+    limit) as (None, error object), instead of failing the whole batch the
+    way web3 does for e.g. a receipt that does not exist yet.
+    """
+    results = []
+    for start in range(0, len(params_list), batch_size):
+        responses = await w3.provider.make_batch_request([(method, params) for params in params_list[start:start + batch_size]])
+        if not isinstance(responses, list):
+            raise Exception(f"{method} batch failed: {responses.get('error')}")
+        # Provider sudah mengurutkan respons sesuai id request
+        results.extend((response.get("result"), response.get("error")) for response in responses)
+    return results
+
+
+async def _aggregate3_async(w3, calls, block_identifier, allow_failure):
+    multicall = _multicall_contract(w3)
+    payload = [(fn.address, allow_failure, fn._encode_transaction_data()) for fn in calls]
+    responses = await multicall.functions.aggregate3(payload).call(block_identifier=block_identifier)
+
+    results = []
+    for fn, (success, return_data) in zip(calls, responses):
+        results.append(decode_result(w3, fn, return_data) if success else None)
+    return results
+
+
+async def _rpc_batch_async(w3, calls, block_identifier, allow_failure):
+    try:
+        async with w3.batch_requests() as batch:
+            for fn in calls:
+                batch.add(fn.call(block_identifier=block_identifier))
+            return list(await batch.async_execute())
+    except Exception:
+        if not allow_failure:
+            raise
+
+    async def call_or_none(fn):
+        try:
+            return await fn.call(block_identifier=block_identifier)
+        except Exception:
+            return None
+
+    return list(await asyncio.gather(*(call_or_none(fn) for fn in calls)))
+
+
+async def aggregate_async(w3, calls, block_identifier="latest", allow_failure=False):
+    """Async variant of aggregate() for AsyncContractFunction calls"""
+    if not calls:
+        return []
+    if await is_multicall_available_async(w3):
+        return await _aggregate3_async(w3, calls, block_identifier, allow_failure)
+    return await _rpc_batch_async(w3, calls, block_identifier, allow_failure)
+
+
+async def aggregate_with_block_async(w3, calls, block_identifier="latest", allow_failure=False):
+    """Async variant of aggregate_with_block()"""
+    if await is_multicall_available_async(w3):
+        multicall = _multicall_contract(w3)
+        block_calls = [multicall.functions.getBlockNumber(), multicall.functions.getCurrentBlockTimestamp()]
+        results = await _aggregate3_async(w3, block_calls + list(calls), block_identifier, allow_failure)
+        return results[0], results[1], results[2:]
+
+    try:
+        async with w3.batch_requests() as batch:
+            batch.add(w3.eth.get_block(block_identifier))
+            for fn in calls:
+                batch.add(fn.call(block_identifier=block_identifier))
+            block, *results = await batch.async_execute()
+            return block.number, block.timestamp, results
+    except Exception:
+        if not allow_failure:
+            raise
+
+    block = await w3.eth.get_block(block_identifier)
+    return block.number, block.timestamp, await _rpc_batch_async(w3, calls, block.number, allow_failure)
@@ -0,0 +1,552 @@
+import asyncio
+import logging
+from web3 import Web3
+from web3.exceptions import BadFunctionCallOutput, ContractLogicError
+from app import config
+from app.utils import utils
+from app.utils import chain_backend
+from app.utils import gas_estimator
+from app.utils.http_responses import dumps
+from app.utils.rpc_provider import async_w3
+from app.utils.nonce_manager import nonce_manager, next_nonce_async
+from app.contracts import multicall
+from app.contracts.read_cache import cached
+from app.contracts.single_flight import coalesced
+from app.contracts import abi_codec, log_fetcher, pemilu_services
+from app.contracts.voter_allowlist import voter_allowlist
+from app.contracts.pemilu_services import abi, format_transaction, build_voting_period_status, active_candidate_ids
+
+# AsyncWeb3 variant of pemilu_services used by the FastAPI routes. Independent
+# RPC calls are issued concurrently with asyncio.gather instead of one by one.
+w3 = async_w3
+contract = chain_backend.LazyContract(w3, abi, lambda: pemilu_services.contract.address)
+
+logger = logging.getLogger(__name__)
+
+# =============================================
+# Utility Functions
+# =============================================
+
+async def bind_contract(retry_interval=2):
+    """Resolve the contract in the background, retrying until the chain answers"""
+    while not contract.is_bound:
+        try:
+            # Backend lokal men-deploy kontrak di sini; jalankan di thread agar event loop tetap bebas
+            await asyncio.to_thread(pemilu_services.contract.resolve)
+            contract.resolve()
+            logger.info("Contract bound", extra={"address": contract.address})
+        except Exception as e:
+            logger.warning("Error binding contract, retrying", extra={"error": str(e)})
+            await asyncio.sleep(retry_interval)
+
+async def build_transact(tx_function, user_address, gas_key=None, nonce=None):
+    """
+    Build an unsigned transaction. Pass `gas_key` only after checking the
+    preconditions of the call: its gas limit may then come from gas_estimator
+    instead of a live estimate_gas, which is what would report a revert.
+    `nonce` is for callers that reserved a range themselves (bulk import);
+    by default one nonce is reserved and handed back if the build fails.
+    """
+    reserved = nonce is None
+    # return_exceptions: nonce yang sudah direservasi harus dikembalikan walau estimasi gagal
+    gas_result, nonce = await asyncio.gather(
+        utils.get_gas_parameters_async(tx_function, user_address, gas_key=gas_key),
+        next_nonce_async(w3, user_address) if reserved else asyncio.sleep(0, nonce),
+        return_exceptions=True,
+    )
+    try:
+        for result in (gas_result, nonce):
+            if isinstance(result, BaseException):
+                raise result
+        gas_limit, gas_params = gas_result
+
+        tx = await tx_function.build_transaction({
+            "from": user_address,
+            "nonce": nonce,
+            "gas": gas_limit,
+            **gas_params
+        })
+    except Exception as e:
+        if reserved and isinstance(nonce, int):
+            nonce_manager.release(user_address, nonce)
+        nonce_manager.handle_error(user_address, e)
+        raise
+
+    return format_transaction(tx)
+
+async def build_transact_batch(tx_functions, user_address, gas_keys=None):
+    """Build sequential transactions from one sender with a single nonce reservation"""
+    if not tx_functions:
+        return []
+    gas_keys = gas_keys or [None] * len(tx_functions)
+    first_nonce = None
+    try:
+        gas_results = await asyncio.gather(*(
+            utils.get_gas_parameters_async(tx_function, user_address, gas_key=gas_key)
+            for tx_function, gas_key in zip(tx_functions, gas_keys)
+        ))
+        first_nonce = await next_nonce_async(w3, user_address, count=len(tx_functions))
+
+        txs = await asyncio.gather(*(
+            tx_function.build_transaction({
+                "from": user_address,
+                "nonce": first_nonce + i,
+                "gas": gas_limit,
+                **gas_params
+            })
+            for i, (tx_function, (gas_limit, gas_params)) in enumerate(zip(tx_functions, gas_results))
+        ))
+    except Exception as e:
+        if first_nonce is not None:
+            nonce_manager.release(user_address, first_nonce, len(tx_functions))
+        nonce_manager.handle_error(user_address, e)
+        raise
+
+    return [format_transaction(tx) for tx in txs]
+
+# =============================================
+# Write Context
+# =============================================
+
+class WriteContext:
+    """
+    Preconditions of one write request, read once at a single pinned block.
+
+    The route loads it, uses it for its own HTTP-level checks (403/400) and
+    passes it down, so the service layer validates against the same values
+    instead of reading them again. Only the fields asked for in
+    load_write_context() are available.
+    """
+
+    def __init__(self, user_address, block_number, blockchain_time, values, voter_address=None):
+        self.user_address = user_address
+        self.block_number = block_number
+        self.blockchain_time = blockchain_time
+        # Alamat yang dibaca voter_details (bisa selain user_address, mis. saat admin menghapus pemilih)
+        self.voter_address = voter_address
+        self._values = values
+        self._voting_period = None
+
+    @property
+    def is_owner(self):
+        return Web3.to_checksum_address(self._values["owner"]) == self.user_address
+
+    @property
+    def is_admin(self):
+        return bool(self._values["isAdmin"])
+
+    @property
+    def voter_details(self):
+        """(isRegistered, hasVoted, voteCandidateId), or None if the read failed"""
+        return self._values["voterDetails"]
+
+    @property
+    def candidate_details(self):
+        """(id, name, voteCount, imageCID), or None for an unknown candidate"""
+        return self._values["candidateDetails"]
+
+    @property
+    def voter_merkle_root(self):
+        """0x-prefixed allowlist root on chain, None if it was not read or is unset"""
+        root = self._values.get("voterMerkleRoot")
+        return "0x" + bytes(root).hex() if root and any(root) else None
+
+    @property
+    def is_removed_voter(self):
+        """Whether an admin removed user_address, which the allowlist then no longer admits"""
+        # None: tidak dibaca, atau deployment lama tanpa removedVoters
+        return bool(self._values.get("removedVoter"))
+
+    @property
+    def voting_period(self):
+        if self._voting_period is None:
+            self._voting_period = build_voting_period_status(
+                self._values["startTime"], self._values["endTime"], self.blockchain_time
+            )
+        return self._voting_period
+
+async def load_write_context(user_address: str, owner: bool = False, admin: bool = False, voter: bool = False,
+                             candidate_id: int = None, voting_period: bool = False,
+                             allowlist: bool = False, voter_address: str = None) -> WriteContext:
+    """
+    Read the requested preconditions for user_address in one batched call at
+    one block. `voter` reads the details of `voter_address`, by default
+    user_address itself.
+    """
+    user_address = Web3.to_checksum_address(user_address)
+    voter_address = Web3.to_checksum_address(voter_address or user_address) if voter else None
+    calls = {}
+    if owner:
+        calls["owner"] = contract.functions.owner()
+    if admin:
+        calls["isAdmin"] = contract.functions.isAdmin(user_address)
+    if voter:
+        calls["voterDetails"] = contract.functions.getVoterDetails(voter_address)
+    if candidate_id is not None:
+        calls["candidateDetails"] = contract.functions.getCandidateDetails(candidate_id)
+    if voting_period:
+        calls["startTime"] = contract.functions.startTime()
+        calls["endTime"] = contract.functions.endTime()
+    if allowlist:
+        calls["voterMerkleRoot"] = contract.functions.voterMerkleRoot()
+        calls["removedVoter"] = contract.functions.removedVoters(user_address)
+
+    block_number, blockchain_time, results = await multicall.aggregate_with_block_async(
+        w3, list(calls.values()), allow_failure=True
+    )
+    values = dict(zip(calls, results))
+    for name in ("owner", "isAdmin", "startTime", "endTime"):
+        # Read wajib; candidate/voter boleh gagal (revert untuk ID yang tidak ada)
+        if name in values and values[name] is None:
+            raise Exception(f"Failed to read {name} from the contract")
+    return WriteContext(user_address, block_number, blockchain_time, values, voter_address)
+
+# =============================================
+# Role Check Functions
+# =============================================
+
+async def is_contract_owner(address: str) -> bool:
+    """Check if the given address is the contract owner"""
+    owner = await contract.functions.owner().call()
+    return Web3.to_checksum_address(address) == Web3.to_checksum_address(owner)
+
+@cached
+@coalesced
+async def is_admin(address: str) -> bool:
+    """Check if the given address is an admin"""
+    return await contract.functions.isAdmin(Web3.to_checksum_address(address)).call()
+
+async def is_voter(address: str) -> bool:
+    """Check if the given address is registered as a voter"""
+    try:
+        voter_details = await contract.functions.getVoterDetails(Web3.to_checksum_address(address)).call()
+        return voter_details[0]  # isRegistered is the first field in the tuple
+    except Exception as e:
+        logger.warning("Error checking voter status", extra={"address": address, "error": str(e)})
+        return False
+
+# =============================================
+# Admin Functions
+# =============================================
+
+async def add_admin(owner_address: str, new_admin_address: str, ctx: WriteContext = None):
+    """Add a new admin to the contract"""
+    ctx = ctx or await load_write_context(owner_address, owner=True)
+    if not ctx.is_owner:
+        raise Exception("Only contract owner can add new admins")
+
+    tx_function = contract.functions.addAdmin(Web3.to_checksum_address(new_admin_address))
+    return await build_transact(tx_function, owner_address)
+
+async def remove_admin(owner_address: str, admin_address: str, ctx: WriteContext = None):
+    """Remove an admin from the contract"""
+    ctx = ctx or await load_write_context(owner_address, owner=True)
+    if not ctx.is_owner:
+        raise Exception("Only contract owner can remove admins")
+
+    tx_function = contract.functions.removeAdmin(Web3.to_checksum_address(admin_address))
+    return await build_transact(tx_function, owner_address)
+
+async def add_candidate(user_address: str, name: str, imageCID: str, ctx: WriteContext = None):
+    """Add a new candidate"""
+    ctx = ctx or await load_write_context(user_address, admin=True)
+    if not ctx.is_admin:
+        raise Exception("Only admins can add candidates")
+
+    tx_function = contract.functions.addCandidate(name, imageCID)
+    return await build_transact(tx_function, user_address, gas_estimator.add_candidate_key(name, imageCID))
+
+async def add_candidates(user_address: str, candidates: list, ctx: WriteContext = None):
+    """Prepare one addCandidate transaction per candidate with sequential nonces"""
+    ctx = ctx or await load_write_context(user_address, admin=True)
+    if not ctx.is_admin:
+        raise Exception("Only admins can add candidates")
+
+    tx_functions = [contract.functions.addCandidate(candidate.name, candidate.imageCID) for candidate in candidates]
+    gas_keys = [gas_estimator.add_candidate_key(candidate.name, candidate.imageCID) for candidate in candidates]
+    return await build_transact_batch(tx_functions, user_address, gas_keys)
+
+async def remove_candidate(user_address: str, candidate_id: int, ctx: WriteContext = None):
+    """Remove a candidate from the contract"""
+    ctx = ctx or await load_write_context(user_address, admin=True)
+    if not ctx.is_admin:
+        raise Exception("Only admins can remove candidates")
+
+    tx_function = contract.functions.removeCandidate(candidate_id)
+    return await build_transact(tx_function, user_address)
+
+async def remove_voter(user_address: str, voter_address: str, ctx: WriteContext = None):
+    """Remove a voter from the contract"""
+    ctx = ctx or await load_write_context(user_address, admin=True, voter=True, voter_address=voter_address)
+    if not ctx.is_admin:
+        raise Exception("Only admins can remove voters")
+
+    tx_function = contract.functions.removeVoter(voter_address)
+    # Hanya pemilih terdaftar yang belum memilih yang bisa dihapus; selain itu estimasi live.
+    # Dibaca dari chain, bukan indexer: store tertinggal INDEXER_CONFIRMATIONS blok
+    gas_key = None
+    if ctx.voter_address == Web3.to_checksum_address(voter_address):
+        voter = ctx.voter_details
+        if voter is not None and voter[0] and not voter[1]:
+            gas_key = gas_estimator.REMOVE_VOTER_KEY
+    return await build_transact(tx_function, user_address, gas_key)
+
+async def set_voter_merkle_root(user_address: str, root: str, voter_count: int, ctx: WriteContext = None):
+    """Publish the root of a voter allowlist built with voter_allowlist.build_allowlist()"""
+    ctx = ctx or await load_write_context(user_address, admin=True)
+    if not ctx.is_admin:
+        raise Exception("Only admins can set the voter allowlist")
+
+    tx_function = contract.functions.setVoterMerkleRoot(bytes.fromhex(root.removeprefix("0x")), voter_count)
+    return await build_transact(tx_function, user_address)
+
+async def set_voting_period(user_address: str, start_time: int, end_time: int):
+    """Set the voting period"""
+    logger.info("Setting voting period", extra={"startTime": start_time, "endTime": end_time})
+
+    tx_function = contract.functions.setVotingPeriod(start_time, end_time)
+    return await build_transact(tx_function, user_address)
+
+async def stop_voting_period(user_address: str):
+    """Stop the voting period"""
+    tx_function = contract.functions.stopVotingPeriod()
+    return await build_transact(tx_function, user_address)
+
+async def get_winner(user_address: str):
+    """Get the winner of the election"""
+    tx_function = contract.functions.getWinner()
+    return await build_transact(tx_function, user_address)
+
+# =============================================
+# Voter Functions
+# =============================================
+
+async def register_voter(user_address: str, ctx: WriteContext = None):
+    """Register a new voter"""
+    ctx = ctx or await load_write_context(user_address, voter=True)
+    tx_function = contract.functions.registerAsVoter()
+    # Alamat yang sudah terdaftar akan revert: estimasi live yang memberi pesan errornya.
+    # Dibaca dari chain, bukan indexer: store tertinggal INDEXER_CONFIRMATIONS blok
+    gas_key = None
+    voter = ctx.voter_details if ctx.voter_address == ctx.user_address else None
+    if voter is not None and not voter[0]:
+        gas_key = gas_estimator.REGISTER_VOTER_KEY
+    return await build_transact(tx_function, user_address, gas_key)
+
+async def vote(user_address: str, candidate_id: int, ctx: WriteContext = None):
+    """Vote for a candidate"""
+    try:
+        # Voting period, voter and candidate state come from one read at one block
+        ctx = ctx or await load_write_context(user_address, voter=True, candidate_id=candidate_id, voting_period=True)
+        voter_details = ctx.voter_details
+        candidate_details = ctx.candidate_details
+
+        # Check voting period first
+        voting_period = ctx.voting_period
+        if not voting_period["isActive"]:
+            raise Exception(f"Voting period is not active. Current time: {voting_period['currentTime']}, Start: {voting_period['startTime']}, End: {voting_period['endTime']}")
+
+        # Check if voter is registered, or can register with an allowlist proof
+        proof = None
+        if voter_details is None or not voter_details[0]:  # isRegistered
+            proof = _allowlist_proof(user_address, ctx)
+            if proof is None:
+                raise Exception("Voter is not registered")
+        elif voter_details[1]:  # hasVoted
+            raise Exception("Voter has already voted")
+
+        # Check if candidate exists (getCandidateDetails reverts for unknown IDs)
+        if candidate_details is None or candidate_details[0] == 0:  # id
+            raise Exception("Invalid candidate ID")
+
+        if proof is not None:
+            # Registrasi + suara dalam satu transaksi; panjang proof bervariasi, jadi estimasi live
+            tx_function = contract.functions.voteWithProof(candidate_id, proof)
+            logger.info("Preparing vote with allowlist proof", extra={"candidateId": candidate_id, "address": user_address})
+            return await build_transact(tx_function, user_address)
+
+        # If all checks pass, proceed with voting
+        tx_function = contract.functions.vote(candidate_id)
+        logger.info("Preparing vote", extra={"candidateId": candidate_id, "address": user_address})
+        return await build_transact(tx_function, user_address, gas_estimator.vote_key(candidate_details[2] == 0))
+    except Exception as e:
+        logger.info("Vote rejected", extra={"candidateId": candidate_id, "address": user_address, "error": str(e)})
+        raise e
+
+def _allowlist_proof(user_address, ctx):
+    """Proof of user_address from the local allowlist, if its root is the one on chain"""
+    if ctx.voter_merkle_root is None or ctx.is_removed_voter:
+        return None
+    proof = voter_allowlist.get_proof(user_address)
+    if proof is None or proof["root"] != ctx.voter_merkle_root:
+        return None
+    return proof["proof"]
+
+# =============================================
+# Query Functions
+# =============================================
+
+@coalesced
+async def get_all_candidates():
+    """Get all candidates from the contract"""
+    candidates = []
+
+    # Both events in one filter (topic OR), fetched in adaptive block ranges from the deploy block
+    logs = await log_fetcher.get_logs_async(w3, contract.address, config.INDEXER_START_BLOCK, 'latest',
+                                            ("CandidateAdded", "CandidateRemoved"))
+    candidate_ids = active_candidate_ids(abi_codec.decode_logs(logs))
+
+    # Read all candidates in a single batched call
+    results = await multicall.aggregate_async(
+        w3,
+        [contract.functions.candidates(candidate_id) for candidate_id in candidate_ids],
+        allow_failure=True,
+    )
+    for candidate_id, candidate in zip(candidate_ids, results):
+        if candidate is None:
+            logger.warning("Error getting candidate", extra={"candidateId": candidate_id})
+            continue
+        # Additional check to ensure the candidate exists (id should be non-zero)
+        if candidate[0] != 0:  # if id is not 0
+            candidates.append({
+                "id": candidate[0],  # id
+                "name": candidate[1],  # name
+                "voteCount": candidate[2],  # voteCount
+                "imageCID": candidate[3]  # imageCID
+            })
+
+    return candidates
+
+@coalesced
+async def get_candidate_details(candidate_id: int):
+    """Get details of a specific candidate"""
+    try:
+        candidate_details = await contract.functions.getCandidateDetails(candidate_id).call()
+        return {
+            "id": candidate_details[0],
+            "name": candidate_details[1],
+            "voteCount": candidate_details[2],
+            "imageCID": candidate_details[3]
+        }
+    except Exception as e:
+        logger.warning("Error getting candidate details", extra={"candidateId": candidate_id, "error": str(e)})
+        return None
+
+@cached
+@coalesced
+async def get_voter_details(voter_address: str):
+    """Get details of a specific voter"""
+    try:
+        return await contract.functions.getVoterDetails(Web3.to_checksum_address(voter_address)).call()
+    except Exception as e:
+        logger.warning("Error getting voter details", extra={"address": voter_address, "error": str(e)})
+        raise e
+
+# None = belum diketahui; False = deployment lama tanpa getVotersPage
+_voters_page_supported = None
+
+def _voter_rows(addresses, is_registered, has_voted, vote_candidate_ids):
+    return [{"address": addresses[i], "isRegistered": is_registered[i], "hasVoted": has_voted[i], "voteCandidateId": vote_candidate_ids[i]} for i in range(len(addresses))]
+
+@cached
+@coalesced
+async def _get_all_voters(block_identifier="latest"):
+    """All voters through getAllVotersDetails, for deployments that predate getVotersPage"""
+    return _voter_rows(*await contract.functions.getAllVotersDetails().call(block_identifier=block_identifier))
+
+@coalesced
+async def get_voters_page(offset: int, limit: int, block_identifier="latest"):
+    """
+    Get one page of registeredVoters starting at `offset` as of
+    `block_identifier`, plus the offset of the next page. A contract deployed before getVotersPage existed reverts on
+    it; the page is then sliced from getAllVotersDetails (one call per block,
+    so memory is no longer bounded by the page size) until it is redeployed.
+    """
+    global _voters_page_supported
+    if _voters_page_supported is not False:
+        try:
+            *columns, next_offset = await contract.functions.getVotersPage(offset, limit).call(
+                block_identifier=block_identifier)
+            _voters_page_supported = True
+            return _voter_rows(*columns), next_offset
+        except (ContractLogicError, BadFunctionCallOutput) as e:
+            if _voters_page_supported:
+                raise
+            voters = await _get_all_voters(block_identifier)
+            logger.warning("getVotersPage is not available on this deployment, falling back to getAllVotersDetails",
+                           extra={"error": str(e)})
+            _voters_page_supported = False
+    else:
+        voters = await _get_all_voters(block_identifier)
+    page = voters[offset:offset + limit]
+    return page, offset + len(page)
+
+async def stream_voters_json(first_page, cursor: int, limit: int, has_voted: bool = None, vote_candidate_id: int = None,
+                             block_identifier="latest"):
+    """
+    Stream `{"voters": [...], "nextCursor": ...}` as JSON text.
+
+    Pages of VOTERS_PAGE_SIZE are read from the chain one at a time and
+    filtered by hasVoted/voteCandidateId, so memory use is bounded by one
+    page no matter how many voters are registered. `first_page` is the
+    (voters, next_offset) result for `cursor`, read by the route before the
+    response starts so RPC errors can still become an HTTP error; later
+    pages are read at the same `block_identifier`.
+    nextCursor points at the next matching voter, or is null when no
+    voter after this page matches.
+    """
+    yield '{"voters":['
+    count = 0
+    voters, next_offset = first_page
+
+    while voters:
+        for index, voter in enumerate(voters):
+            if has_voted is not None and voter["hasVoted"] != has_voted:
+                continue
+            if vote_candidate_id is not None and voter["voteCandidateId"] != vote_candidate_id:
+                continue
+            if count >= limit:
+                # Pemilih ke-(limit + 1) yang cocok: halaman berikutnya mulai dari dia
+                yield f'],"count":{count},"nextCursor":{cursor + index}}}'
+                return
+            yield ("," if count else "") + dumps(voter).decode()
+            count += 1
+
+        # Halaman yang tidak penuh berarti sudah di ujung daftar
+        if len(voters) < config.VOTERS_PAGE_SIZE:
+            break
+        cursor = next_offset
+        voters, next_offset = await get_voters_page(cursor, config.VOTERS_PAGE_SIZE, block_identifier)
+
+    yield f'],"count":{count},"nextCursor":null}}'
+
+@cached
+@coalesced
+async def get_voter_count():
+    """Get the number of registered voters"""
+    return await contract.functions.getTotalRegisteredVoters().call()
+
+@cached
+@coalesced
+async def get_candidate_count():
+    """Get the number of candidates"""
+    return await contract.functions.getCandidateCount().call()
+
+@cached
+@coalesced
+async def read_voting_period():
+    """Read (startTime, endTime, block timestamp) from the chain"""
+    _, blockchain_time, (start_time, end_time) = await multicall.aggregate_with_block_async(
+        w3, [contract.functions.startTime(), contract.functions.endTime()]
+    )
+    return start_time, end_time, blockchain_time
+
+async def get_voting_period():
+    """Get the current voting period status"""
+    try:
+        # Status depends on server time, so only the chain reads are cached
+        start_time, end_time, blockchain_time = await read_voting_period()
+        return build_voting_period_status(start_time, end_time, blockchain_time)
+    except Exception as e:
+        logger.error("Error getting voting period", extra={"error": str(e)})
+        return None
@@ -0,0 +1,166 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from app import config
+from app.utils.metrics import READ_CACHE_LOOKUPS
+from app.utils.shared_state import is_leader, shared_state
+
+logger = logging.getLogger(__name__)
+
+
+class BlockCache:
+    """
+    LRU cache for contract view calls, keyed by (function, args, block number).
+
+    View results only change when a new block arrives, so the whole cache is
+    dropped in one step whenever set_block() sees a new block number. Entries
+    also expire after `ttl` seconds as a safety net in case block polling
+    stalls. While no block number is known yet, reads bypass the cache.
+
+    With a `shared` SharedState, a local miss is looked up in the results
+    the other workers stored for the same block before it counts as a miss,
+    and every result set here is stored there as well.
+    """
+
+    def __init__(self, max_size=config.CACHE_MAX_SIZE, ttl=config.CACHE_TTL, shared=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared = shared
+        self.block_number = None
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_block(self, block_number):
+        """Record the latest block, invalidating every entry if it changed"""
+        with self._lock:
+            if block_number == self.block_number:
+                return
+            self.block_number = block_number
+            self._entries = OrderedDict()
+            self.invalidations += 1
+
+    def make_key(self, name, args, kwargs):
+        return (name, args, tuple(sorted(kwargs.items())), self.block_number)
+
+    def get(self, key):
+        """Return (True, value) on a hit, (False, None) on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                READ_CACHE_LOOKUPS.inc(result="hit")
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            if self.shared is None:
+                self.misses += 1
+                READ_CACHE_LOOKUPS.inc(result="miss")
+                return False, None
+
+        hit, value = self._get_shared(key)
+        with self._lock:
+            if hit:
+                self.shared_hits += 1
+            else:
+                self.misses += 1
+        READ_CACHE_LOOKUPS.inc(result="shared_hit" if hit else "miss")
+        if hit:
+            self._set_local(key, value)
+        return hit, value
+
+    def _get_shared(self, key):
+        try:
+            return self.shared.cache_get(repr(key[:-1]), key[-1])
+        except Exception as e:
+            logger.warning("Error reading shared cache", extra={"error": str(e)})
+            return False, None
+
+    def set(self, key, value):
+        self._set_local(key, value)
+        if self.shared is not None and key[-1] == self.block_number:
+            try:
+                self.shared.cache_set(repr(key[:-1]), key[-1], value)
+            except Exception as e:
+                logger.warning("Error writing shared cache", extra={"error": str(e)})
+
+    def _set_local(self, key, value):
+        with self._lock:
+            # Jangan simpan hasil dari blok lama yang selesai setelah invalidasi
+            if key[-1] != self.block_number:
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_stats(self):
+        """Get hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "enabled": config.CACHE_ENABLED,
+                "blockNumber": self.block_number,
+                "size": len(self._entries),
+                "maxSize": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "sharedHits": self.shared_hits,
+                "misses": self.misses,
+                "hitRatio": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+block_cache = BlockCache(shared=shared_state)
+
+
+def cached(fn):
+    """Cache the result of an async view function in block_cache"""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        if not config.CACHE_ENABLED or block_cache.block_number is None:
+            return await fn(*args, **kwargs)
+
+        key = block_cache.make_key(fn.__qualname__, args, kwargs)
+        hit, value = block_cache.get(key)
+        if hit:
+            return value
+        value = await fn(*args, **kwargs)
+        block_cache.set(key, value)
+        return value
+
+    return wrapper
+
+
+async def poll_block_number(w3, interval=config.CACHE_BLOCK_POLL_INTERVAL):
+    """
+    Poll eth_blockNumber once per interval and feed it to block_cache.
+
+    With shared state the leader publishes the block number and the other
+    workers read it from there every SHARED_POLL_INTERVAL seconds instead.
+    """
+    while True:
+        try:
+            if is_leader():
+                block_number = await w3.eth.block_number
+                if shared_state is not None and block_number != block_cache.block_number:
+                    shared_state.put("blockNumber", block_number)
+                    shared_state.prune_cache(block_number)
+            else:
+                block_number = shared_state.get("blockNumber")
+            if block_number is not None:
+                block_cache.set_block(block_number)
+        except Exception as e:
+            logger.warning("Error polling block number", extra={"error": str(e)})
+        await asyncio.sleep(interval if is_leader() else min(interval, config.SHARED_POLL_INTERVAL))
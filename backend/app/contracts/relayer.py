@@ -0,0 +1,400 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from eth_account import Account
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+from app import config
+from app.utils import utils
+from app.utils.ballot_signatures import BALLOT_TYPES, ballot_digest, domain_separator, parse_signature, signature_verifier
+from app.utils.metrics import BALLOTS, RELAYED_BATCH_SIZE
+from app.utils.nonce_manager import nonce_manager, next_nonce_async
+from app.contracts import abi_codec
+from app.contracts.indexer import candidate_indexer
+from app.contracts import pemilu_services_async
+from app.contracts.pemilu_services_async import contract, w3
+
+logger = logging.getLogger(__name__)
+
+# Urutan sama dengan enum Pemilu.BallotStatus
+BALLOT_STATUSES = ("Valid", "InvalidSignature", "Expired", "NotRegistered", "AlreadyVoted", "InvalidCandidate")
+
+# Status yang tidak berubah lagi; hanya ini yang boleh dibuang saat _statuses penuh
+SETTLED_STATUSES = ("confirmed", "skipped", "failed")
+
+
+class BallotRejected(Exception):
+    """The ballot cannot be counted; the voter has to fix and sign it again"""
+
+
+class RelayerUnavailable(Exception):
+    """The relayer cannot take ballots right now (not configured or queue full)"""
+
+
+class _Ballot:
+    __slots__ = ("voter", "candidate_id", "deadline", "signature", "queued_at", "attempts")
+
+    def __init__(self, voter, candidate_id, deadline, signature):
+        self.voter = voter
+        self.candidate_id = candidate_id
+        self.deadline = deadline
+        self.signature = signature
+        self.queued_at = time.monotonic()
+        self.attempts = 0
+
+    def as_tuple(self):
+        return self.voter, self.candidate_id, self.deadline, self.signature
+
+
+class BallotRelayer:
+    """
+    Gasless voting: voters sign an EIP-712 Ballot in their wallet and the
+    backend submits it for them through Pemilu.voteBatch().
+
+    submit() checks the ballot against the indexed store (and the chain
+    for a voter or candidate the store does not have yet, since it lags
+    INDEXER_CONFIRMATIONS blocks), recovers the signer through
+    signature_verifier (process pool) and queues it, one ballot per voter.
+    run() sends the queue as one voteBatch transaction signed with
+    RELAYER_PRIVATE_KEY as soon as `batch_size` ballots are waiting, or
+    when the oldest one has waited `flush_interval` seconds. A batch that
+    fails before it is broadcast (gas estimate, RPC error), reverts, or is
+    dropped or replaced before `receipt_timeout` is put back at the front
+    of the queue, up to `max_attempts` times; one still pending in the
+    mempool after the timeout is marked failed so its voters can submit
+    again. Once mined, the BallotSkipped events of the receipt tell which
+    ballots the contract did not count and why.
+
+    Each worker relays the ballots it received itself; nonces of the
+    relayer address come from the (shared) nonce manager, and a ballot
+    submitted to two workers is counted once, the contract skips the other.
+    At most `max_statuses` ballot statuses are kept; past that the oldest
+    settled ones are dropped, and get_ballot() answers for them from the
+    indexed Voted events.
+    """
+
+    def __init__(self, private_key=config.RELAYER_PRIVATE_KEY, batch_size=config.RELAYER_BATCH_SIZE,
+                 flush_interval=config.RELAYER_FLUSH_INTERVAL, max_queue=config.RELAYER_MAX_QUEUE,
+                 max_attempts=config.RELAYER_MAX_ATTEMPTS, receipt_timeout=config.RELAYER_RECEIPT_TIMEOUT,
+                 max_statuses=config.RELAYER_MAX_STATUSES):
+        self.account = Account.from_key(private_key) if private_key else None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.receipt_timeout = receipt_timeout
+        self.max_statuses = max_statuses
+        self.batches_sent = 0
+        self.ballots_sent = 0
+        self._queue = OrderedDict()
+        self._statuses = OrderedDict()
+        self._domain = None
+        self._separator = None
+        self._wakeup = asyncio.Event()
+        self._receipt_tasks = set()
+
+    @property
+    def is_enabled(self):
+        return self.account is not None
+
+    # =============================================
+    # Ballots
+    # =============================================
+
+    async def get_domain(self):
+        """EIP-712 domain of the deployed contract, read once from eip712Domain()"""
+        if self._domain is None:
+            _, name, version, chain_id, verifying_contract, _, _ = await contract.functions.eip712Domain().call()
+            self._separator = domain_separator(name, version, chain_id, verifying_contract)
+            self._domain = {"name": name, "version": version, "chainId": chain_id,
+                            "verifyingContract": Web3.to_checksum_address(verifying_contract)}
+        return self._domain
+
+    async def get_typed_data(self, voter, candidate_id, deadline=None):
+        """Typed data for eth_signTypedData_v4; the wallet signs it and the client POSTs the signature"""
+        if deadline is None:
+            deadline = int(time.time()) + config.BALLOT_DEADLINE_SECONDS
+        return {
+            "types": BALLOT_TYPES,
+            "primaryType": "Ballot",
+            "domain": await self.get_domain(),
+            "message": {"voter": Web3.to_checksum_address(voter), "candidateId": candidate_id, "deadline": deadline},
+        }
+
+    def _reject(self, message):
+        BALLOTS.inc(status="rejected")
+        return BallotRejected(message)
+
+    async def _check_state(self, voter, candidate_id):
+        """Reject what voteBatch would skip, from the indexed state and the chain where the store may lag"""
+        if not candidate_indexer.is_ready:
+            # Tanpa store: kontrak yang menyaring, hasilnya terlihat dari status ballot
+            return
+        voter_details = candidate_indexer.get_voter(voter)
+        if voter_details is None or not voter_details[0]:
+            # Mungkin baru terdaftar dan belum terindeks: tanya chain
+            try:
+                voter_details = await pemilu_services_async.get_voter_details(voter)
+            except Exception:
+                return
+            if not voter_details[0]:
+                raise self._reject("Voter is not registered")
+        if voter_details[1]:
+            raise self._reject("Voter has already voted")
+        if candidate_indexer.get_candidate(candidate_id) is None:
+            # getCandidateDetails revert untuk ID yang tidak ada (None)
+            if await pemilu_services_async.get_candidate_details(candidate_id) is None:
+                raise self._reject("Invalid candidate ID")
+
+    def _is_pending(self, voter):
+        status = self._statuses.get(voter)
+        return status is not None and status["status"] in ("queued", "submitted", "confirmed")
+
+    async def submit(self, voter, candidate_id, deadline, signature):
+        """Verify a signed ballot and queue it for the next batch; raises BallotRejected or RelayerUnavailable"""
+        if not self.is_enabled:
+            raise RelayerUnavailable("Relayer is not configured, set RELAYER_PRIVATE_KEY")
+        voter = Web3.to_checksum_address(voter)
+        signature = parse_signature(signature)
+        if signature is None:
+            raise self._reject("Signature must be 65 bytes of hex (r, s, v)")
+        if deadline <= time.time():
+            raise self._reject("Ballot deadline has passed")
+        if self._is_pending(voter):
+            raise self._reject("A ballot of this voter is already queued or counted")
+        if len(self._queue) >= self.max_queue:
+            raise RelayerUnavailable("Ballot queue is full, try again later")
+        await self._check_state(voter, candidate_id)
+
+        await self.get_domain()
+        signer = await signature_verifier.recover(ballot_digest(self._separator, voter, candidate_id, deadline), signature)
+        if signer != voter:
+            raise self._reject("Signature is not from the voter")
+        # Request lain untuk pemilih yang sama bisa masuk selama verifikasi
+        if self._is_pending(voter):
+            raise self._reject("A ballot of this voter is already queued or counted")
+
+        self._queue[voter] = _Ballot(voter, candidate_id, deadline, signature)
+        self._statuses[voter] = {"voter": voter}
+        self._set_status(voter, "queued", candidateId=candidate_id, deadline=deadline)
+        BALLOTS.inc(status="queued")
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return self.get_ballot(voter)
+
+    def _set_status(self, voter, status, **fields):
+        entry = self._statuses.setdefault(voter, {"voter": voter})
+        entry.update(fields, status=status, updatedAt=int(time.time()))
+        self._statuses.move_to_end(voter)
+        if len(self._statuses) > self.max_statuses:
+            self._prune_statuses()
+
+    def _prune_statuses(self):
+        """Drop the least recently updated settled statuses until max_statuses are left"""
+        excess = len(self._statuses) - self.max_statuses
+        stale = []
+        for voter, entry in self._statuses.items():
+            if len(stale) >= excess:
+                break
+            if entry["status"] in SETTLED_STATUSES:
+                stale.append(voter)
+        for voter in stale:
+            del self._statuses[voter]
+
+    def get_ballot(self, voter):
+        """Status of the voter's relayed ballot, or of the vote indexed from another worker or wallet"""
+        voter = Web3.to_checksum_address(voter)
+        status = self._statuses.get(voter)
+        if status is not None:
+            return dict(status)
+        vote = candidate_indexer.get_vote(voter) if candidate_indexer.is_ready else None
+        if vote is None:
+            return None
+        return {"voter": voter, "status": "confirmed", "candidateId": vote["candidateId"],
+                "txHash": vote["transactionHash"], "blockNumber": vote["blockNumber"]}
+
+    # =============================================
+    # Relaying
+    # =============================================
+
+    def _take_batch(self):
+        ballots = []
+        while self._queue and len(ballots) < self.batch_size:
+            ballots.append(self._queue.popitem(last=False)[1])
+        return ballots
+
+    def _requeue(self, ballots, error):
+        """Put a batch that did not make it on chain back at the front of the queue"""
+        retry = OrderedDict()
+        for ballot in ballots:
+            ballot.attempts += 1
+            if ballot.attempts >= self.max_attempts:
+                self._set_status(ballot.voter, "failed", reason=error)
+                BALLOTS.inc(status="failed")
+            else:
+                retry[ballot.voter] = ballot
+                self._set_status(ballot.voter, "queued", attempts=ballot.attempts, reason=error)
+        retry.update(self._queue)
+        self._queue = retry
+
+    async def flush(self):
+        """Send up to batch_size queued ballots in one voteBatch transaction; returns whether it was broadcast"""
+        ballots = self._take_batch()
+        if not ballots:
+            return True
+        address = self.account.address
+        tx_function = contract.functions.voteBatch([ballot.as_tuple() for ballot in ballots])
+        nonce = sending = None
+        try:
+            (gas_limit, gas_params), nonce = await asyncio.gather(
+                utils.get_gas_parameters_async(tx_function, address),
+                next_nonce_async(w3, address),
+            )
+            tx = await tx_function.build_transaction({"from": address, "nonce": nonce, "gas": gas_limit, **gas_params})
+            signed = self.account.sign_transaction(tx)
+            sending = True
+            tx_hash = "0x" + bytes(await w3.eth.send_raw_transaction(signed.raw_transaction)).hex()
+        except Exception as e:
+            if not nonce_manager.handle_error(address, e):
+                if not sending and nonce is not None:
+                    # Belum dikirim: nonce dikembalikan ke manager
+                    nonce_manager.release(address, nonce)
+                else:
+                    # Mungkin sudah sampai ke node: seed ulang dari chain
+                    nonce_manager.resync(address)
+            logger.warning("Error sending ballot batch, requeued", extra={"ballots": len(ballots), "error": str(e)})
+            self._requeue(ballots, str(e))
+            return False
+
+        self.batches_sent += 1
+        self.ballots_sent += len(ballots)
+        RELAYED_BATCH_SIZE.observe(len(ballots))
+        for ballot in ballots:
+            self._set_status(ballot.voter, "submitted", txHash=tx_hash, reason=None)
+        logger.info("Ballot batch sent", extra={"ballots": len(ballots), "txHash": tx_hash, "nonce": nonce})
+
+        task = asyncio.create_task(self._track_receipt(tx_hash, nonce, ballots))
+        self._receipt_tasks.add(task)
+        task.add_done_callback(self._receipt_tasks.discard)
+        return True
+
+    async def _track_receipt(self, tx_hash, nonce, ballots):
+        """Settle the status of every ballot of a broadcast batch from its receipt"""
+        try:
+            receipt = await w3.eth.wait_for_transaction_receipt(tx_hash, timeout=self.receipt_timeout, poll_latency=1)
+        except Exception as e:
+            logger.warning("No receipt for ballot batch", extra={"txHash": tx_hash, "error": str(e)})
+            receipt = await self._recover_batch(tx_hash, nonce, ballots)
+            if receipt is None:
+                return
+        if receipt["status"] != 1:
+            logger.warning("Ballot batch reverted, requeued", extra={"txHash": tx_hash, "ballots": len(ballots)})
+            self._requeue(ballots, f"transaction {tx_hash} reverted")
+            self._wakeup.set()
+            return
+        self._settle(tx_hash, ballots, receipt)
+
+    async def _recover_batch(self, tx_hash, nonce, ballots):
+        """
+        After receipt_timeout: the receipt if it arrived meanwhile, otherwise
+        requeue a batch that will never be mined (dropped, or its nonce used
+        by another transaction) and fail one that is still pending, so no
+        ballot stays "submitted" and blocks its voter. Returns None when the
+        ballots were settled here.
+        """
+        address = self.account.address
+        try:
+            # Nonce dibaca sebelum receipt: bila batch ini ter-mine di antaranya, receipt-nya tetap terlihat
+            mined_nonce = await w3.eth.get_transaction_count(address)
+            try:
+                return await w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                pass
+            try:
+                await w3.eth.get_transaction(tx_hash)
+                known = True
+            except TransactionNotFound:
+                known = False
+        except Exception as e:
+            self._fail(ballots, f"no receipt for transaction {tx_hash}: {str(e)}")
+            return None
+
+        if mined_nonce > nonce or not known:
+            if mined_nonce <= nonce:
+                # Di-drop dan nonce-nya belum terpakai: seed ulang agar tidak ada celah nonce
+                nonce_manager.resync(address)
+            logger.warning("Ballot batch dropped or replaced, requeued", extra={"txHash": tx_hash, "ballots": len(ballots)})
+            self._requeue(ballots, f"transaction {tx_hash} was dropped or replaced")
+            self._wakeup.set()
+        else:
+            # Masih di mempool (mis. fee terlalu rendah): bisa saja ter-mine nanti, suaranya terlihat lewat indexer
+            self._fail(ballots, f"transaction {tx_hash} still pending after {self.receipt_timeout}s")
+        return None
+
+    def _fail(self, ballots, reason):
+        for ballot in ballots:
+            self._set_status(ballot.voter, "failed", reason=reason)
+            BALLOTS.inc(status="failed")
+
+    def _settle(self, tx_hash, ballots, receipt):
+        """Statuses of a mined batch, from the BallotSkipped events of its receipt"""
+        skipped = {args["voter"]: args["reason"] for event_name, args, _ in abi_codec.decode_logs(receipt["logs"])
+                   if event_name == "BallotSkipped"}
+        for ballot in ballots:
+            if ballot.voter in skipped:
+                self._set_status(ballot.voter, "skipped", reason=BALLOT_STATUSES[skipped[ballot.voter]],
+                                 blockNumber=receipt["blockNumber"])
+                BALLOTS.inc(status="skipped")
+            else:
+                self._set_status(ballot.voter, "confirmed", blockNumber=receipt["blockNumber"])
+                BALLOTS.inc(status="confirmed")
+        logger.info("Ballot batch mined", extra={"txHash": tx_hash, "blockNumber": receipt["blockNumber"],
+                                                 "counted": len(ballots) - len(skipped), "skipped": len(skipped),
+                                                 "gasUsed": receipt["gasUsed"]})
+
+    def _flush_due(self):
+        if len(self._queue) >= self.batch_size:
+            return True
+        return bool(self._queue) and time.monotonic() - next(iter(self._queue.values())).queued_at >= self.flush_interval
+
+    async def run(self):
+        """Flush whenever a batch is full or its oldest ballot waited flush_interval seconds"""
+        while True:
+            timeout = self.flush_interval
+            if self._queue:
+                waited = time.monotonic() - next(iter(self._queue.values())).queued_at
+                timeout = max(0, self.flush_interval - waited)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while self._flush_due():
+                    if not await self.flush():
+                        # Gagal sebelum broadcast: beri jeda sebelum mencoba lagi
+                        await asyncio.sleep(self.flush_interval)
+                        break
+            except Exception:
+                logger.exception("Error relaying ballots")
+
+    def get_status(self):
+        counts = {}
+        for status in self._statuses.values():
+            counts[status["status"]] = counts.get(status["status"], 0) + 1
+        return {
+            "enabled": self.is_enabled,
+            "address": self.account.address if self.is_enabled else None,
+            "queued": len(self._queue),
+            "batchSize": self.batch_size,
+            "flushInterval": self.flush_interval,
+            "batchesSent": self.batches_sent,
+            "ballotsSent": self.ballots_sent,
+            "inFlight": len(self._receipt_tasks),
+            "ballots": counts,
+            "verifier": signature_verifier.get_stats(),
+        }
+
+
+ballot_relayer = BallotRelayer()
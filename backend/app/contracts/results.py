@@ -0,0 +1,172 @@
+import threading
+from array import array
+from datetime import datetime
+from app import config
+from app.contracts.indexer import candidate_indexer
+
+try:
+    import numpy as np
+except ImportError:  # numpy ada di req.txt; fallback Python murni untuk instalasi minimal
+    np = None
+
+
+def rank_candidates(candidates, total_votes):
+    """Candidates by vote count, descending, with competition ranks (1, 2, 2, 4) and vote share"""
+    ranked = []
+    previous_votes, rank = None, 0
+    # sorted() stabil: kandidat dengan suara sama tetap dalam urutan penambahan
+    for position, candidate in enumerate(sorted(candidates, key=lambda c: -c["voteCount"]), start=1):
+        if candidate["voteCount"] != previous_votes:
+            rank, previous_votes = position, candidate["voteCount"]
+        share = candidate["voteCount"] / total_votes if total_votes else 0.0
+        ranked.append({"rank": rank, **candidate, "share": round(share, 4)})
+    return ranked
+
+
+class ResultsEngine:
+    """
+    Read-only election results from the indexed Voted events.
+
+    The timestamp and candidate of every vote are kept in memory as two
+    int64 columns. Each request first appends the votes indexed since the
+    previous one, reading only that block range from the store. When the
+    block the columns were loaded up to is no longer a stored checkpoint
+    with the same hash (rewind, reset or snapshot restore), the columns are
+    reloaded. Totals come from the vote counts the store maintains; time
+    buckets are counted over the columns with NumPy when it is installed
+    and in plain Python otherwise; both count votes for a candidate id the
+    store no longer has (a removed candidate) under "other".
+    """
+
+    def __init__(self, store, use_numpy=np is not None):
+        self.store = store
+        self.use_numpy = use_numpy and np is not None
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._loaded_block = None
+        self._loaded_block_hash = None
+        self._timestamps = array("q")
+        self._candidate_ids = array("q")
+        # bucket_seconds -> (origin, candidate ids, jumlah suara yang sudah dihitung, tabel)
+        self._tables = {}
+
+    def _load(self, last_block, last_block_hash):
+        """Bring the columns up to `last_block`; must run inside a store read transaction"""
+        if self._loaded_block is not None and self.store.get_checkpoint_hash(self._loaded_block) != self._loaded_block_hash:
+            self._clear()
+        if self._loaded_block is None or self._loaded_block > last_block:
+            self._clear()
+            after_block = -1
+        else:
+            after_block = self._loaded_block
+        for timestamp, candidate_id in self.store.get_votes_after(after_block, last_block):
+            self._timestamps.append(timestamp)
+            self._candidate_ids.append(candidate_id)
+        self._loaded_block, self._loaded_block_hash = last_block, last_block_hash
+
+    def _count(self, start, candidate_ids, origin, bucket_seconds, bucket_count):
+        """
+        Votes from column index `start` on per (bucket, candidate), as a
+        bucket_count x (len(candidate_ids) + 1) table. The last column counts
+        votes for an id that is not in `candidate_ids`.
+        """
+        width = len(candidate_ids) + 1
+        if self.use_numpy:
+            timestamps = np.frombuffer(self._timestamps, dtype=np.int64)[start:]
+            voted_for = np.frombuffer(self._candidate_ids, dtype=np.int64)[start:]
+            ids = np.asarray(candidate_ids, dtype=np.int64)
+            if len(ids):
+                order = np.argsort(ids)
+                positions = np.minimum(np.searchsorted(ids, voted_for, sorter=order), len(ids) - 1)
+                columns = order[positions]
+                # searchsorted memberi posisi sisip, bukan kecocokan: id yang tidak dikenal ke kolom terakhir
+                columns = np.where(ids[columns] == voted_for, columns, width - 1)
+            else:
+                columns = np.full(len(voted_for), width - 1, dtype=np.int64)
+            buckets = (timestamps - origin) // bucket_seconds
+            table = np.bincount(buckets * width + columns, minlength=bucket_count * width)
+            return table.reshape(bucket_count, width).tolist()
+
+        column = {candidate_id: i for i, candidate_id in enumerate(candidate_ids)}
+        table = [[0] * width for _ in range(bucket_count)]
+        for i in range(start, len(self._timestamps)):
+            table[(self._timestamps[i] - origin) // bucket_seconds][column.get(self._candidate_ids[i], width - 1)] += 1
+        return table
+
+    def _bucket_counts(self, candidate_ids, origin, bucket_seconds, bucket_count):
+        """Table of _count() over all votes, updated with only the votes added since the last request"""
+        cached = self._tables.get(bucket_seconds)
+        if cached is None or cached[0] != origin or cached[1] != candidate_ids:
+            table = self._count(0, candidate_ids, origin, bucket_seconds, bucket_count)
+        else:
+            table = cached[3]
+            table.extend([0] * (len(candidate_ids) + 1) for _ in range(bucket_count - len(table)))
+            for row, new_row in zip(table, self._count(cached[2], candidate_ids, origin, bucket_seconds, bucket_count)):
+                for i, count in enumerate(new_row):
+                    row[i] += count
+        if len(self._tables) >= 8 and bucket_seconds not in self._tables:
+            self._tables.pop(next(iter(self._tables)))
+        self._tables[bucket_seconds] = (origin, candidate_ids, len(self._timestamps), table)
+        return table
+
+    def _votes_over_time(self, candidate_ids, voting_period, bucket_seconds):
+        if not self._timestamps:
+            return {"bucketSeconds": bucket_seconds, "buckets": []}
+
+        first, last = self._timestamps[0], self._timestamps[-1]
+        start_time = voting_period["startTime"] if voting_period else 0
+        # Bucket pertama dimulai di awal periode voting jika ada, selain itu dibulatkan ke bawah
+        origin = start_time if 0 < start_time <= first else first - first % bucket_seconds
+        bucket_count = (last - origin) // bucket_seconds + 1
+        if bucket_count > config.RESULTS_MAX_BUCKETS:
+            minimum = -(-(last - origin + 1) // config.RESULTS_MAX_BUCKETS)
+            raise ValueError(f"bucket of {bucket_seconds}s gives {bucket_count} buckets, "
+                             f"the limit is {config.RESULTS_MAX_BUCKETS}: use at least {minimum}s")
+
+        table = self._bucket_counts(candidate_ids, origin, bucket_seconds, bucket_count)
+        buckets, cumulative = [], 0
+        for i, row in enumerate(table):
+            votes = sum(row)
+            cumulative += votes
+            buckets.append({
+                "start": origin + i * bucket_seconds,
+                "votes": votes,
+                "cumulative": cumulative,
+                "votesPerMinute": round(votes * 60 / bucket_seconds, 2),
+                "byCandidate": {candidate_id: count for candidate_id, count in zip(candidate_ids, row) if count},
+                "other": row[-1],
+            })
+        return {"bucketSeconds": bucket_seconds, "buckets": buckets}
+
+    def get_results(self, bucket_seconds=config.RESULTS_BUCKET_SECONDS):
+        """Totals, turnout, ranking and votes over time at the last indexed block"""
+        with self._lock, self.store.read_transaction():
+            _, last_block, last_block_hash = self.store.get_checkpoint()
+            self._load(last_block, last_block_hash)
+            candidates = self.store.get_candidates()
+            voting_period = self.store.get_voting_period()
+            registered = self.store.get_meta("registeredVoters")
+            votes_over_time = self._votes_over_time([c["id"] for c in candidates], voting_period, bucket_seconds)
+            total_votes = len(self._timestamps)
+
+        ranked = rank_candidates(candidates, total_votes)
+        leaders = [candidate for candidate in ranked if candidate["rank"] == 1]
+        registered_voters = registered["total"] if registered else None
+        end_time = voting_period["endTime"] if voting_period else 0
+        return {
+            "blockNumber": last_block,
+            "totalVotes": total_votes,
+            "registeredVoters": registered_voters,
+            "turnout": round(total_votes / registered_voters, 4) if registered_voters else None,
+            "votingPeriod": {"startTime": voting_period["startTime"], "endTime": end_time} if voting_period else None,
+            "isFinal": end_time != 0 and int(datetime.now().timestamp()) > end_time,
+            "winner": leaders[0] if total_votes and len(leaders) == 1 else None,
+            "isTie": total_votes > 0 and len(leaders) > 1,
+            "candidates": ranked,
+            "votesOverTime": votes_over_time,
+        }
+
+
+results_engine = ResultsEngine(candidate_indexer.store)
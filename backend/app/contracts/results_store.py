@@ -0,0 +1,360 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Dinaikkan setiap skema berubah: database versi lain dibangun ulang dari chain/snapshot
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS candidates (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    image_cid TEXT NOT NULL,
+    vote_count INTEGER NOT NULL DEFAULT 0,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS voters (
+    address TEXT PRIMARY KEY,
+    is_registered INTEGER NOT NULL,
+    has_voted INTEGER NOT NULL DEFAULT 0,
+    vote_candidate_id INTEGER NOT NULL DEFAULT 0,
+    block_number INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS votes (
+    voter TEXT PRIMARY KEY,
+    candidate_id INTEGER NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    transaction_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS votes_candidate ON votes (candidate_id);
+CREATE INDEX IF NOT EXISTS votes_block ON votes (block_number, log_index);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    block_number INTEGER PRIMARY KEY,
+    block_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS undo (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    block_number INTEGER NOT NULL,
+    table_name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    row TEXT
+);
+"""
+
+TABLES = ("meta", "candidates", "voters", "votes", "checkpoints", "undo")
+
+# Kolom kunci per tabel yang dicatat di undo log
+KEYS = {"candidates": "id", "voters": "address", "votes": "voter"}
+
+
+def _candidate(row):
+    return {"id": row[0], "name": row[1], "voteCount": row[2], "imageCID": row[3]}
+
+
+class ResultsStore:
+    """
+    On-disk copy of the election state built from contract events.
+
+    SQLite in WAL mode: the indexer thread is the only writer and every
+    other thread reads through its own connection without blocking it, so
+    /candidates/{id} and /voters/{address} are served by a primary-key
+    lookup instead of an RPC call.
+
+    Every change records the previous row in an undo log, keyed by the block
+    that caused it. Together with the block hashes in `checkpoints` this lets
+    the indexer roll back to any of the last `history_size` checkpoints on a
+    reorg, after a restart as well. snapshot() writes a consistent copy of
+    the whole database that a fresh replica restores before catching up from
+    the snapshot's block.
+    """
+
+    def __init__(self, path, history_size=64):
+        self.path = path
+        self.history_size = history_size
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    # =============================================
+    # Connections
+    # =============================================
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: commit tanpa fsync, aman dari crash proses (bukan mati listrik)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        with self._lock:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.executescript("".join(f"DROP TABLE IF EXISTS {table};" for table in TABLES))
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.executescript(SCHEMA)
+            self._connections.append(conn)
+        return conn
+
+    @property
+    def conn(self):
+        """Connection of the calling thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    @contextmanager
+    def read_transaction(self):
+        """Run several queries against one consistent state, while the indexer keeps writing"""
+        conn = self.conn
+        conn.execute("BEGIN")
+        try:
+            yield self
+        finally:
+            conn.execute("COMMIT")
+
+    @contextmanager
+    def transaction(self):
+        """Apply a group of changes atomically (one indexer chunk)"""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # =============================================
+    # Meta
+    # =============================================
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def get_checkpoint_hash(self, block_number):
+        """Hash stored for a retained checkpoint, None if it was pruned or rolled back"""
+        row = self.conn.execute("SELECT block_hash FROM checkpoints WHERE block_number = ?", (block_number,)).fetchone()
+        return row[0] if row else None
+
+    def get_checkpoint(self):
+        """(contract address, last block, last block hash) of the stored state"""
+        return self.get_meta("contractAddress"), self.get_meta("lastBlock"), self.get_meta("lastBlockHash")
+
+    def reset(self, contract_address, last_block):
+        """Drop all state, e.g. for another contract or when no checkpoint survived a reorg"""
+        with self.transaction():
+            for table in TABLES:
+                self.conn.execute(f"DELETE FROM {table}")
+            self.set_meta("contractAddress", contract_address)
+            self.set_meta("lastBlock", last_block)
+            self.set_meta("lastBlockHash", None)
+
+    # =============================================
+    # Writes (inside transaction())
+    # =============================================
+
+    def _save_undo(self, block_number, table, key):
+        columns = self.conn.execute(f"SELECT * FROM {table} WHERE {KEYS[table]} = ?", (key,)).fetchone()
+        self.conn.execute(
+            "INSERT INTO undo (block_number, table_name, key, row) VALUES (?, ?, ?, ?)",
+            (block_number, table, json.dumps(key), json.dumps(columns) if columns is not None else None),
+        )
+
+    def add_candidate(self, candidate_id, name, image_cid, block_number, log_index):
+        self._save_undo(block_number, "candidates", candidate_id)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO candidates (id, name, image_cid, vote_count, block_number, log_index) "
+            "VALUES (?, ?, ?, 0, ?, ?)",
+            (candidate_id, name, image_cid, block_number, log_index),
+        )
+
+    def remove_candidate(self, candidate_id, block_number):
+        self._save_undo(block_number, "candidates", candidate_id)
+        self.conn.execute("DELETE FROM candidates WHERE id = ?", (candidate_id,))
+
+    def register_voter(self, address, block_number):
+        self._save_undo(block_number, "voters", address)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO voters (address, is_registered, has_voted, vote_candidate_id, block_number) "
+            "VALUES (?, 1, 0, 0, ?)",
+            (address, block_number),
+        )
+
+    def remove_voter(self, address, block_number):
+        self._save_undo(block_number, "voters", address)
+        self.conn.execute("DELETE FROM voters WHERE address = ?", (address,))
+
+    def record_vote(self, voter, candidate_id, block_number, log_index, timestamp, transaction_hash):
+        """Store the vote and return the candidate's new vote count (None if the candidate is unknown)"""
+        for table, key in (("votes", voter), ("voters", voter), ("candidates", candidate_id)):
+            self._save_undo(block_number, table, key)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO votes (voter, candidate_id, block_number, log_index, timestamp, transaction_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (voter, candidate_id, block_number, log_index, timestamp, transaction_hash),
+        )
+        self.conn.execute("UPDATE voters SET has_voted = 1, vote_candidate_id = ? WHERE address = ?", (candidate_id, voter))
+        row = self.conn.execute(
+            "UPDATE candidates SET vote_count = vote_count + 1 WHERE id = ? RETURNING vote_count", (candidate_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_voting_period(self, start_time, end_time, block_number):
+        self.set_meta("votingPeriod", {"startTime": start_time, "endTime": end_time, "blockNumber": block_number})
+
+    def set_registered_voters(self, total, block_number):
+        """getTotalRegisteredVoters() at `block_number`, the turnout denominator"""
+        self.set_meta("registeredVoters", {"total": total, "blockNumber": block_number})
+
+    def commit_checkpoint(self, block_number, block_hash):
+        """Advance the last processed block and forget undo entries older than the retained checkpoints"""
+        self.set_meta("lastBlock", block_number)
+        self.set_meta("lastBlockHash", block_hash)
+        self.conn.execute("INSERT OR REPLACE INTO checkpoints (block_number, block_hash) VALUES (?, ?)",
+                          (block_number, block_hash))
+        oldest = self.conn.execute(
+            "SELECT block_number FROM checkpoints ORDER BY block_number DESC LIMIT 1 OFFSET ?",
+            (self.history_size - 1,),
+        ).fetchone()
+        if oldest is not None:
+            self.conn.execute("DELETE FROM checkpoints WHERE block_number < ?", (oldest[0],))
+            self.conn.execute("DELETE FROM undo WHERE block_number <= ?", (oldest[0],))
+
+    # =============================================
+    # Reorg
+    # =============================================
+
+    def rewind(self, is_canonical):
+        """
+        Undo every change after the newest checkpoint for which
+        is_canonical(block_number, block_hash) holds.
+
+        Returns the (block_number, block_hash) rewound to, or None if no
+        retained checkpoint is canonical anymore (the caller resets).
+        """
+        checkpoints = self.conn.execute(
+            "SELECT block_number, block_hash FROM checkpoints ORDER BY block_number DESC"
+        ).fetchall()
+        target = next(((number, block_hash) for number, block_hash in checkpoints if is_canonical(number, block_hash)), None)
+        if target is None:
+            return None
+
+        block_number, block_hash = target
+        with self.transaction():
+            undo = self.conn.execute(
+                "SELECT table_name, key, row FROM undo WHERE block_number > ? ORDER BY seq DESC", (block_number,)
+            ).fetchall()
+            for table, key, row in undo:
+                self.conn.execute(f"DELETE FROM {table} WHERE {KEYS[table]} = ?", (json.loads(key),))
+                if row is not None:
+                    values = json.loads(row)
+                    self.conn.execute(f"INSERT INTO {table} VALUES ({', '.join('?' * len(values))})", values)
+            self.conn.execute("DELETE FROM undo WHERE block_number > ?", (block_number,))
+            self.conn.execute("DELETE FROM checkpoints WHERE block_number > ?", (block_number,))
+            self.set_meta("lastBlock", block_number)
+            self.set_meta("lastBlockHash", block_hash)
+        return target
+
+    # =============================================
+    # Snapshot
+    # =============================================
+
+    def snapshot(self, path):
+        """Write a consistent copy of the database to `path` (atomically replaced)"""
+        # Nama sementara per proses: beberapa replika boleh berbagi satu path snapshot
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        # VACUUM INTO membaca dalam satu transaksi: salinan konsisten tanpa menghentikan writer
+        self.conn.execute("VACUUM INTO ?", (tmp_path,))
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def read_snapshot_checkpoint(path):
+        """(contract address, last block) stored in a snapshot file, or None if it is unreadable"""
+        try:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                    return None
+                meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('contractAddress', 'lastBlock')"))
+            finally:
+                conn.close()
+            return json.loads(meta["contractAddress"]), json.loads(meta["lastBlock"])
+        except (sqlite3.Error, KeyError, ValueError):
+            return None
+
+    def restore(self, path):
+        """Replace the whole database with the contents of a snapshot file"""
+        source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            source.backup(self.conn)
+        finally:
+            source.close()
+
+    # =============================================
+    # Query
+    # =============================================
+
+    def get_candidates(self):
+        rows = self.conn.execute(
+            "SELECT id, name, vote_count, image_cid FROM candidates ORDER BY block_number, log_index"
+        ).fetchall()
+        return [_candidate(row) for row in rows]
+
+    def get_candidate(self, candidate_id):
+        row = self.conn.execute(
+            "SELECT id, name, vote_count, image_cid FROM candidates WHERE id = ?", (candidate_id,)
+        ).fetchone()
+        return _candidate(row) if row else None
+
+    def get_voter(self, address):
+        """(isRegistered, hasVoted, voteCandidateId) like getVoterDetails, or None if not stored"""
+        row = self.conn.execute(
+            "SELECT is_registered, has_voted, vote_candidate_id FROM voters WHERE address = ?", (address,)
+        ).fetchone()
+        return (bool(row[0]), bool(row[1]), row[2]) if row else None
+
+    def get_vote(self, voter):
+        row = self.conn.execute(
+            "SELECT candidate_id, block_number, log_index, timestamp, transaction_hash FROM votes WHERE voter = ?", (voter,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"candidateId": row[0], "blockNumber": row[1], "logIndex": row[2], "timestamp": row[3], "transactionHash": row[4]}
+
+    def get_voting_period(self):
+        return self.get_meta("votingPeriod")
+
+    def get_votes_after(self, block_number, last_block):
+        """(timestamp, candidate id) of the votes in blocks (block_number, last_block], in chain order"""
+        return self.conn.execute(
+            "SELECT timestamp, candidate_id FROM votes WHERE block_number > ? AND block_number <= ? "
+            "ORDER BY block_number, log_index",
+            (block_number, last_block),
+        ).fetchall()
+
+    def get_counts(self):
+        candidates, voters, votes = self.conn.execute(
+            "SELECT (SELECT COUNT(*) FROM candidates), (SELECT COUNT(*) FROM voters), (SELECT COUNT(*) FROM votes)"
+        ).fetchone()
+        return {"candidateCount": candidates, "voterCount": voters, "voteCount": votes}
@@ -0,0 +1,85 @@
+import asyncio
+import functools
+from app import config
+from app.contracts.read_cache import block_cache
+from app.utils.metrics import SINGLE_FLIGHT_CALLS
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent async reads into one upstream call.
+
+    The first caller for a key starts the computation as its own task; every
+    caller that arrives while it is still running awaits the same task
+    instead of issuing the RPC calls again. Waiters are shielded from each
+    other, so a client that disconnects does not cancel the read for the
+    rest. Nothing is kept once the task finishes: caching finished results
+    is the job of read_cache.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.upstream = 0
+        self.coalesced = 0
+        self.by_function = {}
+        self._inflight = {}
+
+    def _count(self, name, field):
+        stats = self.by_function.setdefault(name, {"calls": 0, "upstream": 0, "coalesced": 0})
+        stats["calls"] += 1
+        stats[field] += 1
+        self.calls += 1
+        setattr(self, field, getattr(self, field) + 1)
+        SINGLE_FLIGHT_CALLS.inc(outcome=field)
+
+    async def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) once per key among concurrent callers"""
+        name = key[0]
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count(name, "coalesced")
+            return await asyncio.shield(task)
+
+        self._count(name, "upstream")
+        task = asyncio.ensure_future(fn(*args, **kwargs))
+        self._inflight[key] = task
+        task.add_done_callback(functools.partial(self._done, key))
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Tandai exception sudah dibaca jika semua waiter sudah batal
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self):
+        """Get the coalescing ratio overall and per function"""
+        return {
+            "enabled": config.SINGLE_FLIGHT_ENABLED,
+            "inflight": len(self._inflight),
+            "calls": self.calls,
+            "upstream": self.upstream,
+            "coalesced": self.coalesced,
+            "coalescingRatio": self.coalesced / self.calls if self.calls else 0.0,
+            "functions": {
+                name: {**stats, "coalescingRatio": stats["coalesced"] / stats["calls"]}
+                for name, stats in self.by_function.items()
+            },
+        }
+
+
+single_flight = SingleFlight()
+
+
+def coalesced(fn):
+    """Share one in-flight call of an async read among identical concurrent callers"""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        if not config.SINGLE_FLIGHT_ENABLED:
+            return await fn(*args, **kwargs)
+        # Nomor blok ikut di key: satu query upstream per read unik per blok
+        key = block_cache.make_key(fn.__qualname__, args, kwargs)
+        return await single_flight.do(key, fn, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+import threading
+from app import config
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    """One connected client: a bounded queue plus a flag set when it falls behind"""
+
+    def __init__(self, buffer_size):
+        self.queue = asyncio.Queue(maxsize=buffer_size)
+        self.dropped = False
+
+
+class TallyBroadcaster:
+    """
+    Fan-out of indexer changes to live /candidates/stream clients.
+
+    There is one upstream: the candidate indexer calls publish() from its
+    thread with the changes of every chunk it applies. publish() hands them
+    to the event loop, which copies each change into every subscriber's
+    bounded queue. A client whose queue is full is dropped instead of
+    blocking the others or buffering without limit; it can reconnect and
+    start again from a fresh snapshot.
+    """
+
+    def __init__(self, buffer_size=config.TALLY_STREAM_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.published = 0
+        self.dropped = 0
+        self._subscribers = set()
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def attach_loop(self, loop):
+        """Remember the event loop that owns the subscriber queues"""
+        self._loop = loop
+
+    def publish(self, changes):
+        """Thread-safe entry point for the indexer listener"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._fan_out, changes)
+
+    def _fan_out(self, changes):
+        with self._lock:
+            self.published += len(changes)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            for change in changes:
+                try:
+                    subscriber.queue.put_nowait(change)
+                except asyncio.QueueFull:
+                    self._drop(subscriber)
+                    break
+
+    def _drop(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            self.dropped += 1
+        subscriber.dropped = True
+        # Kosongkan antrian supaya sinyal berhenti langsung terbaca oleh client
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def subscribe(self):
+        subscriber = Subscriber(self.buffer_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def get_status(self):
+        """Get subscriber and drop counters"""
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "bufferSize": self.buffer_size,
+                "published": self.published,
+                "dropped": self.dropped,
+            }
+
+
+tally_broadcaster = TallyBroadcaster()
+
+
+async def relay_shared_changes(state, snapshot, interval=config.SHARED_POLL_INTERVAL):
+    """
+    Publish the changes the leader's indexer queued in shared state to this
+    worker's subscribers while it is not the leader (the leader's own
+    indexer publishes directly). If this worker fell behind the queue, the
+    subscribers get a fresh snapshot() instead of the changes it missed.
+    """
+    after_seq = state.last_change_seq()
+    while True:
+        try:
+            if state.is_leader:
+                after_seq = state.last_change_seq()
+            else:
+                changes, after_seq, missed = state.read_changes(after_seq)
+                if missed:
+                    changes = [snapshot()]
+                if changes:
+                    tally_broadcaster.publish(changes)
+        except Exception as e:
+            logger.warning("Error relaying shared changes", extra={"error": str(e)})
+        await asyncio.sleep(interval)
+
+
+async def iter_changes(subscriber, snapshot, keepalive=config.TALLY_STREAM_KEEPALIVE):
+    """
+    Yield the initial snapshot, then every change for one subscriber.
+
+    Yields None every `keepalive` seconds without traffic so the transport
+    can send a heartbeat, and a final {"type": "dropped"} message if the
+    subscriber fell behind.
+    """
+    yield snapshot
+    while True:
+        try:
+            change = await asyncio.wait_for(subscriber.queue.get(), timeout=keepalive)
+        except asyncio.TimeoutError:
+            yield None
+            continue
+        if change is None:
+            if subscriber.dropped:
+                yield {"type": "dropped", "reason": "client too slow, reconnect to resync"}
+            return
+        yield change
+
+
+def format_sse(change):
+    """Format one change as a Server-Sent Events frame (None becomes a comment heartbeat)"""
+    if change is None:
+        return ": keepalive\n\n"
+    return f"event: {change['type']}\ndata: {json.dumps(change)}\n\n"
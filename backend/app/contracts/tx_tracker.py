@@ -0,0 +1,288 @@
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from app import config
+from app.contracts import multicall
+from app.contracts.pemilu_services_async import w3
+from app.contracts.read_cache import block_cache
+from app.utils.metrics import TRACKED_TRANSACTIONS, TX_GAS_USED, function_label, registry
+from app.utils.shared_state import is_leader
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracked_transactions (
+    hash TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    submitted_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    block_number INTEGER,
+    gas_used INTEGER,
+    effective_gas_price INTEGER,
+    function TEXT,
+    sender TEXT
+);
+CREATE INDEX IF NOT EXISTS tracked_transactions_status ON tracked_transactions (status, submitted_at);
+"""
+
+COLUMNS = "hash, status, submitted_at, updated_at, block_number, gas_used, effective_gas_price, function, sender"
+
+TX_HASH_PATTERN = re.compile(r"^0x[0-9a-f]{64}$")
+
+
+class TrackerFull(Exception):
+    """Too many transactions are pending to track another one"""
+
+
+class TransactionUnknown(Exception):
+    """The node knows no transaction with the reported hash"""
+
+
+def normalize_tx_hash(tx_hash):
+    """Lowercase 0x-prefixed hash; raises ValueError for anything that is not a 32-byte hex hash"""
+    tx_hash = tx_hash.strip().lower() if isinstance(tx_hash, str) else ""
+    if not tx_hash.startswith("0x"):
+        tx_hash = "0x" + tx_hash
+    if not TX_HASH_PATTERN.match(tx_hash):
+        raise ValueError("Invalid transaction hash")
+    return tx_hash
+
+
+def _quantity(value):
+    return int(value, 16) if value is not None else None
+
+
+class TransactionTracker:
+    """
+    Status of transactions that clients signed and broadcast themselves.
+
+    The API only prepares transactions; a client reports the hash it got
+    from its wallet with track(), which accepts it only if the node knows
+    the transaction (so made-up hashes cannot fill the pending slots), and
+    the status becomes pending, then
+    confirmed or failed (mined and reverted) once a receipt exists, or
+    dropped when there is still no receipt after `drop_after` seconds and
+    the node no longer knows the transaction.
+
+    Instead of one poller per client, run() checks once per new block and
+    resolves every pending hash with one JSON-RPC batch of
+    eth_getTransactionReceipt per `batch_size` hashes. A hash whose lookup
+    returned an error (rate limit, node hiccup) stays pending; only a real
+    null from eth_getTransactionByHash marks it dropped. The gasUsed of mined
+    transactions goes to the pemilu_tx_gas_used histogram, labelled with
+    the contract function from the transaction input.
+
+    Statuses live in SQLite at `db_path`, so with several workers any of
+    them answers for a hash reported to another; only the leader polls.
+    """
+
+    def __init__(self, db_path=config.TX_TRACKER_DB_PATH, poll_interval=config.TX_TRACKER_POLL_INTERVAL,
+                 batch_size=config.TX_TRACKER_BATCH_SIZE, max_pending=config.TX_TRACKER_MAX_PENDING,
+                 drop_after=config.TX_TRACKER_DROP_AFTER, retention=config.TX_TRACKER_RETENTION):
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.drop_after = drop_after
+        self.retention = retention
+        self.last_block = None
+        self.batches = 0
+        self.resolved = 0
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self):
+        # Satu koneksi per proses, dipakai dari thread event loop
+        if self._conn is None or self._pid != os.getpid():
+            with self._lock:
+                conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("PRAGMA busy_timeout=2000")
+                conn.executescript(SCHEMA)
+                self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _format(self, row):
+        tx_hash, status, submitted_at, updated_at, block_number, gas_used, gas_price, function, sender = row
+        confirmations = None
+        if block_number is not None and block_cache.block_number is not None:
+            confirmations = max(0, block_cache.block_number - block_number + 1)
+        return {
+            "txHash": tx_hash,
+            "status": status,
+            "submittedAt": submitted_at,
+            "updatedAt": updated_at,
+            "blockNumber": block_number,
+            "confirmations": confirmations,
+            "gasUsed": gas_used,
+            "effectiveGasPrice": gas_price,
+            "function": function,
+            "from": sender,
+        }
+
+    # =============================================
+    # Client API
+    # =============================================
+
+    async def track(self, tx_hash):
+        """Start tracking a reported hash (again reporting it is a no-op) and return its status"""
+        tx_hash = normalize_tx_hash(tx_hash)
+        existing = self.get(tx_hash)
+        if existing is not None:
+            return existing
+        pending = self.conn.execute("SELECT COUNT(*) FROM tracked_transactions WHERE status = 'pending'").fetchone()[0]
+        if pending >= self.max_pending:
+            raise TrackerFull(f"{pending} transactions are already pending")
+        [(transaction, error)] = await multicall.rpc_batch_raw_async(w3, "eth_getTransactionByHash", [[tx_hash]])
+        if error is not None:
+            raise Exception(f"Error looking up transaction: {error.get('message', error)}")
+        if transaction is None:
+            raise TransactionUnknown("Transaction is not known to the node, broadcast it first")
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR IGNORE INTO tracked_transactions (hash, status, submitted_at, updated_at) VALUES (?, 'pending', ?, ?)",
+            (tx_hash, now, now),
+        )
+        TRACKED_TRANSACTIONS.inc(status="tracked")
+        return self.get(tx_hash)
+
+    def get(self, tx_hash):
+        """Status of one hash, None if it is not tracked"""
+        row = self.conn.execute(f"SELECT {COLUMNS} FROM tracked_transactions WHERE hash = ?",
+                                (normalize_tx_hash(tx_hash),)).fetchone()
+        return self._format(row) if row is not None else None
+
+    def get_many(self, tx_hashes):
+        """Statuses of several hashes in request order; untracked ones have status "unknown\""""
+        tx_hashes = [normalize_tx_hash(tx_hash) for tx_hash in tx_hashes]
+        rows = {}
+        for start in range(0, len(tx_hashes), 500):
+            part = tx_hashes[start:start + 500]
+            query = f"SELECT {COLUMNS} FROM tracked_transactions WHERE hash IN ({','.join('?' * len(part))})"
+            rows.update((row[0], row) for row in self.conn.execute(query, part))
+        return [
+            self._format(rows[tx_hash]) if tx_hash in rows else {"txHash": tx_hash, "status": "unknown"}
+            for tx_hash in tx_hashes
+        ]
+
+    # =============================================
+    # Resolution
+    # =============================================
+
+    def _pending(self):
+        return self.conn.execute(
+            "SELECT hash, submitted_at FROM tracked_transactions WHERE status = 'pending' ORDER BY submitted_at"
+        ).fetchall()
+
+    async def resolve(self):
+        """Settle the pending hashes that were mined or dropped; returns how many changed status"""
+        pending = self._pending()
+        if not pending:
+            return 0
+        receipts = await multicall.rpc_batch_raw_async(
+            w3, "eth_getTransactionReceipt", [[tx_hash] for tx_hash, _ in pending], self.batch_size
+        )
+        self.batches += 1
+        now = time.time()
+        mined, expired, errors = [], [], 0
+        for (tx_hash, submitted_at), (receipt, error) in zip(pending, receipts):
+            if error is not None:
+                # Error per item (mis. rate limit) bukan berarti belum ter-mine: coba lagi di blok berikutnya
+                errors += 1
+            elif receipt is not None:
+                mined.append((tx_hash, receipt))
+            elif now - submitted_at > self.drop_after:
+                expired.append(tx_hash)
+
+        # Input transaksi (nama fungsi untuk metrics) untuk yang ter-mine, dan cek mempool untuk yang kedaluwarsa
+        lookups = [tx_hash for tx_hash, _ in mined] + expired
+        transactions = await multicall.rpc_batch_raw_async(
+            w3, "eth_getTransactionByHash", [[tx_hash] for tx_hash in lookups], self.batch_size
+        ) if lookups else []
+        inputs = {tx_hash: lookup for tx_hash, lookup in zip(lookups, transactions)}
+
+        updates = []
+        for tx_hash, receipt in mined:
+            tx = inputs[tx_hash][0] or {}
+            function = function_label(tx.get("input")) if tx else None
+            status = "confirmed" if _quantity(receipt.get("status")) == 1 else "failed"
+            gas_used = _quantity(receipt["gasUsed"])
+            updates.append((status, now, _quantity(receipt["blockNumber"]), gas_used,
+                            _quantity(receipt.get("effectiveGasPrice")), function, receipt.get("from"), tx_hash))
+            TRACKED_TRANSACTIONS.inc(status=status)
+            TX_GAS_USED.observe(gas_used, function=function or "unknown")
+        for tx_hash in expired:
+            # Masih dikenal node (mis. fee terlalu rendah) atau lookup gagal: tetap pending
+            tx, error = inputs[tx_hash]
+            if error is not None:
+                errors += 1
+            elif tx is None:
+                updates.append(("dropped", now, None, None, None, None, None, tx_hash))
+                TRACKED_TRANSACTIONS.inc(status="dropped")
+
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "UPDATE tracked_transactions SET status = ?, updated_at = ?, block_number = ?, gas_used = ?, "
+                "effective_gas_price = ?, function = ?, sender = ? WHERE hash = ? AND status = 'pending'",
+                updates,
+            )
+            conn.execute("DELETE FROM tracked_transactions WHERE status != 'pending' AND updated_at < ?",
+                         (now - self.retention,))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self.resolved += len(updates)
+        if updates:
+            logger.info("Tracked transactions settled", extra={"settled": len(updates), "pending": len(pending) - len(updates)})
+        if errors:
+            logger.warning("Lookups of tracked transactions failed, retrying next block", extra={"errors": errors})
+        return len(updates)
+
+    async def run(self):
+        """Resolve pending hashes once per new block, on the leader only"""
+        while True:
+            try:
+                if is_leader() and self.conn.execute(
+                        "SELECT 1 FROM tracked_transactions WHERE status = 'pending' LIMIT 1").fetchone():
+                    # Nomor blok dari read cache bila ada poller-nya, selain itu satu eth_blockNumber
+                    block_number = block_cache.block_number if config.CACHE_ENABLED else None
+                    if block_number is None:
+                        block_number = await w3.eth.block_number
+                    if block_number != self.last_block:
+                        await self.resolve()
+                        self.last_block = block_number
+            except Exception as e:
+                logger.warning("Error resolving tracked transactions", extra={"error": str(e)})
+            await asyncio.sleep(self.poll_interval)
+
+    def count_by_status(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM tracked_transactions GROUP BY status").fetchall())
+
+    def get_status(self):
+        return {
+            "enabled": config.TX_TRACKER_ENABLED,
+            "dbPath": self.db_path,
+            "lastBlock": self.last_block,
+            "batches": self.batches,
+            "resolved": self.resolved,
+            "transactions": self.count_by_status(),
+        }
+
+
+tx_tracker = TransactionTracker()
+
+registry.gauge_callback(
+    "pemilu_tracked_transactions", "Tracked transactions currently stored, by status",
+    lambda: {(status,): count for status, count in tx_tracker.count_by_status().items()} if config.TX_TRACKER_ENABLED else {},
+    ["status"],
+)
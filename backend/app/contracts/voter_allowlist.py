@@ -0,0 +1,327 @@
+"""
+Merkle allowlist of voters, the off-chain half of Pemilu.voteWithProof().
+
+build_allowlist() turns a voter roll (one address per line, or a CSV whose
+first column is the address) into a Merkle tree the way OpenZeppelin's
+MerkleProof verifies it: leaf = keccak256(keccak256(abi.encode(voter))),
+parents hash their two children in sorted order and an odd last node moves
+up a layer unchanged. The roll is streamed; leaves and parent layers are
+hashed in a process pool. Leaves are sorted (through on-disk buckets, so
+memory stays bounded by one bucket), which makes the leaf layer its own
+index: a proof is a binary search in the leaf layer plus one sibling per
+layer, read from the memory-mapped file.
+
+File layout: HEADER (magic, leaf count, layer count), then every layer
+from the leaves up to the root as consecutive 32-byte nodes.
+
+Kept free of web3 imports: the pool processes import this module. Jalankan
+dari folder backend:
+
+    python -m app.contracts.voter_allowlist pemilih.csv --out voter_allowlist.bin
+"""
+import argparse
+import logging
+import mmap
+import multiprocessing
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from eth_utils import is_address, keccak, to_canonical_address, to_checksum_address
+from app import config
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PMLMRKL1"
+HEADER = struct.Struct(">8sQI")
+NODE_SIZE = 32
+# Bucket leaf per byte pertama saat sorting: 64 file sementara, masing-masing disortir di memori
+BUCKET_SHIFT = 2
+BUCKET_COUNT = 256 >> BUCKET_SHIFT
+
+
+def leaf_hash(address):
+    """Leaf of one voter: keccak256(bytes.concat(keccak256(abi.encode(voter))))"""
+    return keccak(keccak(b"\x00" * 12 + to_canonical_address(address)))
+
+
+def hash_pair(a, b):
+    return keccak(a + b) if a <= b else keccak(b + a)
+
+
+def layer_sizes(leaf_count):
+    sizes = [leaf_count]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+# =============================================
+# Pool tasks
+# =============================================
+
+def _hash_roll_lines(lines):
+    """Leaves of a chunk of roll lines, split into buckets; returns (buckets, invalid line count)"""
+    buckets = [bytearray() for _ in range(BUCKET_COUNT)]
+    invalid = 0
+    for line in lines:
+        value = line.split(",", 1)[0].strip().strip('"')
+        if not value or value.lower() == "address":
+            continue
+        if not is_address(value):
+            invalid += 1
+            continue
+        leaf = leaf_hash(value)
+        buckets[leaf[0] >> BUCKET_SHIFT] += leaf
+    return [bytes(bucket) for bucket in buckets], invalid
+
+
+def _hash_layer_range(path, offset, count):
+    """Parents of `count` consecutive nodes at `offset` in `path` (count is even except for the last range)"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        nodes = f.read(count * NODE_SIZE)
+    parents = bytearray()
+    for i in range(0, count - 1, 2):
+        start = i * NODE_SIZE
+        parents += hash_pair(nodes[start:start + NODE_SIZE], nodes[start + NODE_SIZE:start + 2 * NODE_SIZE])
+    if count % 2:
+        parents += nodes[(count - 1) * NODE_SIZE:]
+    return bytes(parents)
+
+# =============================================
+# Build
+# =============================================
+
+def _iter_chunks(f, chunk_size):
+    chunk = []
+    for line in f:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _map_bounded(executor, fn, argument_lists, window):
+    """executor.map() that keeps at most `window` tasks in flight instead of submitting everything up front"""
+    pending = deque()
+    for args in argument_lists:
+        pending.append(executor.submit(fn, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _write_leaves(executor, roll_path, out, workers, chunk_size, bucket_dir):
+    """Hash the roll into bucket files, then append the sorted, deduplicated leaves to `out`"""
+    bucket_files = [open(os.path.join(bucket_dir, f"{i:02x}"), "wb") for i in range(BUCKET_COUNT)]
+    invalid = 0
+    try:
+        with open(roll_path, "r", encoding="utf-8-sig") as roll:
+            chunks = ((chunk,) for chunk in _iter_chunks(roll, chunk_size))
+            for buckets, chunk_invalid in _map_bounded(executor, _hash_roll_lines, chunks, workers * 2):
+                invalid += chunk_invalid
+                for bucket_file, leaves in zip(bucket_files, buckets):
+                    bucket_file.write(leaves)
+    finally:
+        for bucket_file in bucket_files:
+            bucket_file.close()
+
+    leaf_count = duplicates = 0
+    for i in range(BUCKET_COUNT):
+        with open(os.path.join(bucket_dir, f"{i:02x}"), "rb") as f:
+            data = f.read()
+        leaves = sorted(data[j:j + NODE_SIZE] for j in range(0, len(data), NODE_SIZE))
+        unique = [leaf for j, leaf in enumerate(leaves) if j == 0 or leaf != leaves[j - 1]]
+        duplicates += len(leaves) - len(unique)
+        leaf_count += len(unique)
+        out.write(b"".join(unique))
+    return leaf_count, duplicates, invalid
+
+
+def build_allowlist(roll_path, out_path=config.VOTER_ALLOWLIST_PATH, workers=config.VOTER_ALLOWLIST_WORKERS,
+                    chunk_size=config.VOTER_ALLOWLIST_CHUNK_SIZE):
+    """
+    Build the tree of a voter roll into `out_path` (replaced atomically)
+    and return its root, leaf count and what was skipped. Raises
+    ValueError if the roll has no valid address.
+    """
+    started = time.perf_counter()
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    # spawn: aman dipanggil dari thread server yang punya event loop dan koneksi terbuka
+    executor = ProcessPoolExecutor(max(1, workers), mp_context=multiprocessing.get_context("spawn"))
+    try:
+        with tempfile.TemporaryDirectory(prefix="pemilu-allowlist-") as bucket_dir, open(tmp_path, "wb") as out:
+            out.write(HEADER.pack(MAGIC, 0, 0))
+            leaf_count, duplicates, invalid = _write_leaves(executor, roll_path, out, max(1, workers), chunk_size, bucket_dir)
+            if leaf_count == 0:
+                raise ValueError("Voter roll has no valid address")
+
+            sizes = layer_sizes(leaf_count)
+            offset = HEADER.size
+            for size in sizes[:-1]:
+                out.flush()
+                # Rentang genap agar setiap pasangan utuh dalam satu task
+                step = chunk_size + chunk_size % 2
+                ranges = ((tmp_path, offset + start * NODE_SIZE, min(step, size - start)) for start in range(0, size, step))
+                for parents in _map_bounded(executor, _hash_layer_range, ranges, max(1, workers) * 2):
+                    out.write(parents)
+                offset += size * NODE_SIZE
+
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, leaf_count, len(sizes)))
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+    tree = _Tree(out_path)
+    summary = {
+        "root": "0x" + tree.root.hex(),
+        "leaves": leaf_count,
+        "layers": len(sizes),
+        "duplicates": duplicates,
+        "invalid": invalid,
+        "durationMs": round((time.perf_counter() - started) * 1000, 2),
+    }
+    logger.info("Voter allowlist built", extra={"path": out_path, **summary})
+    return summary
+
+# =============================================
+# Proofs
+# =============================================
+
+class _Tree:
+    """Read-only view of one allowlist file through mmap"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            stat = os.fstat(f.fileno())
+        self.version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        magic, self.leaf_count, layer_count = HEADER.unpack_from(self.mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a voter allowlist")
+        self.sizes = layer_sizes(self.leaf_count)
+        if len(self.sizes) != layer_count or len(self.mm) != HEADER.size + sum(self.sizes) * NODE_SIZE:
+            raise ValueError(f"{path} is incomplete or corrupt")
+        self.offsets = []
+        offset = HEADER.size
+        for size in self.sizes:
+            self.offsets.append(offset)
+            offset += size * NODE_SIZE
+        self.root = self.node(len(self.sizes) - 1, 0)
+
+    def node(self, layer, index):
+        start = self.offsets[layer] + index * NODE_SIZE
+        return self.mm[start:start + NODE_SIZE]
+
+    def find_leaf(self, leaf):
+        """Index of `leaf` in the sorted leaf layer, None if it is not there"""
+        low, high = 0, self.leaf_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.node(0, middle) < leaf:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < self.leaf_count and self.node(0, low) == leaf else None
+
+    def proof(self, index):
+        """Sibling of the node on the path at every layer that has one"""
+        siblings = []
+        for layer, size in enumerate(self.sizes[:-1]):
+            sibling = index ^ 1
+            if sibling < size:
+                siblings.append(self.node(layer, sibling))
+            index //= 2
+        return siblings
+
+
+class VoterAllowlist:
+    """
+    Proofs from the allowlist file at `path`.
+
+    The file is mapped on first use and mapped again when it was replaced
+    (a new build, possibly by another worker), checked with one stat() per
+    lookup. Readers keep the tree they started with, so a swap never pulls
+    the mapping from under a request in flight.
+    """
+
+    def __init__(self, path=config.VOTER_ALLOWLIST_PATH):
+        self.path = path
+        self._tree = None
+        self._lock = threading.Lock()
+
+    def _current(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        tree = self._tree
+        if tree is None or tree.version != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+            with self._lock:
+                if self._tree is None or self._tree.version != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+                    self._tree = _Tree(self.path)
+                tree = self._tree
+        return tree
+
+    @property
+    def is_available(self):
+        return self._current() is not None
+
+    @property
+    def root(self):
+        """0x-prefixed root, None without an allowlist file"""
+        tree = self._current()
+        return "0x" + tree.root.hex() if tree is not None else None
+
+    def get_proof(self, address):
+        """Leaf, index and proof (0x-prefixed hex) of a voter, None if the voter is not on the list"""
+        tree = self._current()
+        if tree is None:
+            return None
+        leaf = leaf_hash(address)
+        index = tree.find_leaf(leaf)
+        if index is None:
+            return None
+        return {
+            "address": to_checksum_address(address),
+            "root": "0x" + tree.root.hex(),
+            "leaf": "0x" + leaf.hex(),
+            "index": index,
+            "proof": ["0x" + node.hex() for node in tree.proof(index)],
+        }
+
+    def get_status(self):
+        tree = self._current()
+        if tree is None:
+            return {"available": False, "path": self.path}
+        return {
+            "available": True,
+            "path": self.path,
+            "root": "0x" + tree.root.hex(),
+            "leaves": tree.leaf_count,
+            "layers": len(tree.sizes),
+        }
+
+
+voter_allowlist = VoterAllowlist()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("roll", help="voter roll: one address per line or CSV with the address first")
+    parser.add_argument("--out", default=config.VOTER_ALLOWLIST_PATH)
+    parser.add_argument("--workers", type=int, default=config.VOTER_ALLOWLIST_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=config.VOTER_ALLOWLIST_CHUNK_SIZE)
+    args = parser.parse_args()
+    print(build_allowlist(args.roll, args.out, args.workers, args.chunk_size))
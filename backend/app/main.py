@@ -1,9 +1,83 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app import config
+from app.contracts import pemilu_services_async
+from app.contracts.indexer import candidate_indexer, run_indexer_follower
+from app.contracts.read_cache import poll_block_number
+from app.contracts.relayer import ballot_relayer
+from app.contracts.tally_stream import relay_shared_changes, tally_broadcaster
+from app.contracts.tx_tracker import tx_tracker
 from app.routes import pemilu_routes
+from app.utils.ballot_signatures import signature_verifier
+from app.utils.fee_oracle import run_fee_oracle
+from app.utils.http_responses import CompressionMiddleware
+from app.utils.logger import setup_logging
+from app.utils.metrics import RouteMetricsMiddleware
+from app.utils.rpc_provider import endpoint_pool, run_health_checks
+from app.utils.shared_state import run_leader_election, shared_state
 
-app = FastAPI()
+setup_logging()
 
+
+def on_leadership_change(is_leader):
+    """Only the leader tails the chain; a demoted worker keeps serving reads from the shared store"""
+    if not config.INDEXER_ENABLED:
+        return
+    if is_leader:
+        candidate_indexer.start()
+    else:
+        candidate_indexer.stop(close_store=False)
+
+
+def tally_snapshot():
+    return {"type": "snapshot", "blockNumber": candidate_indexer.last_block,
+            "candidates": candidate_indexer.get_candidates()}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.INDEXER_ENABLED:
+        tally_broadcaster.attach_loop(asyncio.get_running_loop())
+        candidate_indexer.add_listener(tally_broadcaster.publish)
+        if shared_state is None:
+            candidate_indexer.start()
+    # Kontrak di-bind dan RPC dicek di background: worker langsung melayani /health/live
+    background_tasks = [
+        asyncio.create_task(pemilu_services_async.bind_contract()),
+        asyncio.create_task(run_health_checks()),
+    ]
+    if config.CACHE_ENABLED:
+        background_tasks.append(asyncio.create_task(poll_block_number(pemilu_services_async.w3)))
+    if config.FEE_ORACLE_ENABLED:
+        background_tasks.append(asyncio.create_task(run_fee_oracle(pemilu_services_async.w3)))
+    if ballot_relayer.is_enabled:
+        background_tasks.append(asyncio.create_task(ballot_relayer.run()))
+    if config.TX_TRACKER_ENABLED:
+        background_tasks.append(asyncio.create_task(tx_tracker.run()))
+    if shared_state is not None:
+        # Multi-worker: indexer dan polling RPC hanya di leader, worker lain membaca state bersama
+        if config.INDEXER_ENABLED:
+            candidate_indexer.add_listener(shared_state.append_changes)
+            background_tasks.append(asyncio.create_task(run_indexer_follower(shared_state)))
+            background_tasks.append(asyncio.create_task(relay_shared_changes(shared_state, tally_snapshot)))
+        background_tasks.append(asyncio.create_task(run_leader_election(shared_state, on_leadership_change)))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    candidate_indexer.stop()
+    signature_verifier.close()
+    if shared_state is not None:
+        shared_state.release_lease()
+    await endpoint_pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(RouteMetricsMiddleware)
+if config.GZIP_MINIMUM_SIZE > 0:
+    app.add_middleware(CompressionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
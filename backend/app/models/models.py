@@ -5,6 +5,14 @@ class Candidate(BaseModel):
     address: str
     imageCID: str
 
+class NewCandidate(BaseModel):
+    name: str
+    imageCID: str
+
+class BulkCandidates(BaseModel):
+    address: str
+    candidates: list[NewCandidate]
+
 class CandidateDetails(BaseModel):
     id: int
     name: str
@@ -23,6 +31,12 @@ class Vote(BaseModel):
     address: str
     candidateId: int
 
+class SignedBallot(BaseModel):
+    address: str
+    candidateId: int
+    deadline: int
+    signature: str
+
 class SetVotingPeriod(BaseModel):
     address: str
     startTime: int
@@ -33,3 +47,9 @@ class GetWinner(BaseModel):
 
 class StopVotingPeriod(BaseModel):
     address: str
+
+class TrackTransaction(BaseModel):
+    txHash: str
+
+class TransactionStatusQuery(BaseModel):
+    txHashes: list[str]
@@ -1,8 +1,33 @@
-from fastapi import APIRouter, HTTPException, Query
-from app.contracts import pemilu_services
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from starlette.datastructures import UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from app import config
+from app.contracts import bulk_import, pemilu_services_async
+from app.contracts.indexer import candidate_indexer
+from app.contracts.read_cache import block_cache
+from app.contracts.relayer import BallotRejected, RelayerUnavailable, ballot_relayer
+from app.contracts.results import results_engine
+from app.contracts.single_flight import single_flight
+from app.contracts.tally_stream import format_sse, iter_changes, tally_broadcaster
+from app.contracts.tx_tracker import TrackerFull, TransactionUnknown, tx_tracker
+from app.contracts.voter_allowlist import build_allowlist, voter_allowlist
+from app.utils.fee_oracle import fee_oracle
+from app.utils.gas_estimator import gas_estimator
+from app.utils.http_responses import conditional_json, etag_headers, json_response, make_etag, not_modified
+from app.utils.metrics import registry
+from app.utils.nonce_manager import nonce_manager
+from app.utils.rpc_provider import endpoint_pool
+from app.utils.shared_state import shared_state
 from app.models import models
 from web3 import Web3
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 # =============================================
@@ -10,66 +35,158 @@ router = APIRouter()
 # =============================================
 
 @router.get("/")
-def home():
+async def home():
     return {"message": "Hello World"}
 
+@router.get("/health/live")
+async def liveness():
+    """The process is up and serving requests; says nothing about the chain"""
+    return {"status": "ok"}
+
+@router.get("/health/ready")
+async def readiness():
+    """503 until the contract is bound and an RPC endpoint has answered a health probe"""
+    checks = {
+        "contract": pemilu_services_async.contract.is_bound,
+        "rpc": endpoint_pool.is_reachable(),
+    }
+    ready = all(checks.values())
+    return JSONResponse(status_code=200 if ready else 503,
+                        content={"status": "ready" if ready else "not ready", "checks": checks})
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of RPC, route, cache and coalescing metrics"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/indexer/status")
+async def get_indexer_status():
+    return candidate_indexer.get_status()
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    return block_cache.get_stats()
+
+@router.get("/coalescing/stats")
+async def get_coalescing_stats():
+    return single_flight.get_stats()
+
+@router.get("/candidates/stream/status")
+async def get_tally_stream_status():
+    return tally_broadcaster.get_status()
+
+@router.get("/rpc/status")
+async def get_rpc_status():
+    return endpoint_pool.get_status()
+
+@router.get("/workers/status")
+async def get_worker_status():
+    """Role of the worker that answered: leader (tails the chain) or follower"""
+    if shared_state is None:
+        return {"enabled": False}
+    return shared_state.get_status()
+
+@router.get("/fee-oracle/status")
+async def get_fee_oracle_status():
+    return fee_oracle.get_status()
+
+@router.get("/gas/stats")
+async def get_gas_stats():
+    """Cached gas estimates and the adaptive margin per function"""
+    return gas_estimator.get_stats()
+
+@router.get("/relayer/status")
+async def get_relayer_status():
+    """Signed-ballot queue, voteBatch transactions sent and signature verification batches"""
+    return ballot_relayer.get_status()
+
+@router.get("/tx-tracker/status")
+async def get_tx_tracker_status():
+    return tx_tracker.get_status()
+
+@router.get("/nonces/{address}")
+async def get_nonce_status(address: str):
+    if not Web3.is_address(address):
+        raise HTTPException(status_code=400, detail="Invalid Ethereum address")
+    return nonce_manager.get_status(address)
+
+@router.post("/nonces/{address}/resync")
+async def resync_nonce(address: str):
+    """Call after a wallet reports "nonce too low" or a prepared transaction was dropped"""
+    if not Web3.is_address(address):
+        raise HTTPException(status_code=400, detail="Invalid Ethereum address")
+    nonce_manager.resync(address)
+    return {"message": "Nonce will be resynced on the next transaction"}
+
 # =============================================
 # Admin Routes
 # =============================================
 
 @router.post("/admins")
-def add_admin(owner_address: str = Query(..., description="Contract owner address"), 
+async def add_admin(owner_address: str = Query(..., description="Contract owner address"), 
               new_admin_address: str = Query(..., description="New admin address")):
     if not Web3.is_address(owner_address) or not Web3.is_address(new_admin_address):
         raise HTTPException(status_code=400, detail="Invalid Ethereum address")
     
     try:
-        tx = pemilu_services.add_admin(owner_address=owner_address, new_admin_address=new_admin_address)
+        ctx = await pemilu_services_async.load_write_context(owner_address, owner=True)
+        if not ctx.is_owner:
+            raise HTTPException(status_code=403, detail="Only contract owner can add new admins")
+
+        tx = await pemilu_services_async.add_admin(owner_address=owner_address, new_admin_address=new_admin_address, ctx=ctx)
         return {"message": "Admin added successfully", "tx_hash": tx}
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/admins/{admin_address}")
-def remove_admin(admin_address: str, 
+async def remove_admin(admin_address: str, 
                 owner_address: str = Query(..., description="Contract owner address")):
     if not Web3.is_address(owner_address) or not Web3.is_address(admin_address):
         raise HTTPException(status_code=400, detail="Invalid Ethereum address")
     
     try:
-        tx = pemilu_services.remove_admin(owner_address=owner_address, admin_address=admin_address)
+        ctx = await pemilu_services_async.load_write_context(owner_address, owner=True)
+        if not ctx.is_owner:
+            raise HTTPException(status_code=403, detail="Only contract owner can remove admins")
+
+        tx = await pemilu_services_async.remove_admin(owner_address=owner_address, admin_address=admin_address, ctx=ctx)
         return {"message": "Admin removed successfully", "tx_hash": tx}
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/admins/check/{address}")
-def check_admin(address: str):
+async def check_admin(address: str):
     if not Web3.is_address(address):
         raise HTTPException(status_code=400, detail="Invalid Ethereum address")
     
     try:
-        is_admin = pemilu_services.is_admin(address)
+        is_admin = await pemilu_services_async.is_admin(address)
         return {"is_admin": is_admin}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/admins/stop-voting-period")
-def stop_voting_period(data: models.StopVotingPeriod):
+async def stop_voting_period(data: models.StopVotingPeriod):
     if not Web3.is_address(data.address):
         raise HTTPException(status_code=400, detail="Invalid Ethereum address")
     
     try:
-        tx = pemilu_services.stop_voting_period(user_address=data.address)
+        tx = await pemilu_services_async.stop_voting_period(user_address=data.address)
         return {"message": "Voting period stopped successfully", "tx_hash": tx}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/admins/winner")
-def get_winner(data: models.GetWinner):
+async def get_winner(data: models.GetWinner):
     if not Web3.is_address(data.address):
         raise HTTPException(status_code=400, detail="Invalid Ethereum address")
     
     try:
-        winner = pemilu_services.get_winner(user_address=data.address)
+        winner = await pemilu_services_async.get_winner(user_address=data.address)
         return {"winner": winner}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -79,60 +196,199 @@ def get_winner(data: models.GetWinner):
 # Candidate Routes
 # =============================================
 
+def _chain_state(name):
+    """ETag state of a response read from the chain at the read cache's block, None if that block is unknown"""
+    if not pemilu_services_async.contract.is_bound or block_cache.block_number is None:
+        return None
+    return name, pemilu_services_async.contract.address, block_cache.block_number
+
+def _indexer_state(name):
+    """ETag state of a response computed from the indexed store at its checkpoint"""
+    return name, pemilu_services_async.contract.address, candidate_indexer.last_block, candidate_indexer.last_block_hash
+
 @router.get("/candidates")
-def get_candidates():
-    return pemilu_services.get_all_candidates()
+async def get_candidates(request: Request):
+    # Serve from the materialized table once the indexer has caught up
+    if candidate_indexer.is_ready:
+        return await conditional_json(request, _indexer_state("candidates"), candidate_indexer.get_candidates)
+    return await conditional_json(request, _chain_state("candidates"), pemilu_services_async.get_all_candidates)
 
 @router.post("/candidates")
-def add_candidate(data: models.Candidate):
+async def add_candidate(data: models.Candidate):
     if not Web3.is_address(data.address):
         raise HTTPException(status_code=400, detail="Invalid Ethereum address")
     
     try:
         # Verify if the address is an admin
-        if not pemilu_services.is_admin(data.address):
+        ctx = await pemilu_services_async.load_write_context(data.address, admin=True)
+        if not ctx.is_admin:
             raise HTTPException(status_code=403, detail="Only admins can add candidates")
             
-        tx = pemilu_services.add_candidate(user_address=data.address, name=data.name, imageCID=data.imageCID)
+        tx = await pemilu_services_async.add_candidate(user_address=data.address, name=data.name, imageCID=data.imageCID, ctx=ctx)
         return {"message": "Candidate added successfully", "tx_hash": tx}
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/candidates/bulk")
+async def add_candidates(data: models.BulkCandidates):
+    if not Web3.is_address(data.address):
+        raise HTTPException(status_code=400, detail="Invalid Ethereum address")
+    if not data.candidates:
+        raise HTTPException(status_code=400, detail="No candidates given")
+
+    try:
+        ctx = await pemilu_services_async.load_write_context(data.address, admin=True)
+        if not ctx.is_admin:
+            raise HTTPException(status_code=403, detail="Only admins can add candidates")
+
+        txs = await pemilu_services_async.add_candidates(user_address=data.address, candidates=data.candidates, ctx=ctx)
+        return {"message": f"{len(txs)} candidate transactions prepared", "transactions": txs}
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/candidates/import")
+async def import_candidates(request: Request,
+                            address: str = Query(..., description="Admin address"),
+                            format: str = Query(None, description="csv or ndjson, detected from the file if omitted")):
+    """Multipart upload with a `file` field: CSV (name,imageCID) or NDJSON candidate list"""
+    if not Web3.is_address(address):
+        raise HTTPException(status_code=400, detail="Invalid Ethereum address")
+
+    # Parse the form here instead of using File(): FastAPI closes declared
+    # uploads when the route returns, before the streamed response reads it
+    form = await request.form()
+    file = form.get("file")
+    if not isinstance(file, UploadFile):
+        await form.close()
+        raise HTTPException(status_code=400, detail="Missing file upload")
+
+    try:
+        file_format = bulk_import.detect_format(file.filename, file.content_type, format)
+        if not await pemilu_services_async.is_admin(address):
+            raise HTTPException(status_code=403, detail="Only admins can add candidates")
+    except HTTPException as he:
+        await form.close()
+        raise he
+    except ValueError as e:
+        await form.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        await form.close()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(bulk_import.stream_candidate_import(file, file_format, address), media_type="application/x-ndjson")
+
+async def _tally_snapshot():
+    if candidate_indexer.is_ready:
+        candidates = candidate_indexer.get_candidates()
+        block_number = candidate_indexer.last_block
+    else:
+        candidates = await pemilu_services_async.get_all_candidates()
+        block_number = None
+    return {"type": "snapshot", "blockNumber": block_number, "candidates": candidates}
+
+@router.get("/candidates/stream")
+async def stream_candidates(request: Request):
+    """
+    Server-Sent Events feed of live vote counts: one "snapshot" event, then
+    "vote", "candidateAdded" and "candidateRemoved" deltas as the indexer
+    applies them. Slow clients receive a "dropped" event and are disconnected.
+    """
+    if not config.INDEXER_ENABLED:
+        raise HTTPException(status_code=503, detail="Live tally needs the candidate indexer")
+
+    subscriber = tally_broadcaster.subscribe()
+    try:
+        snapshot = await _tally_snapshot()
     except Exception as e:
+        tally_broadcaster.unsubscribe(subscriber)
         raise HTTPException(status_code=500, detail=str(e))
 
+    async def events():
+        try:
+            async for change in iter_changes(subscriber, snapshot):
+                if await request.is_disconnected():
+                    break
+                yield format_sse(change)
+        finally:
+            tally_broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.websocket("/candidates/ws")
+async def candidates_websocket(websocket: WebSocket):
+    """WebSocket variant of /candidates/stream, sending each change as a JSON message"""
+    await websocket.accept()
+    if not config.INDEXER_ENABLED:
+        await websocket.close(code=1013, reason="Live tally needs the candidate indexer")
+        return
+
+    subscriber = tally_broadcaster.subscribe()
+    try:
+        async for change in iter_changes(subscriber, await _tally_snapshot()):
+            await websocket.send_json(change if change is not None else {"type": "keepalive"})
+        await websocket.close(code=1013, reason="Client too slow")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        tally_broadcaster.unsubscribe(subscriber)
+
 @router.get("/candidates/{candidate_id}")
-def get_candidate_details(candidate_id: int):
-    return pemilu_services.get_candidate_details(candidate_id)
+async def get_candidate_details(candidate_id: int):
+    # Indexed lookup once caught up; a candidate added in the last few blocks falls through to the chain
+    if candidate_indexer.is_ready:
+        candidate = candidate_indexer.get_candidate(candidate_id)
+        if candidate is not None:
+            return candidate
+    return await pemilu_services_async.get_candidate_details(candidate_id)
 
 @router.delete("/candidates/{candidate_id}")
-def remove_candidate(data: models.RemoveCandidate):
+async def remove_candidate(data: models.RemoveCandidate):
     if not Web3.is_address(data.address):
         raise HTTPException(status_code=400, detail="Invalid Ethereum address")
     
     try:
         # Verify if the address is an admin
-        if not pemilu_services.is_admin(data.address):
+        ctx = await pemilu_services_async.load_write_context(data.address, admin=True)
+        if not ctx.is_admin:
             raise HTTPException(status_code=403, detail="Only admins can remove candidates")
         
-        tx = pemilu_services.remove_candidate(user_address=data.address, candidate_id=data.candidateId)
+        tx = await pemilu_services_async.remove_candidate(user_address=data.address, candidate_id=data.candidateId, ctx=ctx)
         return {"message": "Candidate removed successfully", "tx_hash": tx}
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/candidates_count")
-def get_candidate_count():
-    return pemilu_services.get_candidate_count()
+async def get_candidate_count():
+    return await pemilu_services_async.get_candidate_count()
 
 # =============================================
 # Voter Routes
 # =============================================
 
+async def _voter_details(address: str):
+    # Indexed lookup once caught up; voters the store does not know yet are read from the chain
+    if candidate_indexer.is_ready:
+        voter_details = candidate_indexer.get_voter(address)
+        if voter_details is not None:
+            return voter_details
+    return await pemilu_services_async.get_voter_details(address)
+
 @router.get("/voters/check/{address}")
-def check_voter(address: str):
+async def check_voter(address: str):
     if not Web3.is_address(address):
         raise HTTPException(status_code=400, detail="Invalid Ethereum address")
     
     try:
         # Get full voter details instead of just is_registered status
-        voter_details = pemilu_services.get_voter_details(address)
+        voter_details = await _voter_details(address)
         return {
             "is_registered": voter_details[0],
             "has_voted": voter_details[1],
@@ -142,38 +398,146 @@ def check_voter(address: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/voters/register")
-def register_voter(address: str = Query(..., description="Voter address")):
+async def register_voter(address: str = Query(..., description="Voter address")):
     if not Web3.is_address(address):
         raise HTTPException(status_code=400, detail="Invalid Ethereum address")
     
     try:
-        tx = pemilu_services.register_voter(address)
+        tx = await pemilu_services_async.register_voter(address)
         return {"message": "Voter registered successfully", "tx_hash": tx}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/voters/import")
+async def import_voters(request: Request,
+                        address: str = Query(..., description="Admin address"),
+                        format: str = Query(None, description="csv or ndjson, detected from the file if omitted")):
+    """Multipart upload with a `file` field: CSV (address) or NDJSON voter roll"""
+    if not Web3.is_address(address):
+        raise HTTPException(status_code=400, detail="Invalid Ethereum address")
+
+    # Parse the form here instead of using File(): FastAPI closes declared
+    # uploads when the route returns, before the streamed response reads it
+    form = await request.form()
+    file = form.get("file")
+    if not isinstance(file, UploadFile):
+        await form.close()
+        raise HTTPException(status_code=400, detail="Missing file upload")
+
+    try:
+        file_format = bulk_import.detect_format(file.filename, file.content_type, format)
+        if not await pemilu_services_async.is_admin(address):
+            raise HTTPException(status_code=403, detail="Only admins can register voters")
+    except HTTPException as he:
+        await form.close()
+        raise he
+    except ValueError as e:
+        await form.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        await form.close()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(bulk_import.stream_voter_import(file, file_format, address), media_type="application/x-ndjson")
+
+def _build_allowlist_from_upload(file):
+    # Builder membaca dari path; salin upload (spooled) ke file sementara dulu
+    with tempfile.NamedTemporaryFile("wb", suffix=".csv", delete=False) as roll:
+        file.file.seek(0)
+        shutil.copyfileobj(file.file, roll)
+    try:
+        return build_allowlist(roll.name)
+    finally:
+        os.remove(roll.name)
+
+@router.get("/voters/allowlist")
+async def get_voter_allowlist():
+    return voter_allowlist.get_status()
+
+@router.post("/voters/allowlist")
+async def upload_voter_allowlist(request: Request, address: str = Query(..., description="Admin address")):
+    """Multipart upload with a `file` field: voter roll (one address per line or CSV with the address first)"""
+    if not Web3.is_address(address):
+        raise HTTPException(status_code=400, detail="Invalid Ethereum address")
+
+    form = await request.form()
+    try:
+        file = form.get("file")
+        if not isinstance(file, UploadFile):
+            raise HTTPException(status_code=400, detail="Missing file upload")
+        ctx = await pemilu_services_async.load_write_context(address, admin=True)
+        if not ctx.is_admin:
+            raise HTTPException(status_code=403, detail="Only admins can set the voter allowlist")
+
+        summary = await asyncio.to_thread(_build_allowlist_from_upload, file)
+        tx = await pemilu_services_async.set_voter_merkle_root(address, summary["root"], summary["leaves"], ctx=ctx)
+        return {"message": "Voter allowlist built", "allowlist": summary, "tx_hash": tx}
+    except HTTPException as he:
+        raise he
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("Error building voter allowlist")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await form.close()
+
+@router.get("/voters/proof/{address}")
+async def get_voter_proof(address: str):
+    if not Web3.is_address(address):
+        raise HTTPException(status_code=400, detail="Invalid Ethereum address")
+    if not voter_allowlist.is_available:
+        raise HTTPException(status_code=503, detail="No voter allowlist has been built")
+
+    proof = voter_allowlist.get_proof(address)
+    if proof is None:
+        raise HTTPException(status_code=404, detail="Address is not on the voter allowlist")
+    return proof
+
 @router.delete("/voters/{voter_address}")
-def remove_voter(data: models.RemoveVoter):
+async def remove_voter(data: models.RemoveVoter):
     if not Web3.is_address(data.address) or not Web3.is_address(data.voterAddress):
         raise HTTPException(status_code=400, detail="Invalid Ethereum address")
     
     try:
-        tx = pemilu_services.remove_voter(user_address=data.address, voter_address=data.voterAddress)
+        tx = await pemilu_services_async.remove_voter(user_address=data.address, voter_address=data.voterAddress)
         return {"message": "Voter removed successfully", "tx_hash": tx}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/voters")
-def get_all_voters():
-    return pemilu_services.get_all_voters()
+async def get_all_voters(request: Request,
+                         cursor: int = Query(0, ge=0, description="nextCursor from the previous page"),
+                         limit: int = Query(100, ge=1, le=config.VOTERS_MAX_LIMIT),
+                         hasVoted: bool = Query(None),
+                         voteCandidateId: int = Query(None)):
+    # Query string ikut menentukan isi, tapi ETag memang per URL
+    state = _chain_state("voters")
+    etag = make_etag(*state) if state is not None and config.HTTP_ETAG_ENABLED else None
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    # Dibaca di blok yang sama dengan ETag-nya: 304 hanya untuk isi yang memang belum berubah
+    block_identifier = state[2] if state is not None else "latest"
+    try:
+        first_page = await pemilu_services_async.get_voters_page(cursor, config.VOTERS_PAGE_SIZE, block_identifier)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        pemilu_services_async.stream_voters_json(first_page, cursor, limit, hasVoted, voteCandidateId, block_identifier),
+        media_type="application/json",
+        headers=etag_headers(etag),
+    )
 
 @router.get("/voters/{voter_address}")
-def get_voter_details(voter_address: str):
+async def get_voter_details(voter_address: str):
     if not Web3.is_address(voter_address):
         raise HTTPException(status_code=400, detail="Invalid Ethereum address")
     
     try:
-        voter_details = pemilu_services.get_voter_details(voter_address)
+        voter_details = await _voter_details(voter_address)
         return {
             "isRegistered": voter_details[0],
             "hasVoted": voter_details[1],
@@ -183,16 +547,16 @@ def get_voter_details(voter_address: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/voters/vote")
-def vote(data: models.Vote):
+async def vote(data: models.Vote):
     if not Web3.is_address(data.address):
         raise HTTPException(status_code=400, detail="Invalid Ethereum address")
     
     try:
-        # Get voting period status first
-        voting_period = pemilu_services.get_voting_period()
-        if not voting_period:
-            raise HTTPException(status_code=500, detail="Failed to get voting period status")
-            
+        # Read voting period, voter and candidate state once, at one block
+        ctx = await pemilu_services_async.load_write_context(
+            data.address, voter=True, candidate_id=data.candidateId, voting_period=True, allowlist=True
+        )
+        voting_period = ctx.voting_period
         if not voting_period["isActive"]:
             raise HTTPException(
                 status_code=400,
@@ -207,40 +571,155 @@ def vote(data: models.Vote):
             )
             
         # Proceed with voting
-        tx = pemilu_services.vote(user_address=data.address, candidate_id=data.candidateId)
+        tx = await pemilu_services_async.vote(user_address=data.address, candidate_id=data.candidateId, ctx=ctx)
         return {"message": "Vote cast successfully", "tx_hash": tx}
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Error voting: {e}")
+        logger.exception("Error voting")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/voters_count")
-def get_voter_count():
-    return pemilu_services.get_voter_count()
+async def get_voter_count():
+    return await pemilu_services_async.get_voter_count()
+
+# =============================================
+# Signed Ballot Routes
+# =============================================
+
+@router.get("/ballots/typed-data")
+async def get_ballot_typed_data(address: str = Query(..., description="Voter address"),
+                                candidateId: int = Query(...),
+                                deadline: int = Query(None, description="Unix time; default now + BALLOT_DEADLINE_SECONDS")):
+    """EIP-712 Ballot for the voter's wallet to sign with eth_signTypedData_v4"""
+    if not Web3.is_address(address):
+        raise HTTPException(status_code=400, detail="Invalid Ethereum address")
+
+    try:
+        return await ballot_relayer.get_typed_data(address, candidateId, deadline)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/ballots", status_code=202)
+async def submit_ballot(data: models.SignedBallot):
+    """
+    Gasless vote: queue a ballot signed by the voter. The relayer counts it
+    on chain in the next voteBatch transaction; poll GET /ballots/{address}.
+    """
+    if not Web3.is_address(data.address):
+        raise HTTPException(status_code=400, detail="Invalid Ethereum address")
+
+    try:
+        ballot = await ballot_relayer.submit(data.address, data.candidateId, data.deadline, data.signature)
+        return {"message": "Ballot queued", "ballot": ballot}
+    except BallotRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RelayerUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.exception("Error submitting ballot")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/ballots/{address}")
+async def get_ballot(address: str):
+    """queued, submitted (txHash), confirmed, skipped (reason from BallotSkipped) or failed"""
+    if not Web3.is_address(address):
+        raise HTTPException(status_code=400, detail="Invalid Ethereum address")
+
+    ballot = ballot_relayer.get_ballot(address)
+    if ballot is None:
+        raise HTTPException(status_code=404, detail="No ballot for this address")
+    return ballot
 
 # =============================================
 # Voting Period Routes
 # =============================================
 
 @router.post("/voters/set-voting-period")
-def set_voting_period(data: models.SetVotingPeriod):
+async def set_voting_period(data: models.SetVotingPeriod):
     if not Web3.is_address(data.address):
         raise HTTPException(status_code=400, detail="Invalid Ethereum address")
 
     try:
-        tx = pemilu_services.set_voting_period(user_address=data.address, start_time=data.startTime, end_time=data.endTime)
+        tx = await pemilu_services_async.set_voting_period(user_address=data.address, start_time=data.startTime, end_time=data.endTime)
         return {"message": "Voting period set successfully", "tx_hash": tx}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 @router.get("/voting-period")
-def get_voting_period():
+async def get_voting_period(request: Request):
     """Get the current voting period status"""
     try:
-        period_status = pemilu_services.get_voting_period()
+        period_status = await pemilu_services_async.get_voting_period()
         if period_status is None:
             raise HTTPException(status_code=500, detail="Failed to get voting period status")
-        return period_status
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+    # Status memakai jam server: ETag dari blok + flag turunan jam, bukan currentTime per detik
+    state = _chain_state("voting-period")
+    etag = None
+    if state is not None:
+        etag = make_etag(*state, period_status["isSet"], period_status["isActive"], period_status["hasEnded"])
+    return json_response(request, period_status, etag)
+
+# =============================================
+# Results Routes
+# =============================================
+
+@router.get("/results")
+async def get_results(request: Request, bucket: int = Query(config.RESULTS_BUCKET_SECONDS, ge=1, description="Seconds per votesOverTime bucket")):
+    """
+    Totals, turnout, ranking and votes over time, computed from the indexed
+    Voted events as of the last indexed block. Reads only, no transaction.
+    """
+    if not candidate_indexer.is_ready:
+        raise HTTPException(status_code=503, detail="Results need the candidate indexer to catch up")
+
+    try:
+        return await conditional_json(request, _indexer_state("results"),
+                                      lambda: asyncio.to_thread(results_engine.get_results, bucket))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# =============================================
+# Transaction Tracking Routes
+# =============================================
+
+@router.post("/tx", status_code=202)
+async def track_transaction(data: models.TrackTransaction):
+    """Report the hash of a broadcast transaction; its receipt is resolved in the background"""
+    if not config.TX_TRACKER_ENABLED:
+        raise HTTPException(status_code=503, detail="Transaction tracking is disabled")
+    try:
+        return await tx_tracker.track(data.txHash)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TransactionUnknown as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TrackerFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/tx/status")
+async def get_transaction_statuses(data: models.TransactionStatusQuery):
+    """Statuses of up to TX_TRACKER_BATCH_SIZE * 10 hashes at once"""
+    if len(data.txHashes) > config.TX_TRACKER_BATCH_SIZE * 10:
+        raise HTTPException(status_code=400, detail=f"At most {config.TX_TRACKER_BATCH_SIZE * 10} hashes per request")
+    try:
+        return {"transactions": tx_tracker.get_many(data.txHashes)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/tx/{tx_hash}")
+async def get_transaction_status(tx_hash: str):
+    try:
+        status = tx_tracker.get(tx_hash)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if status is None:
+        raise HTTPException(status_code=404, detail="Transaction is not tracked")
+    return status
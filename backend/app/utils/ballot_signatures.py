@@ -0,0 +1,169 @@
+"""
+EIP-712 ballots: digest and signer recovery the way Pemilu.hashBallot() and
+OpenZeppelin's ECDSA.tryRecover() compute them.
+
+Recovering a secp256k1 public key with the pure-Python eth_keys backend
+costs several milliseconds of CPU, so SignatureVerifier runs recoveries in
+a process pool, in chunks, instead of on the event loop. This module is
+what the pool processes import: keep it free of web3/RPC imports.
+"""
+import asyncio
+import logging
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from eth_abi import encode
+from eth_keys import keys
+from eth_utils import keccak
+from app import config
+
+logger = logging.getLogger(__name__)
+
+EIP712_DOMAIN_TYPEHASH = keccak(
+    text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)"
+)
+BALLOT_TYPEHASH = keccak(text="Ballot(address voter,uint256 candidateId,uint256 deadline)")
+
+# ECDSA.tryRecover menolak s di paruh atas kurva (tanda tangan malleable)
+SECP256K1_HALF_N = 0x7FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF5D576E7357A4501DDFE92F46681B20A0
+
+# Tipe untuk eth_signTypedData_v4 di wallet
+BALLOT_TYPES = {
+    "EIP712Domain": [
+        {"name": "name", "type": "string"},
+        {"name": "version", "type": "string"},
+        {"name": "chainId", "type": "uint256"},
+        {"name": "verifyingContract", "type": "address"},
+    ],
+    "Ballot": [
+        {"name": "voter", "type": "address"},
+        {"name": "candidateId", "type": "uint256"},
+        {"name": "deadline", "type": "uint256"},
+    ],
+}
+
+
+def domain_separator(name, version, chain_id, verifying_contract):
+    return keccak(encode(
+        ["bytes32", "bytes32", "bytes32", "uint256", "address"],
+        [EIP712_DOMAIN_TYPEHASH, keccak(text=name), keccak(text=version), chain_id, verifying_contract],
+    ))
+
+
+def ballot_digest(separator, voter, candidate_id, deadline):
+    """Digest a voter signs for one ballot, equal to Pemilu.hashBallot()"""
+    struct_hash = keccak(encode(["bytes32", "address", "uint256", "uint256"],
+                                [BALLOT_TYPEHASH, voter, candidate_id, deadline]))
+    return keccak(b"\x19\x01" + separator + struct_hash)
+
+
+def parse_signature(signature):
+    """65-byte r || s || v signature from hex, or None if it is malformed"""
+    try:
+        data = bytes.fromhex(signature.removeprefix("0x"))
+    except (AttributeError, ValueError):
+        return None
+    return data if len(data) == 65 else None
+
+
+def recover_signer(digest, signature):
+    """Checksummed signer of `digest`, or None where ECDSA.tryRecover would return an error"""
+    r = int.from_bytes(signature[:32], "big")
+    s = int.from_bytes(signature[32:64], "big")
+    v = signature[64]
+    if v not in (27, 28) or s > SECP256K1_HALF_N or r == 0 or s == 0:
+        return None
+    try:
+        public_key = keys.Signature(vrs=(v - 27, r, s)).recover_public_key_from_msg_hash(digest)
+    except Exception:
+        return None
+    return public_key.to_checksum_address()
+
+
+def recover_signers(items):
+    """recover_signer() over a list of (digest, signature): the unit of work of one pool task"""
+    return [recover_signer(digest, signature) for digest, signature in items]
+
+
+class SignatureVerifier:
+    """
+    Batched signer recovery off the event loop.
+
+    Concurrent recover() calls are collected until the loop has run the
+    callbacks that were ready (so the ballots of concurrently handled
+    requests end up together) or `batch_size` are waiting, then split in
+    one chunk per pool process. `workers` = 0 recovers in the default
+    thread pool instead, for hosts where extra processes are unwanted.
+    """
+
+    def __init__(self, workers=config.BALLOT_VERIFY_WORKERS, batch_size=config.BALLOT_VERIFY_BATCH_SIZE):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batches = 0
+        self.verified = 0
+        self._executor = None
+        self._pending = []
+
+    def _get_executor(self):
+        if self.workers > 0 and self._executor is None:
+            # spawn: proses pool tidak mewarisi event loop, socket dan thread worker
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def recover(self, digest, signature):
+        """Signer of one digest, or None for an invalid signature"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((digest, signature, future))
+        if len(self._pending) >= self.batch_size:
+            self._dispatch(loop)
+        elif len(self._pending) == 1:
+            loop.call_soon(self._dispatch, loop)
+        return await future
+
+    def _dispatch(self, loop):
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        self.batches += 1
+        self.verified += len(pending)
+        chunk_size = math.ceil(len(pending) / max(1, self.workers))
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            task = loop.run_in_executor(self._get_executor(), recover_signers,
+                                        [(digest, signature) for digest, signature, _ in chunk])
+            task.add_done_callback(lambda task, chunk=chunk: self._resolve(chunk, task))
+
+    def _resolve(self, chunk, task):
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            logger.warning("Error recovering ballot signers", extra={"error": str(error)})
+            if isinstance(error, BrokenProcessPool):
+                # Proses pool mati (mis. OOM): buat pool baru untuk batch berikutnya
+                self.close()
+            for _, _, future in chunk:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, _, future), signer in zip(chunk, task.result()):
+            if not future.done():
+                future.set_result(signer)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self):
+        return {
+            "workers": self.workers,
+            "batchSize": self.batch_size,
+            "batches": self.batches,
+            "verified": self.verified,
+        }
+
+
+signature_verifier = SignatureVerifier()
@@ -0,0 +1,260 @@
+"""
+Chain the service talks to, selected with CHAIN_BACKEND.
+
+- rpc: the endpoints in RPC_URLS and the deployed CONTRACT_ADDRESS (default)
+- eth-tester: an in-process py-evm chain served over JSON-RPC on a local port
+- anvil: a spawned anvil node
+
+The two local backends need no network: when CONTRACT_ADDRESS is not set,
+Pemilu is deployed from the `forge build` artifact in CONTRACT_ARTIFACT
+by the first unlocked dev account, which becomes owner and admin. Both are
+still reached through the pooled HTTP provider, so batching, failover and
+metrics behave the same as against a public RPC.
+
+eth-tester is an optional dependency: pip install "eth-tester[py-evm]"
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from web3._utils.encoding import Web3JsonEncoder
+from app import config
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("rpc", "eth-tester", "anvil")
+
+_rpc_urls = None
+_contract_address = None
+_node_lock = threading.Lock()
+_deploy_lock = threading.Lock()
+
+
+# =============================================
+# eth-tester over JSON-RPC
+# =============================================
+
+def _to_json_rpc(value):
+    """Web3-formatted result -> JSON-RPC wire format (camelCase keys, hex quantities)"""
+    if isinstance(value, dict):
+        return {re.sub(r"_([a-z])", lambda m: m.group(1).upper(), key): _to_json_rpc(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_to_json_rpc(item) for item in value]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return hex(value)
+    return value
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Klien menutup koneksi keep-alive: bukan error
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class EthTesterNode:
+    """
+    JSON-RPC server over an in-process EthereumTester.
+
+    Every transaction is mined into its own block as soon as it is sent.
+    eth-tester is not thread-safe, so requests are executed one at a time.
+    """
+
+    def __init__(self):
+        try:
+            from eth_tester import EthereumTester, PyEVMBackend
+            from web3 import EthereumTesterProvider, Web3
+        except ImportError:
+            raise Exception('CHAIN_BACKEND=eth-tester needs eth-tester: pip install "eth-tester[py-evm]"')
+
+        self.w3 = Web3(EthereumTesterProvider(EthereumTester(PyEVMBackend())))
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _fee_history(self, params):
+        # eth-tester menjawab eth_feeHistory dengan array kosong: isi dari base fee blok terakhir
+        block_count = int(params[0], 16) if isinstance(params[0], str) else int(params[0])
+        percentiles = params[2] if len(params) > 2 else []
+        latest = self.w3.eth.get_block("latest")
+        blocks = min(block_count, latest.number + 1)
+        return {
+            "oldestBlock": latest.number - blocks + 1,
+            "baseFeePerGas": [latest.baseFeePerGas] * (blocks + 1),
+            "gasUsedRatio": [latest.gasUsed / latest.gasLimit] * blocks,
+            "reward": [[0] * len(percentiles) for _ in range(blocks)],
+        }
+
+    def handle(self, request):
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        method, params = request.get("method"), request.get("params") or []
+        try:
+            with self._lock:
+                if method == "eth_feeHistory":
+                    result = self._fee_history(params)
+                else:
+                    result = self.w3.manager.request_blocking(method, params)
+            response["result"] = _to_json_rpc(json.loads(json.dumps(result, cls=Web3JsonEncoder)))
+        except Exception as e:
+            data = getattr(e, "data", None)
+            if data:
+                # Revert: code 3 + data agar klien web3 menaikkan ContractLogicError
+                response["error"] = {"code": 3, "message": f"execution reverted: {getattr(e, 'message', e)}", "data": data}
+            else:
+                response["error"] = {"code": -32000, "message": str(e)}
+        return response
+
+    def serve(self, host="127.0.0.1", port=0):
+        """Start serving on a background thread and return the URL"""
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                result = [node.handle(item) for item in body] if isinstance(body, list) else node.handle(body)
+                data = json.dumps(result).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = _QuietHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="eth-tester-rpc", daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}"
+
+
+# =============================================
+# anvil
+# =============================================
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_anvil(path=config.ANVIL_PATH, port=config.ANVIL_PORT, timeout=10):
+    """Spawn anvil, wait until it answers eth_chainId and return its URL"""
+    executable = shutil.which(path)
+    if executable is None:
+        raise Exception(f"anvil not found at '{path}', install Foundry or set ANVIL_PATH")
+
+    port = port or _free_port()
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen([executable, "--port", str(port), "--silent"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    atexit.register(process.terminate)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise Exception(f"anvil exited with code {process.returncode}")
+        try:
+            requests.post(url, json={"jsonrpc": "2.0", "id": 1, "method": "eth_chainId", "params": []}, timeout=1)
+            logger.info("anvil started", extra={"url": url, "pid": process.pid})
+            return url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.terminate()
+    raise Exception(f"anvil did not start listening on {url} within {timeout}s")
+
+
+# =============================================
+# Backend selection
+# =============================================
+
+def get_rpc_urls():
+    """RPC_URLS value for the endpoint pool; starts the local node on first use"""
+    global _rpc_urls
+    with _node_lock:
+        if _rpc_urls is None:
+            if config.CHAIN_BACKEND not in BACKENDS:
+                raise Exception(f"Unknown CHAIN_BACKEND '{config.CHAIN_BACKEND}', expected one of {', '.join(BACKENDS)}")
+            if config.CHAIN_BACKEND == "rpc":
+                _rpc_urls = config.RPC_URLS
+            else:
+                url = EthTesterNode().serve() if config.CHAIN_BACKEND == "eth-tester" else start_anvil()
+                # Node lokal: tanpa rate limit
+                _rpc_urls = f"{url}|0"
+        return _rpc_urls
+
+
+def load_artifact(path=config.CONTRACT_ARTIFACT):
+    """ABI and creation bytecode from a forge artifact"""
+    if not os.path.exists(path):
+        raise Exception(f"Contract artifact not found at {path}, run `forge build` in contract/ or set CONTRACT_ARTIFACT")
+    with open(path, "r") as f:
+        artifact = json.load(f)
+    bytecode = artifact["bytecode"]
+    return artifact["abi"], bytecode["object"] if isinstance(bytecode, dict) else bytecode
+
+
+def deploy_pemilu(w3, path=config.CONTRACT_ARTIFACT):
+    """Deploy Pemilu from the first unlocked account and return its address"""
+    abi, bytecode = load_artifact(path)
+    deployer = w3.eth.accounts[0]
+    tx_hash = w3.eth.contract(abi=abi, bytecode=bytecode).constructor().transact({"from": deployer})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    logger.info("Pemilu deployed", extra={"address": receipt.contractAddress, "owner": deployer,
+                                           "blockNumber": receipt.blockNumber})
+    return receipt.contractAddress
+
+
+def get_contract_address(w3):
+    """CONTRACT_ADDRESS, or a fresh deployment when running on a local backend without one"""
+    global _contract_address
+    if config.CONTRACT_ADDRESS:
+        return config.CONTRACT_ADDRESS
+    if config.CHAIN_BACKEND == "rpc":
+        raise Exception("CONTRACT_ADDRESS is not set")
+    with _deploy_lock:
+        if _contract_address is None:
+            _contract_address = deploy_pemilu(w3)
+        return _contract_address
+
+
+class LazyContract:
+    """
+    Web3 contract bound on first use instead of at import.
+
+    Any contract attribute (functions, events, address, ...) resolves the
+    address and builds the contract once, so importing the services does
+    no RPC and a slow or unreachable node cannot crash a booting worker.
+    """
+
+    def __init__(self, w3, abi, get_address):
+        self.w3 = w3
+        self.abi = abi
+        self._get_address = get_address
+        self._contract = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_bound(self):
+        return self._contract is not None
+
+    def resolve(self):
+        if self._contract is None:
+            with self._lock:
+                if self._contract is None:
+                    self._contract = self.w3.eth.contract(address=self._get_address(), abi=self.abi)
+        return self._contract
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import statistics
+import threading
+from web3 import Web3
+from app import config
+from app.utils.shared_state import is_leader, shared_state
+
+logger = logging.getLogger(__name__)
+
+
+class FeeOracle:
+    """
+    In-memory source of chain ID and EIP-1559 fee parameters.
+
+    The chain ID is read once at startup. Base fee and priority fee are
+    refreshed in the background whenever a new block is seen, from a
+    `fee_history` window of FEE_HISTORY_BLOCKS blocks at the
+    FEE_REWARD_PERCENTILE reward percentile, so building a transaction only
+    needs a memory read instead of two RPC round-trips.
+    """
+
+    def __init__(self, history_blocks=config.FEE_HISTORY_BLOCKS,
+                 reward_percentile=config.FEE_REWARD_PERCENTILE,
+                 base_fee_multiplier=config.FEE_BASE_FEE_MULTIPLIER):
+        self.history_blocks = history_blocks
+        self.reward_percentile = reward_percentile
+        self.base_fee_multiplier = base_fee_multiplier
+
+        self.chain_id = None
+        self.block_number = None
+        self.base_fee = None
+        self.priority_fee = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_ready(self):
+        return self.chain_id is not None and self.base_fee is not None
+
+    def update(self, block_number, fee_history):
+        """Derive base fee and priority fee from a fee_history response"""
+        # Entri terakhir baseFeePerGas adalah base fee untuk blok berikutnya
+        base_fee = fee_history["baseFeePerGas"][-1]
+        rewards = [reward[0] for reward in fee_history.get("reward") or [] if reward]
+        priority_fee = int(statistics.median(rewards)) if rewards else 0
+
+        with self._lock:
+            self.block_number = block_number
+            self.base_fee = base_fee
+            self.priority_fee = priority_fee
+
+    def load(self, status):
+        """Take over the state another worker published (its get_status())"""
+        if status is None:
+            return
+        with self._lock:
+            self.chain_id = status["chainId"]
+            self.block_number = status["blockNumber"]
+            self.base_fee = status["baseFeePerGas"]
+            self.priority_fee = status["priorityFeePerGas"]
+
+    async def refresh(self, w3):
+        """Fetch chain ID (once) and a fresh fee window if a new block arrived"""
+        if self.chain_id is None:
+            self.chain_id = await w3.eth.chain_id
+
+        block_number = await w3.eth.block_number
+        if block_number == self.block_number:
+            return
+        fee_history = await w3.eth.fee_history(self.history_blocks, block_number, [self.reward_percentile])
+        self.update(block_number, fee_history)
+
+    def get_gas_params(self, extra_gwei=2):
+        """
+        Get EIP-1559 fee parameters from memory.
+
+        The priority fee is the window's percentile tip, but never less than
+        `extra_gwei`. maxFeePerGas leaves room for the base fee to rise for a
+        few blocks, since the cached base fee may already be a block old.
+
+        Returns:
+        - dict {maxFeePerGas, maxPriorityFeePerGas, type, chainId}, or None if not ready
+        """
+        if not self.is_ready:
+            return None
+        with self._lock:
+            max_priority_fee = max(self.priority_fee, Web3.to_wei(extra_gwei, "gwei"))
+            max_fee = self.base_fee * self.base_fee_multiplier + max_priority_fee
+            return {
+                "maxFeePerGas": max_fee,
+                "maxPriorityFeePerGas": max_priority_fee,
+                "type": 2,
+                "chainId": self.chain_id,
+            }
+
+    def get_status(self):
+        """Get the current oracle state"""
+        with self._lock:
+            return {
+                "isReady": self.is_ready,
+                "chainId": self.chain_id,
+                "blockNumber": self.block_number,
+                "baseFeePerGas": self.base_fee,
+                "priorityFeePerGas": self.priority_fee,
+                "historyBlocks": self.history_blocks,
+                "rewardPercentile": self.reward_percentile,
+            }
+
+
+fee_oracle = FeeOracle()
+
+
+async def run_fee_oracle(w3, interval=config.FEE_ORACLE_POLL_INTERVAL):
+    """Keep fee_oracle refreshed once per block; with shared state only the leader calls the RPC"""
+    while True:
+        try:
+            if is_leader():
+                await fee_oracle.refresh(w3)
+                if shared_state is not None and fee_oracle.is_ready:
+                    shared_state.put("feeOracle", fee_oracle.get_status())
+            else:
+                fee_oracle.load(shared_state.get("feeOracle"))
+        except Exception as e:
+            logger.warning("Error refreshing fee oracle", extra={"error": str(e)})
+        await asyncio.sleep(interval)
@@ -0,0 +1,241 @@
+import logging
+import math
+import threading
+import time
+from app import config
+from app.contracts import multicall
+from app.utils.metrics import GAS_ESTIMATES, function_label
+from app.utils.shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+
+def _words(text):
+    """Storage slots a string argument adds: strings under 32 bytes share the slot of their length"""
+    size = len(text.encode())
+    return 0 if size < 32 else (size + 31) // 32
+
+
+def gas_key(function_name, *state):
+    """Cache key of a call: the function plus the contract state that changes its gas use"""
+    return ":".join([function_name, *(str(int(value)) for value in state)])
+
+
+def vote_key(first_vote):
+    # Suara pertama kandidat menulis slot voteCount dari nol: jauh lebih mahal
+    return gas_key("vote", first_vote)
+
+
+def add_candidate_key(name, image_cid):
+    return gas_key("addCandidate", _words(name), _words(image_cid))
+
+
+REGISTER_VOTER_KEY = gas_key("registerAsVoter")
+REMOVE_VOTER_KEY = gas_key("removeVoter")
+
+
+class _Entry:
+    """Cached estimate of one key plus an exponentially weighted mean/variance of observed gasUsed"""
+
+    __slots__ = ("estimate", "estimated_at", "samples", "mean", "variance", "max_used")
+
+    def __init__(self):
+        self.estimate = None
+        self.estimated_at = 0.0
+        self.samples = 0
+        self.mean = 0.0
+        self.variance = 0.0
+        self.max_used = 0
+
+
+class GasEstimator:
+    """
+    Gas limits for contract calls whose gas use is (nearly) constant for a
+    given contract state, so preparing one does not need an estimate_gas
+    round-trip.
+
+    A key is the function plus the bit of state that changes its gas use
+    (see gas_key()). The first prepare of a key asks the node and the
+    estimate is reused for `ttl` seconds. The safety margin on top starts
+    at `default_margin` (the old fixed buffer); once `min_samples` receipts
+    of the key were seen it becomes `sigmas` standard deviations of their
+    gasUsed, at least `min_margin`. A receipt that used more gas than the
+    cached estimate drops it, so the next prepare asks the node again.
+
+    Callers only pass a key once they have checked the preconditions of
+    the call themselves: a call that may revert keeps its live estimate,
+    which is what reports the revert reason.
+    """
+
+    def __init__(self, ttl=config.GAS_CACHE_TTL, default_margin=50000,
+                 min_margin=config.GAS_MIN_MARGIN, sigmas=config.GAS_MARGIN_SIGMAS,
+                 min_samples=config.GAS_MIN_SAMPLES, window=config.GAS_SAMPLE_WINDOW):
+        self.ttl = ttl
+        self.default_margin = default_margin
+        self.min_margin = min_margin
+        self.sigmas = sigmas
+        self.min_samples = min_samples
+        self.window = window
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _margin(self, entry):
+        if entry.samples < self.min_samples:
+            return self.default_margin
+        return max(self.min_margin, math.ceil(self.sigmas * math.sqrt(entry.variance)))
+
+    def get_gas_limit(self, key):
+        """Cached estimate plus margin, or None if the node has to be asked"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.estimate is None or time.monotonic() - entry.estimated_at > self.ttl:
+                self.misses += 1
+                GAS_ESTIMATES.inc(source="live")
+                return None
+            self.hits += 1
+            GAS_ESTIMATES.inc(source="cache")
+            return entry.estimate + self._margin(entry)
+
+    def record_estimate(self, key, estimated_gas):
+        """Cache a live estimate_gas result and return the gas limit to use with it"""
+        with self._lock:
+            entry = self._entries.setdefault(key, _Entry())
+            entry.estimate = estimated_gas
+            entry.estimated_at = time.monotonic()
+            return estimated_gas + self._margin(entry)
+
+    def observe(self, key, gas_used):
+        """Calibrate a key with the gasUsed of a mined transaction"""
+        with self._lock:
+            entry = self._entries.setdefault(key, _Entry())
+            self._add_sample(entry, gas_used)
+            if entry.estimate is not None and gas_used > entry.estimate:
+                logger.info("Gas estimate too low, re-estimating",
+                            extra={"key": key, "estimate": entry.estimate, "gasUsed": gas_used})
+                entry.estimate = None
+
+    def _add_sample(self, entry, gas_used):
+        # Rata-rata & varians berbobot eksponensial: sampel lama memudar setelah `window` receipt
+        entry.samples += 1
+        alpha = max(1 / entry.samples, 1 / self.window)
+        delta = gas_used - entry.mean
+        entry.mean += alpha * delta
+        entry.variance = (1 - alpha) * (entry.variance + alpha * delta * delta)
+        entry.max_used = max(entry.max_used, gas_used)
+
+    # =============================================
+    # Calibration from indexed events
+    # =============================================
+
+    def _event_key(self, event_name, args, change):
+        """(key, function) of the single call that emitted an indexed event, None if it is not a cached call"""
+        if event_name == "Voted":
+            # Tanpa change: suara duplikat yang tidak mengubah store
+            return (vote_key(change["voteCount"] == 1), "vote") if change is not None else None
+        if event_name == "CandidateAdded":
+            return add_candidate_key(args["name"], args["imageCID"]), "addCandidate"
+        if event_name == "VoterRegistered":
+            return REGISTER_VOTER_KEY, "registerAsVoter"
+        if event_name == "VoterRemoved":
+            return REMOVE_VOTER_KEY, "removeVoter"
+        return None
+
+    def calibrate(self, w3, events, limit=config.GAS_CALIBRATION_SAMPLES):
+        """
+        Observe the receipts of up to `limit` transactions behind the
+        indexed (event name, args, log, change) tuples of one chunk, least
+        sampled keys first, in one JSON-RPC batch. Keys with a full window
+        get one receipt per chunk at most, so a backfill stays cheap.
+        """
+        candidates = {}
+        for event_name, args, log, change in events:
+            event_key = self._event_key(event_name, args, change)
+            if event_key is not None:
+                candidates.setdefault("0x" + bytes(log["transactionHash"]).hex(), (*event_key, args))
+        if not candidates or limit <= 0:
+            return
+
+        with self._lock:
+            samples = {key: entry.samples for key, entry in self._entries.items()}
+        chosen, refreshed = [], False
+        for tx_hash, (key, function, args) in sorted(candidates.items(), key=lambda item: samples.get(item[1][0], 0)):
+            # Key yang window-nya sudah penuh cukup satu receipt per chunk untuk mendeteksi perubahan
+            if samples.get(key, 0) >= self.window:
+                if refreshed:
+                    continue
+                refreshed = True
+            chosen.append((tx_hash, (key, function, args)))
+            if len(chosen) == limit:
+                break
+
+        tx_hashes = [tx_hash for tx_hash, _ in chosen]
+        try:
+            receipts = multicall.get_transaction_receipts(w3, tx_hashes)
+            transactions = multicall.get_transactions(w3, tx_hashes)
+        except Exception as e:
+            logger.warning("Error fetching receipts for gas calibration", extra={"error": str(e)})
+            return
+
+        for (_, (key, function, args)), receipt, tx in zip(chosen, receipts, transactions):
+            if receipt is None or tx is None or receipt["status"] != 1:
+                continue
+            # Hanya panggilan tunggal: voteBatch/addCandidates/registerVoters dengan satu item juga
+            # memancarkan satu event, tapi gas-nya (ECDSA, calldata array) berpola lain
+            if function_label("0x" + bytes(tx["input"]).hex()) != function:
+                continue
+            if function in ("vote", "registerAsVoter") and receipt["from"] != args["voter"]:
+                continue
+            self.observe(key, receipt["gasUsed"])
+
+        if shared_state is not None:
+            shared_state.put("gasObservations", self.export_observations())
+
+    def export_observations(self):
+        """Receipt statistics per key, for the workers that do not index"""
+        with self._lock:
+            return {
+                key: {"samples": e.samples, "mean": e.mean, "variance": e.variance, "maxUsed": e.max_used}
+                for key, e in self._entries.items() if e.samples
+            }
+
+    def load_observations(self, observations):
+        """Take over the receipt statistics of the leader; cached estimates stay local"""
+        for key, stats in (observations or {}).items():
+            with self._lock:
+                entry = self._entries.setdefault(key, _Entry())
+                if stats["samples"] == entry.samples:
+                    continue
+                entry.samples = stats["samples"]
+                entry.mean = stats["mean"]
+                entry.variance = stats["variance"]
+                entry.max_used = stats["maxUsed"]
+                if entry.estimate is not None and entry.max_used > entry.estimate:
+                    entry.estimate = None
+
+    def get_stats(self):
+        """Get hit/miss counters and the estimate and margin per key"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": config.GAS_CACHE_ENABLED,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRatio": self.hits / lookups if lookups else 0.0,
+                "ttl": self.ttl,
+                "keys": {
+                    key: {
+                        "estimate": e.estimate,
+                        "margin": self._margin(e),
+                        "samples": e.samples,
+                        "meanGasUsed": round(e.mean),
+                        "stdGasUsed": round(math.sqrt(e.variance)),
+                        "maxGasUsed": e.max_used,
+                    }
+                    for key, e in self._entries.items()
+                },
+            }
+
+
+gas_estimator = GasEstimator()
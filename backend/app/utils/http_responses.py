@@ -0,0 +1,128 @@
+"""
+Response helpers for the read routes polled by dashboards.
+
+- ETags: a read route tags its response with the state it was computed
+  from (the block number of the read cache, or the indexer checkpoint) and
+  answers 304 without computing or sending the body when the client's
+  If-None-Match still names that state.
+- FastJSONResponse serializes with orjson, which skips FastAPI's
+  jsonable_encoder pass and is several times faster than the json module
+  on the candidate and results payloads.
+- CompressionMiddleware gzips bodies above GZIP_MINIMUM_SIZE, except live
+  streams (SSE tally, NDJSON import progress) that must reach the client
+  event by event.
+"""
+import hashlib
+import inspect
+import json
+from fastapi.responses import JSONResponse, Response
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from app import config
+
+try:
+    import orjson
+except ImportError:  # orjson ada di req.txt; fallback untuk instalasi minimal
+    orjson = None
+
+
+def dumps(content):
+    """JSON bytes of `content`; integers beyond 64 bits (uint256) fall back to the json module"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(content, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serialized by dumps(); return it directly so FastAPI does not encode the content first"""
+
+    def render(self, content):
+        return dumps(content)
+
+# =============================================
+# ETags
+# =============================================
+
+def make_etag(*state):
+    """Weak ETag of the state a response was computed from"""
+    digest = hashlib.blake2b(":".join(str(part) for part in state).encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against `etag` (RFC 9110 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def etag_headers(etag):
+    # no-cache: klien boleh menyimpan, tapi wajib revalidasi dengan If-None-Match setiap kali
+    return {"ETag": etag, "Cache-Control": "no-cache"} if etag else {}
+
+
+def not_modified(request, etag):
+    """304 response if the request's If-None-Match names `etag`, otherwise None"""
+    if etag and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=etag_headers(etag))
+    return None
+
+
+def json_response(request, content, etag=None):
+    """FastJSONResponse of `content`, or 304 if the client already has `etag`"""
+    etag = etag if config.HTTP_ETAG_ENABLED else None
+    return not_modified(request, etag) or FastJSONResponse(content, headers=etag_headers(etag))
+
+
+async def conditional_json(request, state, build):
+    """
+    JSON response of build() (a function or coroutine function) tagged with
+    `state`, a tuple, or None when the state is unknown and the response
+    cannot be tagged. A client that already has the tag gets 304 and
+    build() is not called at all.
+    """
+    etag = make_etag(*state) if state is not None and config.HTTP_ETAG_ENABLED else None
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+    content = build()
+    if inspect.isawaitable(content):
+        content = await content
+    return FastJSONResponse(content, headers=etag_headers(etag))
+
+# =============================================
+# Compression
+# =============================================
+
+# Stream live: gzip menahan event di buffer kompresor sampai buffer penuh
+UNCOMPRESSED_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+class _SelectiveGZipResponder(GZipResponder):
+    async def send_with_gzip(self, message):
+        await super().send_with_gzip(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            if content_type.startswith(UNCOMPRESSED_TYPES):
+                # Jalur "sudah ter-encode" dari GZipResponder: body diteruskan apa adanya
+                self.content_encoding_set = True
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves live streams uncompressed"""
+
+    def __init__(self, app, minimum_size=config.GZIP_MINIMUM_SIZE, compresslevel=config.GZIP_COMPRESS_LEVEL):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = _SelectiveGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,79 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from app import config
+
+# Atribut bawaan LogRecord, sisanya dianggap field tambahan dari `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the message and every `extra=` field"""
+
+    def format(self, record):
+        payload = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S%z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                payload[key] = value
+        return json.dumps(payload, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable line with `extra=` fields appended as key=value pairs"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        extras = " ".join(
+            f"{key}={value}" for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_")
+        )
+        return f"{line} {extras}" if extras else line
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves only message and traceback merging to the caller's thread"""
+
+    def format(self, record):
+        message = record.getMessage()
+        if record.exc_info:
+            message += "\n" + logging.Formatter().formatException(record.exc_info)
+        return message
+
+
+def setup_logging(level=config.LOG_LEVEL, log_format=config.LOG_FORMAT):
+    """
+    Route every `app.*` logger through a QueueHandler.
+
+    Callers only put the record on an in-memory queue; a QueueListener
+    thread does the formatting and the blocking write to stdout, so request
+    handlers and the event loop never wait on terminal or pipe I/O.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    app_logger = logging.getLogger("app")
+    app_logger.handlers = [QueueHandler(log_queue)]
+    app_logger.setLevel(level.upper())
+    app_logger.propagate = False
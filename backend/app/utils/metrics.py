@@ -0,0 +1,262 @@
+import bisect
+import threading
+import time
+from eth_utils import function_abi_to_4byte_selector
+
+# Bucket latency dalam detik, dari panggilan RPC lokal sampai request yang timeout
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _format_labels(self.labelnames, key), value) for key, value in self._values.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels, in the Prometheus layout"""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in self._series.items():
+                cumulative = 0
+                for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                    cumulative += bucket_count
+                    samples.append((f"{self.name}_bucket",
+                                    _format_labels(self.labelnames, key, ("le", _format_value(bound))), cumulative))
+                samples.append((f"{self.name}_sum", _format_labels(self.labelnames, key), total))
+                samples.append((f"{self.name}_count", _format_labels(self.labelnames, key), count))
+        return samples
+
+    def counts(self):
+        """Observation count per label tuple"""
+        with self._lock:
+            return {key: series[2] for key, series in self._series.items()}
+
+
+class GaugeCallback:
+    """Gauge whose samples are read from a callback at scrape time"""
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, callback, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def samples(self):
+        # callback mengembalikan {tuple label: nilai}
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in self.callback().items()]
+
+
+class Registry:
+    """Collection of metrics rendered together on GET /metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                return self._metrics[metric.name]
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name, documentation, callback, labelnames=()):
+        return self.register(GaugeCallback(name, documentation, callback, labelnames))
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format (0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+RPC_REQUEST_DURATION = registry.histogram(
+    "pemilu_rpc_request_duration_seconds",
+    "JSON-RPC request latency by method; eth_call is labelled with the contract function",
+    ["method"],
+)
+RPC_REQUEST_ERRORS = registry.counter(
+    "pemilu_rpc_request_errors_total",
+    "JSON-RPC requests that failed on every endpoint or returned an error object",
+    ["method"],
+)
+LOG_RANGE_SPLITS = registry.counter(
+    "pemilu_log_range_splits_total",
+    "eth_getLogs block ranges halved after the provider rejected them as too large",
+)
+GAS_ESTIMATES = registry.counter(
+    "pemilu_gas_estimates_total",
+    "Gas limits of prepared transactions by source: cached estimate or live estimate_gas",
+    ["source"],
+)
+READ_CACHE_LOOKUPS = registry.counter(
+    "pemilu_read_cache_lookups_total",
+    "Read cache lookups by result: hit, shared_hit (from another worker) or miss",
+    ["result"],
+)
+SINGLE_FLIGHT_CALLS = registry.counter(
+    "pemilu_single_flight_calls_total",
+    "Coalescable reads by outcome: upstream (sent to the node) or coalesced into an in-flight call",
+    ["outcome"],
+)
+BALLOTS = registry.counter(
+    "pemilu_ballots_total",
+    "Signed ballots by outcome: queued, rejected, confirmed, skipped by voteBatch or failed",
+    ["status"],
+)
+RELAYED_BATCH_SIZE = registry.histogram(
+    "pemilu_relayed_batch_size",
+    "Ballots per voteBatch transaction sent by the relayer",
+    buckets=(1, 5, 10, 25, 50, 100, 200, 500),
+)
+TRACKED_TRANSACTIONS = registry.counter(
+    "pemilu_tracked_transactions_total",
+    "Client-reported transactions by outcome: tracked, confirmed, failed (reverted) or dropped",
+    ["status"],
+)
+TX_GAS_USED = registry.histogram(
+    "pemilu_tx_gas_used",
+    "gasUsed of mined client-reported transactions by contract function",
+    ["function"],
+    buckets=(21000, 50000, 75000, 100000, 150000, 250000, 500000, 1000000, 2500000, 5000000, 10000000),
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "pemilu_http_request_duration_seconds",
+    "HTTP request latency by route template, including streamed response bodies",
+    ["method", "route", "status"],
+)
+
+# selector 4-byte -> nama fungsi, diisi dari ABI kontrak yang dipakai
+_selectors = {}
+
+
+def register_abi(abi):
+    """Let eth_call timings be labelled with the contract function being called"""
+    for entry in abi:
+        if entry.get("type") == "function":
+            _selectors["0x" + function_abi_to_4byte_selector(entry).hex()] = entry["name"]
+
+
+def function_label(data):
+    """Contract function called with transaction input `data`, "unknown" for other calls"""
+    if isinstance(data, str) and len(data) >= 10:
+        return _selectors.get(data[:10].lower(), "unknown")
+    return "transfer" if data in (None, "", "0x") else "unknown"
+
+
+def rpc_method_label(method, params):
+    """Method label for RPC timings, e.g. "eth_call:getVoterDetails" for contract reads"""
+    if method in ("eth_call", "eth_estimateGas") and params and isinstance(params[0], dict):
+        data = params[0].get("data") or params[0].get("input")
+        if isinstance(data, str) and len(data) >= 10:
+            return f"{method}:{function_label(data)}"
+    return method
+
+
+class RouteMetricsMiddleware:
+    """ASGI middleware recording HTTP_REQUEST_DURATION per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Router menulis route yang cocok ke scope; template path menjaga label tetap sedikit
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
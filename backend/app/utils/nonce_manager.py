@@ -0,0 +1,174 @@
+import logging
+import threading
+import time
+from web3 import Web3
+from app import config
+from app.utils.shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+# Pesan error node yang menandakan nonce lokal sudah tidak valid
+NONCE_ERROR_MESSAGES = ("nonce too low", "nonce too high", "already known", "replacement transaction underpriced")
+
+
+class NonceManager:
+    """
+    Per-address nonce allocator for prepared (unsigned) transactions.
+
+    Each address is seeded from its pending transaction count, after which
+    nonces are handed out locally and atomically (one threading.Lock guards
+    all state, so it is safe from threads and from async tasks alike).
+
+    A prepare that fails after reserving its nonce (estimate_gas revert,
+    RPC error) hands it back with release(): the nonce is taken back if it
+    was the last one handed out, otherwise it is kept as a gap and given to
+    the next single reservation, so later transactions are not stuck behind
+    it. handle_error() resyncs an address on a node error that says its
+    nonce is out of date ("nonce too low", ...).
+
+    The backend never sees whether a prepared transaction is actually signed
+    and sent, so a seed is only trusted for `ttl` seconds. After that the
+    next reservation reseeds from the chain, which closes gaps left by
+    transactions that were never submitted and picks up transactions sent
+    from elsewhere. resync() drops an address immediately.
+    """
+
+    def __init__(self, ttl=config.NONCE_TTL):
+        self.ttl = ttl
+        self._next_nonce = {}
+        self._seeded_at = {}
+        self._gaps = {}
+        self._lock = threading.Lock()
+
+    def needs_seed(self, address):
+        address = Web3.to_checksum_address(address)
+        with self._lock:
+            seeded_at = self._seeded_at.get(address)
+            return seeded_at is None or time.monotonic() - seeded_at > self.ttl
+
+    def seed(self, address, pending_nonce):
+        """Seed an address from its pending nonce unless another caller already did"""
+        address = Web3.to_checksum_address(address)
+        with self._lock:
+            seeded_at = self._seeded_at.get(address)
+            if seeded_at is not None and time.monotonic() - seeded_at <= self.ttl:
+                return
+            previous = self._next_nonce.get(address)
+            if previous is not None and previous != pending_nonce:
+                logger.info("Nonce resync", extra={"address": address, "local": previous, "pending": pending_nonce})
+            self._next_nonce[address] = pending_nonce
+            self._seeded_at[address] = time.monotonic()
+            self._gaps.pop(address, None)
+
+    def reserve(self, address, count=1):
+        """Atomically reserve `count` sequential nonces and return the first one"""
+        address = Web3.to_checksum_address(address)
+        with self._lock:
+            gaps = self._gaps.get(address)
+            if count == 1 and gaps:
+                # Isi celah dulu: transaksi sesudahnya tertahan sampai nonce ini terpakai
+                nonce = min(gaps)
+                gaps.discard(nonce)
+                return nonce
+            nonce = self._next_nonce[address]
+            self._next_nonce[address] = nonce + count
+            return nonce
+
+    def release(self, address, nonce, count=1):
+        """Hand back `count` reserved nonces from `nonce` whose transaction will not be prepared"""
+        address = Web3.to_checksum_address(address)
+        with self._lock:
+            next_nonce = self._next_nonce.get(address)
+            if next_nonce is None or nonce + count > next_nonce:
+                return
+            gaps = self._gaps.setdefault(address, set())
+            gaps.update(range(nonce, nonce + count))
+            # Celah di ujung atas cukup dikembalikan ke counter
+            while next_nonce - 1 in gaps:
+                next_nonce -= 1
+                gaps.discard(next_nonce)
+            self._next_nonce[address] = next_nonce
+
+    def resync(self, address):
+        """Forget the local nonce so the next reservation reseeds from the chain"""
+        address = Web3.to_checksum_address(address)
+        with self._lock:
+            self._seeded_at.pop(address, None)
+
+    def handle_error(self, address, error):
+        """Resync the address if the error says its nonce is out of date"""
+        message = str(error).lower()
+        if any(text in message for text in NONCE_ERROR_MESSAGES):
+            self.resync(address)
+            return True
+        return False
+
+    def get_status(self, address):
+        address = Web3.to_checksum_address(address)
+        with self._lock:
+            seeded_at = self._seeded_at.get(address)
+            return {
+                "address": address,
+                "nextNonce": self._next_nonce.get(address),
+                "gaps": sorted(self._gaps.get(address, ())),
+                "age": time.monotonic() - seeded_at if seeded_at is not None else None,
+                "ttl": self.ttl,
+            }
+
+
+class SharedNonceManager(NonceManager):
+    """
+    NonceManager whose counters live in SharedState, for several workers
+    signing for the same addresses: a reservation is one atomic UPDATE on
+    the shared database, so no two workers hand out the same nonce.
+    """
+
+    def __init__(self, state, ttl=config.NONCE_TTL):
+        super().__init__(ttl)
+        self.state = state
+
+    def needs_seed(self, address):
+        return self.state.nonce_needs_seed(Web3.to_checksum_address(address), self.ttl)
+
+    def seed(self, address, pending_nonce):
+        address = Web3.to_checksum_address(address)
+        previous = self.state.seed_nonce(address, pending_nonce, self.ttl)
+        if previous is not None and previous != pending_nonce:
+            logger.info("Nonce resync", extra={"address": address, "local": previous, "pending": pending_nonce})
+
+    def reserve(self, address, count=1):
+        return self.state.reserve_nonce(Web3.to_checksum_address(address), count)
+
+    def release(self, address, nonce, count=1):
+        self.state.release_nonce(Web3.to_checksum_address(address), nonce, count)
+
+    def resync(self, address):
+        self.state.resync_nonce(Web3.to_checksum_address(address))
+
+    def get_status(self, address):
+        address = Web3.to_checksum_address(address)
+        next_nonce, seeded_at = self.state.get_nonce(address)
+        return {
+            "address": address,
+            "nextNonce": next_nonce,
+            "gaps": self.state.get_nonce_gaps(address),
+            "age": time.time() - seeded_at if seeded_at is not None else None,
+            "ttl": self.ttl,
+        }
+
+
+nonce_manager = SharedNonceManager(shared_state) if shared_state is not None else NonceManager()
+
+
+def next_nonce(w3, address, count=1):
+    """Reserve `count` nonces for address, seeding from the pending nonce when needed"""
+    if nonce_manager.needs_seed(address):
+        nonce_manager.seed(address, w3.eth.get_transaction_count(address, "pending"))
+    return nonce_manager.reserve(address, count)
+
+
+async def next_nonce_async(w3, address, count=1):
+    """Async variant of next_nonce() for AsyncWeb3"""
+    if nonce_manager.needs_seed(address):
+        nonce_manager.seed(address, await w3.eth.get_transaction_count(address, "pending"))
+    return nonce_manager.reserve(address, count)
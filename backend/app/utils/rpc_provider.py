@@ -0,0 +1,529 @@
+import asyncio
+import contextvars
+import logging
+import random
+import re
+import threading
+import time
+from typing import List, Tuple, Union, cast
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import AsyncWeb3, Web3
+from web3._utils.batching import sort_batch_response_by_response_ids
+from web3.exceptions import ProviderConnectionError
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.providers.base import JSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+from app import config
+from app.utils import chain_backend
+from app.utils.metrics import RPC_REQUEST_DURATION, RPC_REQUEST_ERRORS, registry, rpc_method_label
+from app.utils.shared_state import is_leader, shared_state
+
+logger = logging.getLogger(__name__)
+
+# Error JSON-RPC yang berarti endpoint kelebihan beban, bukan request yang salah
+RATE_LIMIT_ERROR_CODES = (429, -32005)
+# eth_getLogs yang melebihi batas hasil/rentang block provider. Infura memakai
+# kode -32005 yang sama dengan rate limit, jadi dibedakan dari pesannya
+LOG_RANGE_ERROR = re.compile(
+    r"more than \d+ results|blocks? range|range (is )?too (large|wide|big)|response size|"
+    r"too many (results|logs)|max(imum)? (block )?range|range limit|limited to an? [\d,]+ (blocks? )?range",
+    re.IGNORECASE,
+)
+HEADERS = {"Content-Type": "application/json"}
+
+# web3 menandai mode batch di objek provider. Provider ini dipakai bersama oleh
+# banyak task dan thread, jadi flag disimpan per context: request task lain yang
+# berjalan selama batch menunggu I/O tidak ikut masuk ke batch tersebut.
+_is_batching = contextvars.ContextVar("rpc_is_batching", default=False)
+
+
+class ContextBatchingMixin:
+    @property
+    def _is_batching(self):
+        return _is_batching.get()
+
+    @_is_batching.setter
+    def _is_batching(self, value):
+        _is_batching.set(value)
+
+
+class EndpointUnavailable(Exception):
+    """An endpoint failed in a way that is worth retrying on another endpoint"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Token bucket: `rate` requests per second with bursts of up to `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take one token; return 0 on success or the seconds until one is available"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class Endpoint:
+    """One RPC URL with its health, latency estimate, rate limiter and HTTP sessions"""
+
+    def __init__(self, url, rate, burst):
+        self.url = url
+        self.limiter = RateLimiter(rate, burst)
+        self.latency = None
+        self.block_number = None
+        self.lagging = False
+        self.failures = 0
+        self.down_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self._session = None
+        self._async_session = None
+        self._lock = threading.Lock()
+
+    def is_available(self, now):
+        return now >= self.down_until and not self.lagging
+
+    def record_success(self, latency):
+        with self._lock:
+            self.requests += 1
+            self.failures = 0
+            self.down_until = 0.0
+            # EWMA supaya satu request lambat tidak langsung memindahkan trafik
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+
+    def record_failure(self, retry_after=None):
+        with self._lock:
+            self.requests += 1
+            self.errors += 1
+            self.failures += 1
+            cooldown = retry_after
+            if cooldown is None:
+                cooldown = min(config.RPC_FAILURE_COOLDOWN * 2 ** (self.failures - 1), config.RPC_MAX_COOLDOWN)
+            self.down_until = time.monotonic() + cooldown
+
+    # =============================================
+    # HTTP
+    # =============================================
+
+    def get_session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.RPC_POOL_SIZE, max_retries=0)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def get_async_session(self):
+        # aiohttp session terikat ke event loop yang membuatnya
+        loop = asyncio.get_running_loop()
+        session = self._async_session
+        if session is None or session.closed or session._loop is not loop:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=config.RPC_POOL_SIZE,
+                    keepalive_timeout=config.RPC_KEEPALIVE_TIMEOUT,
+                    ttl_dns_cache=300,
+                ),
+                timeout=aiohttp.ClientTimeout(total=config.RPC_TIMEOUT),
+                headers=HEADERS,
+            )
+            self._async_session = session
+        return session
+
+    def post(self, data):
+        try:
+            response = self.get_session().post(self.url, data=data, headers=HEADERS, timeout=config.RPC_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise EndpointUnavailable(f"{type(e).__name__}: {str(e)}")
+        _check_status(response.status_code, response.headers)
+        return response.content
+
+    async def post_async(self, data):
+        try:
+            async with self.get_async_session().post(self.url, data=data) as response:
+                _check_status(response.status, response.headers)
+                return await response.read()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            raise EndpointUnavailable(f"{type(e).__name__}: {str(e)}")
+
+    async def close(self):
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+        if self._session is not None:
+            self._session.close()
+
+    def get_status(self, now):
+        with self._lock:
+            return {
+                "url": self.url,
+                "available": self.is_available(now),
+                "latencyMs": round(self.latency * 1000, 1) if self.latency is not None else None,
+                "blockNumber": self.block_number,
+                "lagging": self.lagging,
+                "consecutiveFailures": self.failures,
+                "downFor": max(self.down_until - now, 0.0),
+                "requests": self.requests,
+                "errors": self.errors,
+                "rateLimit": self.limiter.rate,
+            }
+
+
+def _check_status(status, headers):
+    if status == 429:
+        retry_after = headers.get("Retry-After")
+        raise EndpointUnavailable("HTTP 429 Too Many Requests",
+                                  float(retry_after) if retry_after and retry_after.isdigit() else None)
+    if status >= 500:
+        raise EndpointUnavailable(f"HTTP {status}")
+    if status >= 400:
+        raise ProviderConnectionError(f"RPC endpoint returned HTTP {status}")
+
+
+def is_log_range_error(message):
+    """Whether an error message is a provider's eth_getLogs result or block range limit"""
+    return LOG_RANGE_ERROR.search(str(message)) is not None
+
+
+def _is_rate_limit_response(response):
+    return (
+        isinstance(response, dict)
+        and isinstance(response.get("error"), dict)
+        and response["error"].get("code") in RATE_LIMIT_ERROR_CODES
+        and not is_log_range_error(response["error"].get("message", ""))
+    )
+
+
+def parse_endpoints(value):
+    """Parse "url[|rate],url[|rate]" into [(url, rate)]"""
+    endpoints = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        url, _, rate = item.partition("|")
+        endpoints.append((url.strip(), float(rate) if rate else config.RPC_RATE_LIMIT))
+    return endpoints
+
+
+class EndpointPool:
+    """
+    Shared set of RPC endpoints used by every Web3 client in the process.
+
+    Requests go to an available endpoint picked at random with a weight of
+    1 / latency, so faster endpoints get most of the traffic without starving
+    the rest of latency samples. Connection errors, timeouts, HTTP 5xx and
+    rate-limit responses (HTTP 429 or JSON-RPC -32005) put the endpoint in a
+    cooldown that doubles on every consecutive failure, and the request is
+    retried on the next endpoint. Each endpoint has its own token bucket so
+    the backend stays under the provider's quota instead of running into it.
+    """
+
+    def __init__(self, endpoints, burst=config.RPC_RATE_BURST):
+        # List [(url, rate)] atau fungsi yang mengembalikannya, dipanggil saat pool pertama dipakai
+        self._source = endpoints
+        self._burst = burst
+        self._endpoints = None
+        self._lock = threading.Lock()
+
+    @property
+    def endpoints(self):
+        if self._endpoints is None:
+            with self._lock:
+                if self._endpoints is None:
+                    endpoints = self._source() if callable(self._source) else self._source
+                    if not endpoints:
+                        raise Exception("No RPC endpoint configured, set RPC_URL or RPC_URLS")
+                    self._endpoints = [Endpoint(url, rate, self._burst) for url, rate in endpoints]
+        return self._endpoints
+
+    def is_reachable(self):
+        """True once an endpoint in rotation has answered a health probe"""
+        now = time.monotonic()
+        return any(e.block_number is not None and e.is_available(now) for e in self._endpoints or ())
+
+    def ranked(self):
+        """Endpoints in the order they should be tried for one request"""
+        now = time.monotonic()
+        available = [endpoint for endpoint in self.endpoints if endpoint.is_available(now)]
+        if not available:
+            # Semua sedang cooldown: tetap coba, mulai dari yang paling cepat pulih
+            return sorted(self.endpoints, key=lambda endpoint: endpoint.down_until)
+
+        fallback_latency = min((e.latency for e in available if e.latency is not None), default=0.1)
+        weights = [1 / max(e.latency if e.latency is not None else fallback_latency, 0.001) for e in available]
+        first = random.choices(available, weights=weights)[0]
+        rest = sorted((e for e in available if e is not first), key=lambda e: e.latency or fallback_latency)
+        down = [endpoint for endpoint in self.endpoints if endpoint not in available]
+        return [first, *rest, *down]
+
+    def _next_slot(self, tried):
+        """Return (endpoint, 0) for the best endpoint with a free token, else (None, wait)"""
+        wait = None
+        for endpoint in self.ranked():
+            if endpoint in tried:
+                continue
+            delay = endpoint.limiter.try_acquire()
+            if delay == 0:
+                return endpoint, 0.0
+            wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    def request(self, data, check_response=True):
+        """POST a JSON-RPC payload with failover, returning the decoded response"""
+        tried = set()
+        deadline = time.monotonic() + config.RPC_TIMEOUT
+        last_error = None
+        while len(tried) < len(self.endpoints):
+            endpoint, wait = self._next_slot(tried)
+            if endpoint is None:
+                if time.monotonic() + wait > deadline:
+                    break
+                time.sleep(wait)
+                continue
+            tried.add(endpoint)
+            start = time.monotonic()
+            try:
+                response = JSONBaseProvider.decode_rpc_response(endpoint.post(data))
+                if check_response and _is_rate_limit_response(response):
+                    raise EndpointUnavailable(f"Rate limited: {response['error'].get('message')}")
+            except EndpointUnavailable as e:
+                logger.warning("RPC endpoint failed", extra={"endpoint": endpoint.url, "error": str(e)})
+                endpoint.record_failure(e.retry_after)
+                last_error = e
+                continue
+            endpoint.record_success(time.monotonic() - start)
+            return response
+        raise ProviderConnectionError(f"All RPC endpoints failed: {str(last_error or 'rate limited')}")
+
+    async def request_async(self, data, check_response=True):
+        """Async variant of request()"""
+        tried = set()
+        deadline = time.monotonic() + config.RPC_TIMEOUT
+        last_error = None
+        while len(tried) < len(self.endpoints):
+            endpoint, wait = self._next_slot(tried)
+            if endpoint is None:
+                if time.monotonic() + wait > deadline:
+                    break
+                await asyncio.sleep(wait)
+                continue
+            tried.add(endpoint)
+            start = time.monotonic()
+            try:
+                response = JSONBaseProvider.decode_rpc_response(await endpoint.post_async(data))
+                if check_response and _is_rate_limit_response(response):
+                    raise EndpointUnavailable(f"Rate limited: {response['error'].get('message')}")
+            except EndpointUnavailable as e:
+                logger.warning("RPC endpoint failed", extra={"endpoint": endpoint.url, "error": str(e)})
+                endpoint.record_failure(e.retry_after)
+                last_error = e
+                continue
+            endpoint.record_success(time.monotonic() - start)
+            return response
+        raise ProviderConnectionError(f"All RPC endpoints failed: {str(last_error or 'rate limited')}")
+
+    async def check_health(self):
+        """Probe every endpoint with eth_blockNumber and flag the ones behind the chain head"""
+        data = b'{"jsonrpc":"2.0","method":"eth_blockNumber","params":[],"id":0}'
+
+        async def probe(endpoint):
+            start = time.monotonic()
+            try:
+                response = JSONBaseProvider.decode_rpc_response(await endpoint.post_async(data))
+                endpoint.block_number = int(response["result"], 16)
+            except Exception as e:
+                endpoint.block_number = None
+                endpoint.record_failure(getattr(e, "retry_after", None))
+                return
+            endpoint.record_success(time.monotonic() - start)
+
+        # Resolusi pertama bisa menyalakan node lokal, jangan blok event loop
+        endpoints = self._endpoints or await asyncio.to_thread(lambda: self.endpoints)
+        await asyncio.gather(*(probe(endpoint) for endpoint in endpoints))
+
+        head = max((e.block_number for e in endpoints if e.block_number is not None), default=None)
+        for endpoint in endpoints:
+            endpoint.lagging = (
+                head is not None
+                and endpoint.block_number is not None
+                and head - endpoint.block_number > config.RPC_MAX_BLOCK_LAG
+            )
+
+    def export_health(self):
+        """Result of the last health check, for the workers that do not probe themselves"""
+        now = time.monotonic()
+        return {
+            e.url: {"blockNumber": e.block_number, "lagging": e.lagging, "latency": e.latency,
+                    "downFor": max(e.down_until - now, 0.0)}
+            for e in self._endpoints or ()
+        }
+
+    def apply_health(self, health):
+        """Take over the health check result another worker published with export_health()"""
+        now = time.monotonic()
+        for endpoint in self.endpoints:
+            state = (health or {}).get(endpoint.url)
+            if state is None:
+                continue
+            with endpoint._lock:
+                endpoint.block_number = state["blockNumber"]
+                endpoint.lagging = state["lagging"]
+                if endpoint.latency is None:
+                    endpoint.latency = state["latency"]
+                # Cooldown lokal (dari trafik worker ini sendiri) tidak dipersingkat
+                endpoint.down_until = max(endpoint.down_until, now + state["downFor"])
+
+    async def close(self):
+        for endpoint in self._endpoints or ():
+            await endpoint.close()
+
+    def get_status(self):
+        now = time.monotonic()
+        return {"endpoints": [endpoint.get_status(now) for endpoint in self.endpoints]}
+
+
+class PooledHTTPProvider(ContextBatchingMixin, JSONBaseProvider):
+    """Sync web3 provider that sends every request through an EndpointPool"""
+
+    def __init__(self, pool, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = pool
+        self._chain_id_response = None
+
+    def __str__(self):
+        return f"Pooled RPC connection ({len(self.pool.endpoints)} endpoints)"
+
+    def make_request(self, method: RPCEndpoint, params) -> RPCResponse:
+        # Validasi web3 meminta eth_chainId sebelum setiap eth_call/estimateGas;
+        # semua endpoint ada di chain yang sama, jadi cukup dibaca sekali
+        if method == "eth_chainId" and self._chain_id_response is not None:
+            return dict(self._chain_id_response)
+        label = rpc_method_label(method, params)
+        start = time.perf_counter()
+        try:
+            response = self.pool.request(self.encode_rpc_request(method, params))
+        except Exception:
+            RPC_REQUEST_ERRORS.inc(method=label)
+            raise
+        finally:
+            RPC_REQUEST_DURATION.observe(time.perf_counter() - start, method=label)
+        if "error" in response:
+            RPC_REQUEST_ERRORS.inc(method=label)
+        elif method == "eth_chainId":
+            self._chain_id_response = response
+        return response
+
+    def make_batch_request(self, batch_requests: List[Tuple[RPCEndpoint, object]]) -> Union[List[RPCResponse], RPCResponse]:
+        start = time.perf_counter()
+        try:
+            response = self.pool.request(self.encode_batch_rpc_request(batch_requests), check_response=False)
+        except Exception:
+            RPC_REQUEST_ERRORS.inc(method="batch")
+            raise
+        finally:
+            RPC_REQUEST_DURATION.observe(time.perf_counter() - start, method="batch")
+        if not isinstance(response, list):
+            return response
+        return sort_batch_response_by_response_ids(cast(List[RPCResponse], response))
+
+
+class AsyncPooledHTTPProvider(ContextBatchingMixin, AsyncJSONBaseProvider):
+    """Async web3 provider that sends every request through an EndpointPool"""
+
+    def __init__(self, pool, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = pool
+        self._chain_id_response = None
+
+    def __str__(self):
+        return f"Pooled async RPC connection ({len(self.pool.endpoints)} endpoints)"
+
+    async def make_request(self, method: RPCEndpoint, params) -> RPCResponse:
+        # Validasi web3 meminta eth_chainId sebelum setiap eth_call/estimateGas;
+        # semua endpoint ada di chain yang sama, jadi cukup dibaca sekali
+        if method == "eth_chainId" and self._chain_id_response is not None:
+            return dict(self._chain_id_response)
+        label = rpc_method_label(method, params)
+        start = time.perf_counter()
+        try:
+            response = await self.pool.request_async(self.encode_rpc_request(method, params))
+        except Exception:
+            RPC_REQUEST_ERRORS.inc(method=label)
+            raise
+        finally:
+            RPC_REQUEST_DURATION.observe(time.perf_counter() - start, method=label)
+        if "error" in response:
+            RPC_REQUEST_ERRORS.inc(method=label)
+        elif method == "eth_chainId":
+            self._chain_id_response = response
+        return response
+
+    async def make_batch_request(self, batch_requests: List[Tuple[RPCEndpoint, object]]) -> Union[List[RPCResponse], RPCResponse]:
+        start = time.perf_counter()
+        try:
+            response = await self.pool.request_async(self.encode_batch_rpc_request(batch_requests), check_response=False)
+        except Exception:
+            RPC_REQUEST_ERRORS.inc(method="batch")
+            raise
+        finally:
+            RPC_REQUEST_DURATION.observe(time.perf_counter() - start, method="batch")
+        if not isinstance(response, list):
+            return response
+        return sort_batch_response_by_response_ids(cast(List[RPCResponse], response))
+
+    async def disconnect(self):
+        await self.pool.close()
+
+
+endpoint_pool = EndpointPool(lambda: parse_endpoints(chain_backend.get_rpc_urls()))
+
+registry.gauge_callback(
+    "pemilu_rpc_endpoint_up", "1 if the endpoint is currently in rotation",
+    lambda: {(e.url,): int(e.is_available(time.monotonic())) for e in endpoint_pool._endpoints or ()}, ["endpoint"],
+)
+registry.gauge_callback(
+    "pemilu_rpc_endpoint_latency_seconds", "Smoothed request latency per endpoint",
+    lambda: {(e.url,): e.latency for e in endpoint_pool._endpoints or () if e.latency is not None}, ["endpoint"],
+)
+
+# Satu klien sync dan satu klien async untuk seluruh proses
+w3 = Web3(PooledHTTPProvider(endpoint_pool))
+async_w3 = AsyncWeb3(AsyncPooledHTTPProvider(endpoint_pool))
+
+
+async def run_health_checks(interval=config.RPC_HEALTH_CHECK_INTERVAL):
+    """Re-probe all endpoints once per interval; with shared state only the leader probes"""
+    while True:
+        try:
+            if is_leader():
+                await endpoint_pool.check_health()
+                if shared_state is not None:
+                    shared_state.put("rpcHealth", endpoint_pool.export_health())
+            else:
+                # Resolusi pertama endpoint bisa lambat, jangan blok event loop
+                await asyncio.to_thread(endpoint_pool.apply_health, shared_state.get("rpcHealth"))
+        except Exception as e:
+            logger.warning("Error checking endpoint health", extra={"error": str(e)})
+        await asyncio.sleep(interval)
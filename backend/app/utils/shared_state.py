@@ -0,0 +1,353 @@
+"""
+State shared by the API workers of one host (uvicorn/gunicorn --workers N).
+
+Every worker process has its own event loop and would otherwise tail the
+chain, poll block numbers, refresh fees and probe endpoints on its own, so
+RPC load grows with the worker count. With SHARED_STATE_PATH set, all
+workers open the same SQLite database (on /dev/shm it lives in shared
+memory) and elect one leader through a lease row that expires unless it is
+renewed. Only the leader does the chain tailing and background polling and
+publishes the results here; the other workers read them. Nonces are
+allocated from here by every worker, so two workers never hand out the same
+nonce, and view-call results are shared per block so a read that one worker
+already made does not cost another RPC call.
+"""
+import asyncio
+import json
+import logging
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from app import config
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS nonces (
+    address TEXT PRIMARY KEY,
+    next_nonce INTEGER NOT NULL,
+    seeded_at REAL
+);
+CREATE TABLE IF NOT EXISTS nonce_gaps (
+    address TEXT NOT NULL,
+    nonce INTEGER NOT NULL,
+    PRIMARY KEY (address, nonce)
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS read_cache (
+    key TEXT PRIMARY KEY,
+    block_number INTEGER NOT NULL,
+    value BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS read_cache_block ON read_cache (block_number);
+"""
+
+LEADER_LEASE = "leader"
+
+
+class SharedState:
+    """
+    SQLite (WAL) database shared by the workers of one host.
+
+    Holds the leader lease, the latest values the leader publishes (block
+    number, fee parameters, endpoint health, indexer progress), per-address
+    nonce counters, the indexer changes for the live tally stream of the
+    other workers, and view-call results keyed by block. Time is wall-clock
+    (time.time()) because it is compared across processes.
+    """
+
+    def __init__(self, path, lease_ttl=config.SHARED_LEASE_TTL, changes_size=config.SHARED_CHANGES_SIZE):
+        self.path = path
+        self.lease_ttl = lease_ttl
+        self.changes_size = changes_size
+        self.is_leader = False
+        self.leader_since = None
+        self._pid = None
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    @property
+    def worker_id(self):
+        # Dihitung per proses: worker hasil fork (gunicorn --preload) punya id sendiri
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    # =============================================
+    # Connections
+    # =============================================
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=2000")
+        conn.executescript(SCHEMA)
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    @property
+    def conn(self):
+        """Connection of the calling thread, never one inherited from the parent process"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._local = threading.local()
+            self._connections = []
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction that takes the database lock up front"""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @contextmanager
+    def read_transaction(self):
+        """Consistent view over several reads"""
+        conn = self.conn
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.execute("COMMIT")
+
+    # =============================================
+    # Leader lease
+    # =============================================
+
+    def renew_lease(self):
+        """Take the leader lease if it is free or expired, or extend our own; returns whether we lead"""
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+                (LEADER_LEASE, self.worker_id, now + self.lease_ttl, now),
+            )
+            owner = conn.execute("SELECT owner FROM leases WHERE name = ?", (LEADER_LEASE,)).fetchone()[0]
+        return owner == self.worker_id
+
+    def release_lease(self):
+        """Give up the lease so another worker takes over without waiting for it to expire"""
+        self.is_leader = False
+        self.leader_since = None
+        self.conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (LEADER_LEASE, self.worker_id))
+
+    def get_leader(self):
+        row = self.conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (LEADER_LEASE,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    # =============================================
+    # Published values
+    # =============================================
+
+    def put(self, key, value):
+        """Publish a JSON value under `key`"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO kv (key, value, updated_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time()),
+        )
+
+    def get(self, key):
+        """Latest value published under `key`, None if there is none"""
+        row = self.conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    # =============================================
+    # Nonces
+    # =============================================
+
+    def nonce_needs_seed(self, address, ttl):
+        row = self.conn.execute("SELECT seeded_at FROM nonces WHERE address = ?", (address,)).fetchone()
+        return row is None or row[0] is None or time.time() - row[0] > ttl
+
+    def seed_nonce(self, address, pending_nonce, ttl):
+        """Seed from the pending nonce unless another worker did within `ttl`; returns the nonce it replaced"""
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute("SELECT next_nonce, seeded_at FROM nonces WHERE address = ?", (address,)).fetchone()
+            if row is not None and row[1] is not None and now - row[1] <= ttl:
+                return None
+            conn.execute(
+                "INSERT OR REPLACE INTO nonces (address, next_nonce, seeded_at) VALUES (?, ?, ?)",
+                (address, pending_nonce, now),
+            )
+            conn.execute("DELETE FROM nonce_gaps WHERE address = ?", (address,))
+        return row[0] if row is not None else None
+
+    def reserve_nonce(self, address, count=1):
+        """Atomically reserve `count` sequential nonces across all workers and return the first one"""
+        with self.transaction() as conn:
+            if count == 1:
+                # Celah dari prepare yang gagal diisi lebih dulu
+                row = conn.execute(
+                    "DELETE FROM nonce_gaps WHERE address = ? AND nonce = "
+                    "(SELECT MIN(nonce) FROM nonce_gaps WHERE address = ?) RETURNING nonce",
+                    (address, address),
+                ).fetchone()
+                if row is not None:
+                    return row[0]
+            row = conn.execute(
+                "UPDATE nonces SET next_nonce = next_nonce + ? WHERE address = ? RETURNING next_nonce",
+                (count, address),
+            ).fetchone()
+        if row is None:
+            raise KeyError(address)
+        return row[0] - count
+
+    def release_nonce(self, address, nonce, count=1):
+        """Hand back reserved nonces: the counter moves back if they were the last ones, else they become gaps"""
+        with self.transaction() as conn:
+            row = conn.execute("SELECT next_nonce FROM nonces WHERE address = ?", (address,)).fetchone()
+            if row is None or nonce + count > row[0]:
+                return
+            conn.executemany("INSERT OR IGNORE INTO nonce_gaps (address, nonce) VALUES (?, ?)",
+                             [(address, n) for n in range(nonce, nonce + count)])
+            next_nonce = row[0]
+            while conn.execute("DELETE FROM nonce_gaps WHERE address = ? AND nonce = ?",
+                               (address, next_nonce - 1)).rowcount:
+                next_nonce -= 1
+            conn.execute("UPDATE nonces SET next_nonce = ? WHERE address = ?", (next_nonce, address))
+
+    def get_nonce_gaps(self, address):
+        return [row[0] for row in self.conn.execute(
+            "SELECT nonce FROM nonce_gaps WHERE address = ? ORDER BY nonce", (address,))]
+
+    def resync_nonce(self, address):
+        self.conn.execute("UPDATE nonces SET seeded_at = NULL WHERE address = ?", (address,))
+
+    def get_nonce(self, address):
+        """(next nonce, seeded_at), or (None, None) if the address was never seeded"""
+        row = self.conn.execute("SELECT next_nonce, seeded_at FROM nonces WHERE address = ?", (address,)).fetchone()
+        return tuple(row) if row is not None else (None, None)
+
+    # =============================================
+    # Indexer changes
+    # =============================================
+
+    def append_changes(self, changes):
+        """Indexer listener on the leader: queue one chunk of changes for the other workers"""
+        with self.transaction() as conn:
+            seq = conn.execute("INSERT INTO changes (body) VALUES (?)", (json.dumps(changes),)).lastrowid
+            conn.execute("DELETE FROM changes WHERE seq <= ?", (seq - self.changes_size,))
+
+    def last_change_seq(self):
+        return self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def read_changes(self, after_seq):
+        """
+        Changes queued after `after_seq`.
+
+        Returns (changes, last seq, missed): missed is True when older
+        entries were pruned before this worker read them.
+        """
+        with self.read_transaction() as conn:
+            first = conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+            rows = conn.execute("SELECT seq, body FROM changes WHERE seq > ? ORDER BY seq", (after_seq,)).fetchall()
+        missed = first is not None and first > after_seq + 1 and after_seq > 0
+        changes = [change for _, body in rows for change in json.loads(body)]
+        return changes, rows[-1][0] if rows else after_seq, missed
+
+    # =============================================
+    # Read cache
+    # =============================================
+
+    def cache_get(self, key, block_number):
+        """Return (True, value) if a worker stored `key` at `block_number`, else (False, None)"""
+        row = self.conn.execute(
+            "SELECT value FROM read_cache WHERE key = ? AND block_number = ?", (key, block_number)
+        ).fetchone()
+        if row is None:
+            return False, None
+        return True, pickle.loads(row[0])
+
+    def cache_set(self, key, block_number, value):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO read_cache (key, block_number, value) VALUES (?, ?, ?)",
+            (key, block_number, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)),
+        )
+
+    def prune_cache(self, block_number):
+        """Drop the results of blocks before `block_number`"""
+        self.conn.execute("DELETE FROM read_cache WHERE block_number < ?", (block_number,))
+
+    def get_status(self):
+        """Get this worker's role and the current leader"""
+        return {
+            "enabled": True,
+            "path": self.path,
+            "workerId": self.worker_id,
+            "isLeader": self.is_leader,
+            "leaderFor": time.time() - self.leader_since if self.leader_since is not None else None,
+            "leader": self.get_leader(),
+            "leaseTtl": self.lease_ttl,
+        }
+
+
+# None: satu proses berdiri sendiri, seperti tanpa fitur ini
+shared_state = SharedState(config.SHARED_STATE_PATH) if config.SHARED_STATE_PATH else None
+
+
+def is_leader():
+    """Whether this worker should do the chain tailing and polling (always, without shared state)"""
+    return shared_state is None or shared_state.is_leader
+
+
+async def run_leader_election(state, on_change, interval=None):
+    """
+    Renew the leader lease every lease_ttl / 3 seconds and call
+    on_change(is_leader) in a thread whenever this worker gains or loses it.
+    A worker that cannot reach the database stops acting as leader.
+    """
+    interval = interval or state.lease_ttl / 3
+    while True:
+        try:
+            leading = await asyncio.to_thread(state.renew_lease)
+        except Exception as e:
+            logger.warning("Error renewing leader lease", extra={"error": str(e)})
+            leading = False
+        if leading != state.is_leader:
+            state.is_leader = leading
+            state.leader_since = time.time() if leading else None
+            logger.info("Leadership changed", extra={"worker": state.worker_id, "isLeader": leading})
+            try:
+                await asyncio.to_thread(on_change, leading)
+            except Exception:
+                logger.exception("Error switching worker role")
+        await asyncio.sleep(interval)
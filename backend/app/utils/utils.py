@@ -1,10 +1,27 @@
+import asyncio
+import logging
 from web3 import Web3
-from app.config import RPC_URL
+from app import config
+from app.utils.fee_oracle import fee_oracle
+from app.utils.gas_estimator import gas_estimator
+from app.utils.rpc_provider import w3, async_w3
 
-w3 = Web3(Web3.HTTPProvider("https://sepolia.infura.io/v3/003407eef50141a2af1c6b8b39ec0b2c"))
+logger = logging.getLogger(__name__)
 
 
-def get_gas_parameters(tx_function, sender_address, extra_gas=50000, extra_gwei=2):
+def _cached_gas_limit(gas_key):
+    if gas_key is None or not config.GAS_CACHE_ENABLED:
+        return None
+    return gas_estimator.get_gas_limit(gas_key)
+
+
+def _gas_limit(estimated_gas, gas_key, extra_gas):
+    if gas_key is None or not config.GAS_CACHE_ENABLED:
+        return estimated_gas + extra_gas
+    return gas_estimator.record_estimate(gas_key, estimated_gas)
+
+
+def get_gas_parameters(tx_function, sender_address, extra_gas=50000, extra_gwei=2, gas_key=None):
     """
     Menghitung gas limit dan parameter EIP-1559 (type 2) seperti maxFeePerGas dan maxPriorityFeePerGas.
 
@@ -13,15 +30,24 @@ def get_gas_parameters(tx_function, sender_address, extra_gas=50000, extra_gwei=
     - sender_address: Alamat pengirim transaksi
     - extra_gas: Buffer tambahan gas (default: 50.000)
     - extra_gwei: Buffer tip (priority fee) dalam Gwei
+    - gas_key: Kunci gas_estimator jika prasyarat fungsi sudah dicek pemanggil; estimasi
+      dari cache dan buffer adaptif menggantikan estimate_gas dan extra_gas
 
     Returns:
     - gas_limit: int
     - gas_params: dict {maxFeePerGas, maxPriorityFeePerGas, type, chainId}
     """
     try:
-        # Estimasi gas limit
-        estimated_gas = tx_function.estimate_gas({"from": sender_address})
-        gas_limit = estimated_gas + extra_gas
+        # Estimasi gas limit (dari cache jika ada)
+        gas_limit = _cached_gas_limit(gas_key)
+        if gas_limit is None:
+            gas_limit = _gas_limit(tx_function.estimate_gas({"from": sender_address}), gas_key, extra_gas)
+
+        # Gunakan fee dari oracle jika sudah siap (tanpa RPC tambahan)
+        gas_params = fee_oracle.get_gas_params(extra_gwei)
+        if gas_params is not None:
+            logger.debug("Gas parameters", extra={"gasLimit": gas_limit, "maxFeePerGas": gas_params["maxFeePerGas"], "source": "oracle"})
+            return gas_limit, gas_params
 
         # Ambil base fee dari blok terakhir
         fee_history = w3.eth.fee_history(1, "latest")
@@ -38,7 +64,68 @@ def get_gas_parameters(tx_function, sender_address, extra_gas=50000, extra_gwei=
             "chainId": w3.eth.chain_id,
         }
 
-        print(f"[GAS] Limit: {gas_limit}, MaxFeePerGas: {w3.from_wei(max_fee, 'gwei')} Gwei, Priority: {extra_gwei} Gwei")
+        logger.debug("Gas parameters", extra={"gasLimit": gas_limit, "maxFeePerGas": max_fee, "maxPriorityFeePerGas": max_priority_fee, "source": "rpc"})
+        return gas_limit, gas_params
+
+    except Exception as e:
+        raise Exception(f"Error mendapatkan parameter gas EIP-1559: {str(e)}")
+
+
+async def get_gas_parameters_async(tx_function, sender_address, extra_gas=50000, extra_gwei=2, gas_key=None):
+    """
+    Versi async dari get_gas_parameters. Jika fee oracle belum siap, estimasi
+    gas, fee history dan chain ID diambil secara paralel dengan asyncio.gather.
+
+    Parameters:
+    - tx_function: Fungsi transaksi dari AsyncContract (contoh: contract.functions.vote(...))
+    - sender_address: Alamat pengirim transaksi
+    - extra_gas: Buffer tambahan gas (default: 50.000)
+    - extra_gwei: Buffer tip (priority fee) dalam Gwei
+    - gas_key: Kunci gas_estimator, lihat get_gas_parameters
+
+    Returns:
+    - gas_limit: int
+    - gas_params: dict {maxFeePerGas, maxPriorityFeePerGas, type, chainId}
+    """
+    try:
+        cached_gas_limit = _cached_gas_limit(gas_key)
+
+        # Gunakan fee dari oracle jika sudah siap, cukup estimasi gas saja (atau tanpa RPC sama sekali)
+        gas_params = fee_oracle.get_gas_params(extra_gwei)
+        if gas_params is not None:
+            gas_limit = cached_gas_limit
+            if gas_limit is None:
+                gas_limit = _gas_limit(await tx_function.estimate_gas({"from": sender_address}), gas_key, extra_gas)
+            logger.debug("Gas parameters", extra={"gasLimit": gas_limit, "maxFeePerGas": gas_params["maxFeePerGas"], "source": "oracle"})
+            return gas_limit, gas_params
+
+        if cached_gas_limit is not None:
+            fee_history, chain_id = await asyncio.gather(
+                async_w3.eth.fee_history(1, "latest"),
+                async_w3.eth.chain_id,
+            )
+            gas_limit = cached_gas_limit
+        else:
+            estimated_gas, fee_history, chain_id = await asyncio.gather(
+                tx_function.estimate_gas({"from": sender_address}),
+                async_w3.eth.fee_history(1, "latest"),
+                async_w3.eth.chain_id,
+            )
+            gas_limit = _gas_limit(estimated_gas, gas_key, extra_gas)
+        base_fee = fee_history["baseFeePerGas"][-1]
+
+        # Tambahkan tip (priority fee) agar cepat masuk blok
+        max_priority_fee = Web3.to_wei(extra_gwei, "gwei")
+        max_fee = base_fee + max_priority_fee
+
+        gas_params = {
+            "maxFeePerGas": max_fee,
+            "maxPriorityFeePerGas": max_priority_fee,
+            "type": 2,
+            "chainId": chain_id,
+        }
+
+        logger.debug("Gas parameters", extra={"gasLimit": gas_limit, "maxFeePerGas": max_fee, "maxPriorityFeePerGas": max_priority_fee, "source": "rpc"})
         return gas_limit, gas_params
 
     except Exception as e:
@@ -61,7 +148,7 @@ def check_balance(address):
         balance_wei = w3.eth.get_balance(address)  # Dapatkan saldo dalam Wei
         balance_eth = w3.from_wei(balance_wei, "ether")  # Konversi ke ETH
 
-        print(f"Saldo {address}: {balance_eth} ETH")
+        logger.debug("Saldo", extra={"address": address, "balanceEth": str(balance_eth)})
 
         return balance_eth
 
@@ -0,0 +1,99 @@
+"""
+Log decoding cost: decodes a batch of synthetic Pemilu logs (CandidateAdded,
+CandidateRemoved and Voted, shaped like eth_getLogs results) with
+abi_codec.decode_logs and, as a baseline, with web3's
+contract.events.<Event>().process_log the way the services used to.
+
+Needs no RPC or contract. Jalankan dari folder backend:
+
+    python -m benchmarks.bench_decode_logs --logs 100000 --candidates 10
+"""
+import argparse
+import random
+import time
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from app.contracts import abi_codec
+from app.contracts.abi_codec import abi
+
+ADDRESS = "0x" + "11" * 20
+
+
+def _log(event, topics, data, block_number, log_index):
+    return AttributeDict({
+        "address": ADDRESS,
+        "topics": [HexBytes(abi_codec.event_topic(event))] + [HexBytes(topic) for topic in topics],
+        "data": HexBytes(data),
+        "blockNumber": block_number,
+        "blockHash": HexBytes(block_number.to_bytes(32, "big")),
+        "transactionHash": HexBytes(random.randbytes(32)),
+        "transactionIndex": 0,
+        "logIndex": log_index,
+        "removed": False,
+    })
+
+
+def synthetic_logs(count, candidates, seed=1):
+    """Candidates added up front, a few removed, the rest votes spread over the candidates"""
+    random.seed(seed)
+    logs = []
+    for candidate_id in range(1, candidates + 1):
+        data = encode(["uint256", "string", "string"], [candidate_id, f"Kandidat {candidate_id}", f"bafy{candidate_id:056d}"])
+        logs.append(_log("CandidateAdded", [], data, len(logs) + 1, 0))
+    for candidate_id in range(1, max(1, candidates // 5) + 1):
+        data = encode(["uint256", "string"], [candidate_id, f"Kandidat {candidate_id}"])
+        logs.append(_log("CandidateRemoved", [], data, len(logs) + 1, 0))
+    while len(logs) < count:
+        voter = encode(["address"], ["0x" + random.randbytes(20).hex()])
+        data = encode(["uint256"], [random.randint(1, candidates)])
+        logs.append(_log("Voted", [voter], data, len(logs) + 1, 0))
+    return logs[:count]
+
+
+def decode_web3(contract, logs):
+    """Baseline: look the event up from every log and let web3 build and decode it"""
+    topics = {abi_codec.event_topic(name): name for name in abi_codec.events}
+    decoded = []
+    for log in logs:
+        event_name = topics["0x" + log["topics"][0].hex().removeprefix("0x")]
+        decoded.append((event_name, dict(getattr(contract.events, event_name)().process_log(log).args), log))
+    return decoded
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def report(label, count, elapsed):
+    print(f"{label:<12} {elapsed:8.3f}s  {count / elapsed:12,.0f} logs/s  {elapsed / count * 1e6:8.2f} us/log")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, default=100_000)
+    parser.add_argument("--candidates", type=int, default=10)
+    parser.add_argument("--baseline-logs", type=int, default=None,
+                        help="decode only the first N logs with web3 (default: all, 0 skips the baseline)")
+    args = parser.parse_args()
+
+    logs = synthetic_logs(args.logs, args.candidates)
+    print(f"logs={len(logs)} candidates={args.candidates}")
+
+    decoded, elapsed = timed(abi_codec.decode_logs, logs)
+    report("abi_codec", len(logs), elapsed)
+
+    baseline_count = len(logs) if args.baseline_logs is None else min(args.baseline_logs, len(logs))
+    if baseline_count:
+        contract = Web3().eth.contract(address=Web3.to_checksum_address(ADDRESS), abi=abi)
+        expected, elapsed = timed(decode_web3, contract, logs[:baseline_count])
+        report("web3", baseline_count, elapsed)
+        if [(name, args) for name, args, _ in decoded[:baseline_count]] != [(name, args) for name, args, _ in expected]:
+            raise SystemExit("abi_codec and web3 decoded different results")
+
+
+if __name__ == "__main__":
+    main()
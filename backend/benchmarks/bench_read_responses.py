@@ -0,0 +1,68 @@
+"""
+Read-route responses: time to turn a list payload into a response body
+with FastAPI's default path (jsonable_encoder + JSONResponse) and with
+FastJSONResponse (orjson), the gzip size and time of that body per
+compression level, and requests per second of a 200 vs a 304 answer
+through a small app using conditional_json().
+
+Needs no RPC or contract. Jalankan dari folder backend:
+
+    python -m benchmarks.bench_read_responses --items 5000
+"""
+import argparse
+import gzip
+import os
+import time
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from app.utils.http_responses import FastJSONResponse, conditional_json, orjson
+
+
+def payload(items):
+    return [
+        {"address": "0x" + os.urandom(20).hex(), "isRegistered": True, "hasVoted": i % 3 == 0,
+         "voteCandidateId": i % 7, "name": f"Kandidat {i}", "voteCount": i * 13}
+        for i in range(items)
+    ]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main(args):
+    content = payload(args.items)
+    print(f"items={args.items} orjson={'yes' if orjson is not None else 'no (json fallback)'}")
+
+    default_time, body = timed(lambda: JSONResponse(jsonable_encoder(content)).body, args.repeat)
+    fast_time, fast_body = timed(lambda: FastJSONResponse(content).body, args.repeat)
+    print(f"{'default':<12} {default_time * 1000:8.2f}ms  {len(body):>9} bytes")
+    print(f"{'orjson':<12} {fast_time * 1000:8.2f}ms  {len(fast_body):>9} bytes  ({default_time / fast_time:.1f}x)")
+
+    for level in (1, 5, 9):
+        gzip_time, compressed = timed(lambda: gzip.compress(fast_body, compresslevel=level), args.repeat)
+        print(f"{f'gzip -{level}':<12} {gzip_time * 1000:8.2f}ms  {len(compressed):>9} bytes")
+
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items(request: Request):
+        return await conditional_json(request, ("items", 1), lambda: content)
+
+    client = TestClient(app)
+    etag = client.get("/items").headers["etag"]
+    for name, headers in (("200", {}), ("304", {"If-None-Match": etag})):
+        request_time, response = timed(lambda: client.get("/items", headers=headers), args.repeat)
+        print(f"{name:<12} {1 / request_time:8.0f} req/s  status={response.status_code}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,82 @@
+"""
+/results engine: fills a ResultsStore with synthetic votes, then times
+get_results() on a cold engine (every vote loaded from the store) and on a
+warm one after another block range was indexed (only the new votes are
+read), in plain Python and, when it is installed, with NumPy. Both must
+produce the same results.
+
+Needs no RPC or contract. Jalankan dari folder backend:
+
+    python -m benchmarks.bench_results --voters 200000 --bucket 300
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from app.contracts import results
+from app.contracts.results import ResultsEngine
+from app.contracts.results_store import ResultsStore
+from benchmarks.bench_results_store import populate
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def add_votes(store, candidate_ids, count, voters_per_block):
+    """Index one more block range: `count` new voters who vote right away"""
+    _, last_block, _ = store.get_checkpoint()
+    block_number = last_block
+    with store.transaction():
+        for i in range(count):
+            block_number = last_block + 1 + i // voters_per_block
+            address = "0x" + random.randbytes(20).hex()
+            store.register_voter(address, block_number)
+            store.record_vote(address, random.choice(candidate_ids), block_number, i % voters_per_block,
+                              1_700_000_000 + 12 * block_number, "0x" + random.randbytes(32).hex())
+        store.commit_checkpoint(block_number, f"0x{block_number:064x}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--voters", type=int, default=200_000)
+    parser.add_argument("--candidates", type=int, default=10)
+    parser.add_argument("--bucket", type=int, default=300, help="seconds per votesOverTime bucket")
+    parser.add_argument("--new-votes", type=int, default=1000, help="votes indexed between the cold and warm run")
+    parser.add_argument("--voters-per-block", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    store = ResultsStore(os.path.join(tempfile.mkdtemp(prefix="pemilu-results-"), "indexer.db"))
+    _, candidate_ids = populate(store, args.voters, args.candidates, 2000, args.voters_per_block)
+    with store.transaction():
+        store.set_registered_voters(args.voters + args.new_votes, store.get_checkpoint()[1])
+    print(f"voters={args.voters} candidates={args.candidates} bucket={args.bucket}s numpy={results.np is not None}")
+
+    engines = {"python": ResultsEngine(store, use_numpy=False)}
+    if results.np is not None:
+        engines["numpy"] = ResultsEngine(store, use_numpy=True)
+
+    outputs = {}
+    for name, engine in engines.items():
+        _, cold = timed(engine.get_results, args.bucket)
+        _, repeat = timed(engine.get_results, args.bucket)
+        print(f"{name:<7} cold={cold * 1000:8.1f}ms  repeat={repeat * 1000:8.1f}ms")
+
+    add_votes(store, candidate_ids, args.new_votes, args.voters_per_block)
+    for name, engine in engines.items():
+        outputs[name], warm = timed(engine.get_results, args.bucket)
+        print(f"{name:<7} after {args.new_votes} new votes: {warm * 1000:8.1f}ms  "
+              f"buckets={len(outputs[name]['votesOverTime']['buckets'])} totalVotes={outputs[name]['totalVotes']}")
+
+    if len({repr(output) for output in outputs.values()}) > 1:
+        raise SystemExit("numpy and python engines disagree")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
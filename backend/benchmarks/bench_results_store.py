@@ -0,0 +1,106 @@
+"""
+Results store: fills a ResultsStore with synthetic candidates, voters and
+votes the way the indexer does (one transaction per chunk of blocks), then
+measures point lookups and how long writing and restoring a snapshot takes,
+i.e. the cold start of a new replica.
+
+Needs no RPC or contract. Jalankan dari folder backend:
+
+    python -m benchmarks.bench_results_store --voters 100000 --candidates 10
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from app.contracts import abi_codec
+from app.contracts.results_store import ResultsStore
+from benchmarks.bench_sync_vs_async import percentile
+
+
+def populate(store, voters, candidates, chunk_blocks, voters_per_block):
+    """Register every voter, then let each vote; returns the voter addresses"""
+    addresses = [abi_codec.to_checksum_address("0x" + random.randbytes(20).hex()) for _ in range(voters)]
+    candidate_ids = [random.randint(1, 10**10) for _ in range(candidates)]
+    block_number = 1
+    with store.transaction():
+        for log_index, candidate_id in enumerate(candidate_ids):
+            store.add_candidate(candidate_id, f"Kandidat {log_index + 1}", f"cid-{log_index + 1}", block_number, log_index)
+        store.commit_checkpoint(block_number, f"0x{block_number:064x}")
+
+    # Setiap pemilih: satu VoterRegistered lalu satu Voted
+    events = [("register", address) for address in addresses] + [("vote", address) for address in addresses]
+    per_chunk = chunk_blocks * voters_per_block
+    for start in range(0, len(events), per_chunk):
+        with store.transaction():
+            for i, (kind, address) in enumerate(events[start:start + per_chunk]):
+                block_number = 2 + (start + i) // voters_per_block
+                if kind == "register":
+                    store.register_voter(address, block_number)
+                else:
+                    store.record_vote(address, random.choice(candidate_ids), block_number, i % voters_per_block,
+                                      1_700_000_000 + 12 * block_number, "0x" + random.randbytes(32).hex())
+            store.commit_checkpoint(block_number, f"0x{block_number:064x}")
+    return addresses, candidate_ids
+
+
+def time_lookups(fn, keys):
+    samples = []
+    for key in keys:
+        start = time.perf_counter()
+        fn(key)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def report_lookups(label, samples):
+    print(f"{label:<16} n={len(samples):<7} mean={statistics.mean(samples):7.1f}us  "
+          f"p50={percentile(samples, 50):7.1f}us  p99={percentile(samples, 99):7.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--voters", type=int, default=100_000)
+    parser.add_argument("--candidates", type=int, default=10)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--chunk-blocks", type=int, default=2000, help="blocks per store transaction (INDEXER_MAX_BLOCK_RANGE)")
+    parser.add_argument("--voters-per-block", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    directory = tempfile.mkdtemp(prefix="pemilu-store-")
+    store = ResultsStore(os.path.join(directory, "indexer.db"))
+
+    start = time.perf_counter()
+    addresses, candidate_ids = populate(store, args.voters, args.candidates, args.chunk_blocks, args.voters_per_block)
+    elapsed = time.perf_counter() - start
+    events = 2 * args.voters + args.candidates
+    print(f"voters={args.voters} candidates={args.candidates} events={events}")
+    print(f"apply            {elapsed:7.3f}s  {events / elapsed:10,.0f} events/s")
+
+    sample = random.choices(addresses, k=args.lookups)
+    report_lookups("get_voter", time_lookups(store.get_voter, sample))
+    report_lookups("get_candidate", time_lookups(store.get_candidate, random.choices(candidate_ids, k=args.lookups)))
+    report_lookups("get_candidates", time_lookups(lambda _: store.get_candidates(), range(min(args.lookups, 2000))))
+
+    snapshot_path = os.path.join(directory, "indexer_snapshot.db")
+    start = time.perf_counter()
+    store.snapshot(snapshot_path)
+    print(f"snapshot write   {time.perf_counter() - start:7.3f}s  {os.path.getsize(snapshot_path) / 2**20:.1f} MiB")
+
+    # Replika baru: database kosong, dipulihkan dari snapshot
+    replica = ResultsStore(os.path.join(directory, "replica.db"))
+    start = time.perf_counter()
+    replica.restore(snapshot_path)
+    print(f"snapshot restore {time.perf_counter() - start:7.3f}s  lastBlock={replica.get_checkpoint()[1]}")
+    if replica.get_counts() != store.get_counts():
+        raise SystemExit("restored replica differs from the source store")
+
+    store.close()
+    replica.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+RPC call count per endpoint: sends each request through the FastAPI app and
+counts the JSON-RPC requests it caused (from the pemilu_rpc_request_duration
+histogram), broken down by method. Background tasks are not started, so the
+read cache and fee oracle are cold and every request pays its full cost.
+
+Jalankan dari folder backend dengan RPC_URL dan CONTRACT_ADDRESS terisi:
+
+    python -m benchmarks.bench_rpc_calls --voter 0x... --admin 0x... --owner 0x...
+
+With --check the script exits with status 1 if an endpoint makes more RPC
+calls than its budget in BUDGETS, so a regression fails CI.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from collections import Counter
+import httpx
+from app.main import app
+from app.utils.metrics import RPC_REQUEST_DURATION
+
+ZERO_ADDRESS = "0x" + "00" * 20
+
+# Batas jumlah RPC per request: 1 read context/view + gas, fee & nonce untuk transaksi
+BUDGETS = {
+    "POST /voters/vote": 6,
+    "POST /candidates": 6,
+    "DELETE /candidates/{id}": 6,
+    "POST /admins": 6,
+    "GET /voting-period": 1,
+    "GET /candidates": 3,
+    "GET /voters/check/{address}": 1,
+}
+
+
+def scenarios(args):
+    return [
+        ("POST /voters/vote", "post", "/voters/vote", {"json": {"address": args.voter, "candidateId": args.candidate_id}}),
+        ("POST /candidates", "post", "/candidates", {"json": {"address": args.admin, "name": "bench", "imageCID": "bench"}}),
+        ("DELETE /candidates/{id}", "delete", f"/candidates/{args.candidate_id}",
+         {"json": {"address": args.admin, "candidateId": args.candidate_id}}),
+        ("POST /admins", "post", "/admins", {"params": {"owner_address": args.owner, "new_admin_address": args.voter}}),
+        ("GET /voting-period", "get", "/voting-period", {}),
+        ("GET /candidates", "get", "/candidates", {}),
+        ("GET /voters/check/{address}", "get", f"/voters/check/{args.voter}", {}),
+    ]
+
+
+def rpc_counts():
+    return Counter({key[0]: count for key, count in RPC_REQUEST_DURATION.counts().items()})
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--voter", default=ZERO_ADDRESS)
+    parser.add_argument("--admin", default=ZERO_ADDRESS)
+    parser.add_argument("--owner", default=ZERO_ADDRESS)
+    parser.add_argument("--candidate-id", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="requests per endpoint, averaged")
+    parser.add_argument("--check", action="store_true", help="exit 1 if an endpoint exceeds its budget")
+    args = parser.parse_args()
+
+    logging.getLogger("app").setLevel(logging.CRITICAL)
+    # Tanpa lifespan: tidak ada background task yang ikut menambah hitungan RPC
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    # Pemanasan: cek ketersediaan Multicall3 hanya terjadi sekali per proses
+    await client.get("/voting-period")
+
+    over_budget = []
+    for name, method, path, kwargs in scenarios(args):
+        before = rpc_counts()
+        statuses = Counter()
+        for _ in range(args.repeat):
+            response = await client.request(method.upper(), path, **kwargs)
+            statuses[response.status_code] += 1
+        calls = rpc_counts() - before
+
+        per_request = sum(calls.values()) / args.repeat
+        budget = BUDGETS.get(name)
+        flag = "" if budget is None or per_request <= budget else "  OVER BUDGET"
+        if flag:
+            over_budget.append(name)
+        breakdown = ", ".join(f"{method}={count / args.repeat:g}" for method, count in calls.most_common())
+        print(f"{name:<28} rpc/request={per_request:5.1f} budget={budget}  status={dict(statuses)}{flag}")
+        print(f"{'':<28} {breakdown}")
+
+    await client.aclose()
+    if args.check and over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
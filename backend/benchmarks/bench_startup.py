@@ -0,0 +1,92 @@
+"""
+Startup time: boots the app in a fresh interpreter several times and measures
+how long a worker takes to import, finish the lifespan startup, answer
+/health/live and report ready on /health/ready.
+
+Jalankan dari folder backend dengan RPC_URL dan CONTRACT_ADDRESS terisi:
+
+    python -m benchmarks.bench_startup --runs 5
+
+With --unreachable the RPC endpoint is replaced by a blackholed address: the
+worker must still boot and answer /health/live, while /health/ready stays 503.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Dijalankan di proses anak: setiap run membayar biaya import dari nol
+CHILD = r"""
+import asyncio, json, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def main(ready_timeout):
+    import httpx
+    result = {"import": imported - start}
+    async with app.router.lifespan_context(app):
+        result["lifespan"] = time.perf_counter() - start
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            response = await client.get("/health/live")
+            result["live"] = time.perf_counter() - start if response.status_code == 200 else None
+            result["ready"] = None
+            deadline = time.perf_counter() + ready_timeout
+            while time.perf_counter() < deadline:
+                if (await client.get("/health/ready")).status_code == 200:
+                    result["ready"] = time.perf_counter() - start
+                    break
+                await asyncio.sleep(0.01)
+    print(json.dumps(result))
+
+asyncio.run(main(%(ready_timeout)r))
+"""
+
+PHASES = ("process", "import", "lifespan", "live", "ready")
+
+
+def run_once(env, ready_timeout):
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD % {"ready_timeout": ready_timeout}],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process"] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ready-timeout", type=float, default=15, help="seconds to wait for /health/ready")
+    parser.add_argument("--unreachable", action="store_true", help="point RPC_URLS at a blackholed address")
+    args = parser.parse_args()
+
+    env = dict(os.environ, LOG_LEVEL="WARNING", INDEXER_ENABLED="false")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+    if args.unreachable:
+        # TEST-NET-1 (RFC 5737): paket dibuang, koneksi menggantung sampai timeout
+        env["RPC_URLS"] = "http://192.0.2.1:8545"
+        env.setdefault("CONTRACT_ADDRESS", "0x" + "00" * 20)
+
+    runs = [run_once(env, args.ready_timeout) for _ in range(args.runs)]
+
+    # process: wall time of the whole child; the rest: seconds since the child started importing the app
+    print(f"runs={args.runs} unreachable={args.unreachable}")
+    for phase in PHASES:
+        samples = [run[phase] for run in runs if run.get(phase) is not None]
+        missing = len(runs) - len(samples)
+        if not samples:
+            print(f"{phase:<9} never reached")
+            continue
+        print(f"{phase:<9} median={statistics.median(samples):7.3f}  min={min(samples):7.3f}  "
+              f"max={max(samples):7.3f}" + (f"  not reached in {missing} run(s)" if missing else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Load benchmark: sync pemilu_services (run on the threadpool, the way FastAPI
+runs `def` routes) vs. pemilu_services_async (awaited directly, the way
+FastAPI runs `async def` routes).
+
+Jalankan dari folder backend dengan RPC_URL dan CONTRACT_ADDRESS terisi:
+
+    python -m benchmarks.bench_sync_vs_async --clients 300 --requests 5 --target voting-period
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from starlette.concurrency import run_in_threadpool
+from app.contracts import pemilu_services, pemilu_services_async
+
+TARGETS = {
+    "voting-period": (pemilu_services.get_voting_period, pemilu_services_async.get_voting_period),
+    "candidates": (pemilu_services.get_all_candidates, pemilu_services_async.get_all_candidates),
+    "candidates-count": (pemilu_services.get_candidate_count, pemilu_services_async.get_candidate_count),
+    "voters-count": (pemilu_services.get_voter_count, pemilu_services_async.get_voter_count),
+}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_clients(call, clients, requests_per_client):
+    latencies = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            try:
+                await call()
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def report(label, latencies, errors, elapsed):
+    print(
+        f"{label:<6} n={len(latencies):<6} errors={errors:<5} "
+        f"p50={percentile(latencies, 50) * 1000:8.1f} ms  "
+        f"p99={percentile(latencies, 99) * 1000:8.1f} ms  "
+        f"mean={statistics.mean(latencies) * 1000:8.1f} ms  "
+        f"throughput={len(latencies) / elapsed:8.1f} req/s"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=5, help="requests per client")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="voting-period")
+    args = parser.parse_args()
+
+    sync_fn, async_fn = TARGETS[args.target]
+    print(f"target={args.target} clients={args.clients} requests/client={args.requests}")
+
+    # Keep service warnings out of the report
+    logging.getLogger("app").setLevel(logging.CRITICAL)
+
+    # Warm up connections and the Multicall3 availability check
+    await run_in_threadpool(sync_fn)
+    await async_fn()
+
+    sync_result = await run_clients(lambda: run_in_threadpool(sync_fn), args.clients, args.requests)
+    async_result = await run_clients(async_fn, args.clients, args.requests)
+
+    report("sync", *sync_result)
+    report("async", *async_result)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""
+Voter allowlist: builds the Merkle tree of a generated voter roll with
+voter_allowlist.build_allowlist() (one process vs a pool), checks its root
+against a naive in-memory build, and reports proof lookups per second from
+the memory-mapped file, each proof verified the way MerkleProof does.
+
+Needs no RPC or contract. Jalankan dari folder backend:
+
+    python -m benchmarks.bench_voter_allowlist --voters 200000 --workers 4
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from eth_utils import to_checksum_address
+from app.contracts.voter_allowlist import VoterAllowlist, build_allowlist, hash_pair, leaf_hash
+
+
+def naive_root(addresses):
+    layer = sorted({leaf_hash(address) for address in addresses})
+    while len(layer) > 1:
+        parents = [hash_pair(layer[i], layer[i + 1]) for i in range(0, len(layer) - 1, 2)]
+        if len(layer) % 2:
+            parents.append(layer[-1])
+        layer = parents
+    return "0x" + layer[0].hex()
+
+
+def verify(proof):
+    node = bytes.fromhex(proof["leaf"][2:])
+    for sibling in proof["proof"]:
+        node = hash_pair(node, bytes.fromhex(sibling[2:]))
+    return "0x" + node.hex() == proof["root"]
+
+
+def main(args):
+    addresses = [to_checksum_address(os.urandom(20)) for _ in range(args.voters)]
+    print(f"voters={args.voters} workers={args.workers} cpus={os.cpu_count()}")
+    with tempfile.TemporaryDirectory() as directory:
+        roll = os.path.join(directory, "roll.csv")
+        with open(roll, "w") as f:
+            f.write("address\n")
+            f.writelines(f"{address}\n" for address in addresses)
+            # Duplikat dan baris invalid ikut diuji
+            f.write(f"{addresses[0]}\nnot-an-address\n")
+
+        expected = naive_root(addresses)
+        out = os.path.join(directory, "allowlist.bin")
+        for workers in sorted({1, args.workers}):
+            summary = build_allowlist(roll, out, workers, args.chunk_size)
+            if summary["root"] != expected or summary["duplicates"] != 1 or summary["invalid"] != 1:
+                raise SystemExit(f"workers={workers}: unexpected build {summary}")
+            print(f"build x{workers:<3} {summary['durationMs']:10.1f}ms  {args.voters / summary['durationMs'] * 1000:10.0f} voters/s")
+
+        allowlist = VoterAllowlist(out)
+        sample = random.sample(addresses, min(args.lookups, len(addresses)))
+        start = time.perf_counter()
+        proofs = [allowlist.get_proof(address) for address in sample]
+        elapsed = time.perf_counter() - start
+        if not all(proof is not None and verify(proof) for proof in proofs):
+            raise SystemExit("a proof does not verify against the root")
+        if allowlist.get_proof(to_checksum_address(os.urandom(20))) is not None:
+            raise SystemExit("proof for an address that is not on the list")
+        print(f"proofs         {len(sample) / elapsed:10.0f} lookups/s  proof length={len(proofs[0]['proof'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--voters", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    main(parser.parse_args())
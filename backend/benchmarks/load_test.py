@@ -0,0 +1,237 @@
+"""
+Load test on a local chain: deploys Pemilu on an in-process EVM (eth-tester)
+or a spawned anvil, registers N synthetic voters, has every one of them vote
+and then hammers the read routes, recording latency and throughput per route.
+Nothing leaves the machine, so runs are reproducible and comparable.
+
+Requests go through the FastAPI app in-process (lifespan included, so the
+indexer, read cache and fee oracle run as in production). Transactions the
+API returns are signed with the voters' local keys and sent to the chain;
+the admin's are sent from the first unlocked dev account, which deploys the
+contract and is therefore owner and admin. Write routes report the latency
+of the API call alone, while their throughput covers the whole phase
+including signing, sending and waiting for the receipt.
+
+Jalankan dari folder backend setelah `forge build` di folder contract:
+
+    python -m benchmarks.load_test --backend eth-tester --voters 200 --concurrency 50
+    python -m benchmarks.load_test --backend anvil --voters 1000 --reads 2000 --json baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("eth-tester", "anvil"), default="eth-tester")
+    parser.add_argument("--voters", type=int, default=100, help="synthetic voters to register and vote")
+    parser.add_argument("--candidates", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=25, help="requests in flight at once")
+    parser.add_argument("--reads", type=int, default=500, help="requests per read route")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    return parser.parse_args()
+
+
+args = parse_args()
+# Harus di-set sebelum app diimport: config dibaca saat import
+os.environ["CHAIN_BACKEND"] = args.backend
+os.environ.pop("CONTRACT_ADDRESS", None)
+# Chain lokal tidak pernah reorg, indexer tidak perlu menunggu konfirmasi
+os.environ.setdefault("INDEXER_CONFIRMATIONS", "0")
+# Chain baru setiap run: checkpoint indexer dari run sebelumnya tidak berlaku
+os.environ["INDEXER_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="pemilu-load-"), "indexer.db")
+
+import httpx  # noqa: E402
+from eth_account import Account  # noqa: E402
+from app.main import app  # noqa: E402
+from app.contracts import pemilu_services_async  # noqa: E402
+from app.utils.rpc_provider import async_w3  # noqa: E402
+from benchmarks.bench_sync_vs_async import percentile  # noqa: E402
+
+# eth-tester mensyaratkan saldo untuk gas limit blok saat estimate_gas
+VOTER_FUNDING = 10 ** 17
+
+
+class Recorder:
+    """Latency samples, error counts and phase duration per route"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.elapsed = {}
+        self.reverted = Counter()
+
+    async def request(self, client, route, method, path, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, path, **kwargs)
+        self.latencies[route].append(time.perf_counter() - start)
+        self.statuses[route][response.status_code] += 1
+        return response
+
+    def results(self):
+        results = {}
+        for route, latencies in self.latencies.items():
+            elapsed = self.elapsed.get(route)
+            results[route] = {
+                "requests": len(latencies),
+                "errors": sum(count for status, count in self.statuses[route].items() if status >= 400),
+                "reverted": self.reverted[route],
+                "throughput": len(latencies) / elapsed if elapsed else None,
+                "p50Ms": percentile(latencies, 50) * 1000,
+                "p95Ms": percentile(latencies, 95) * 1000,
+                "p99Ms": percentile(latencies, 99) * 1000,
+                "meanMs": statistics.mean(latencies) * 1000,
+            }
+        return results
+
+
+async def run_phase(recorder, route, jobs, concurrency):
+    """Run coroutine factories with at most `concurrency` in flight; time the phase under `route`"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(job):
+        async with semaphore:
+            await job()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(job) for job in jobs))
+    recorder.elapsed[route] = time.perf_counter() - start
+
+
+async def send_signed(account, tx):
+    """Sign a transaction prepared by the API with the voter's key and wait for it"""
+    tx = {key: value for key, value in tx.items() if key != "from"}
+    signed = account.sign_transaction(tx)
+    tx_hash = await async_w3.eth.send_raw_transaction(signed.raw_transaction)
+    return await async_w3.eth.wait_for_transaction_receipt(tx_hash)
+
+
+async def send_unlocked(tx):
+    """Send a transaction prepared by the API from an unlocked dev account"""
+    tx_hash = await async_w3.eth.send_transaction(tx)
+    return await async_w3.eth.wait_for_transaction_receipt(tx_hash)
+
+
+def check(response):
+    if response.status_code >= 400:
+        raise Exception(f"{response.request.method} {response.request.url.path} -> {response.status_code}: {response.text}")
+    return response.json()
+
+
+async def setup(client, recorder, owner, voters, args):
+    """Fund voters, add candidates, register voters and open the voting period"""
+    async def fund(voter):
+        tx_hash = await async_w3.eth.send_transaction({"from": owner, "to": voter.address, "value": VOTER_FUNDING})
+        await async_w3.eth.wait_for_transaction_receipt(tx_hash)
+
+    await run_phase(recorder, "fund", [lambda voter=voter: fund(voter) for voter in voters], args.concurrency)
+
+    candidates = [{"name": f"Kandidat {i + 1}", "imageCID": f"cid-{i + 1}"} for i in range(args.candidates)]
+    body = check(await recorder.request(client, "POST /candidates/bulk", "POST", "/candidates/bulk",
+                                        json={"address": owner, "candidates": candidates}))
+    for tx in body["transactions"]:
+        await send_unlocked(tx)
+    candidate_ids = [candidate["id"] for candidate in await pemilu_services_async.get_all_candidates()]
+
+    async def register(voter):
+        response = await recorder.request(client, "POST /voters/register", "POST", "/voters/register",
+                                          params={"address": voter.address})
+        receipt = await send_signed(voter, check(response)["tx_hash"])
+        if receipt.status != 1:
+            recorder.reverted["POST /voters/register"] += 1
+
+    await run_phase(recorder, "POST /voters/register",
+                    [lambda voter=voter: register(voter) for voter in voters], args.concurrency)
+
+    # Mulai beberapa detik lagi: kontrak menolak startTime yang sudah lewat
+    latest = await async_w3.eth.get_block("latest")
+    start_time = max(int(time.time()), latest.timestamp) + 3
+    body = check(await recorder.request(client, "POST /voters/set-voting-period", "POST", "/voters/set-voting-period",
+                                        json={"address": owner, "startTime": start_time, "endTime": start_time + 3600}))
+    await send_unlocked(body["tx_hash"])
+    while time.time() < start_time:
+        await asyncio.sleep(0.2)
+    return candidate_ids
+
+
+async def cast_votes(client, recorder, voters, candidate_ids, args):
+    async def vote(voter):
+        response = await recorder.request(client, "POST /voters/vote", "POST", "/voters/vote",
+                                          json={"address": voter.address, "candidateId": random.choice(candidate_ids)})
+        receipt = await send_signed(voter, check(response)["tx_hash"])
+        if receipt.status != 1:
+            recorder.reverted["POST /voters/vote"] += 1
+
+    await run_phase(recorder, "POST /voters/vote", [lambda voter=voter: vote(voter) for voter in voters], args.concurrency)
+
+
+def read_routes(voters, candidate_ids):
+    """(route, path factory) for the read endpoints, with a random voter or candidate per request"""
+    return [
+        ("GET /candidates", lambda: "/candidates"),
+        ("GET /candidates/{candidate_id}", lambda: f"/candidates/{random.choice(candidate_ids)}"),
+        ("GET /candidates_count", lambda: "/candidates_count"),
+        ("GET /voters/check/{address}", lambda: f"/voters/check/{random.choice(voters).address}"),
+        ("GET /voters/{voter_address}", lambda: f"/voters/{random.choice(voters).address}"),
+        ("GET /voters", lambda: "/voters?limit=100"),
+        ("GET /voters_count", lambda: "/voters_count"),
+        ("GET /voting-period", lambda: "/voting-period"),
+    ]
+
+
+async def run_reads(client, recorder, voters, candidate_ids, args):
+    for route, make_path in read_routes(voters, candidate_ids):
+        jobs = [lambda route=route, make_path=make_path: recorder.request(client, route, "GET", make_path())
+                for _ in range(args.reads)]
+        await run_phase(recorder, route, jobs, args.concurrency)
+
+
+def report(results):
+    print(f"{'route':<34} {'n':>6} {'err':>5} {'revert':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, stats in results.items():
+        throughput = f"{stats['throughput']:8.1f}" if stats["throughput"] is not None else f"{'-':>8}"
+        print(f"{route:<34} {stats['requests']:>6} {stats['errors']:>5} {stats['reverted']:>6} {throughput} "
+              f"{stats['p50Ms']:8.1f} {stats['p95Ms']:8.1f} {stats['p99Ms']:8.1f}")
+
+
+async def main():
+    random.seed(args.seed)
+    logging.getLogger("app").setLevel(logging.WARNING)
+
+    owner = (await async_w3.eth.accounts)[0]
+    voters = [Account.create() for _ in range(args.voters)]
+    recorder = Recorder()
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=60) as client:
+            started = time.perf_counter()
+            candidate_ids = await setup(client, recorder, owner, voters, args)
+            await cast_votes(client, recorder, voters, candidate_ids, args)
+            await run_reads(client, recorder, voters, candidate_ids, args)
+            total = time.perf_counter() - started
+
+    # Pendanaan bukan route API, tidak ikut dilaporkan
+    recorder.elapsed.pop("fund", None)
+    results = recorder.results()
+    print(f"backend={args.backend} voters={args.voters} candidates={args.candidates} "
+          f"concurrency={args.concurrency} total={total:.1f}s")
+    report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"backend": args.backend, "voters": args.voters, "candidates": args.candidates,
+                       "concurrency": args.concurrency, "totalSeconds": total, "routes": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+import asyncio
+from eth_account import Account
+from eth_account.messages import encode_typed_data
+from eth_utils import keccak
+from app.utils.ballot_signatures import (
+    BALLOT_TYPES, SECP256K1_HALF_N, SignatureVerifier, ballot_digest, domain_separator, parse_signature, recover_signer,
+)
+
+# Vektor tetap: kunci 0x11..11, domain Pemilu v1 di Sepolia, kandidat 2
+PRIVATE_KEY = "0x" + "11" * 32
+VOTER = "0x19E7E376E7C213B7E7e7e46cc70A5dD086DAff2A"
+DOMAIN = {"name": "Pemilu", "version": "1", "chainId": 11155111,
+          "verifyingContract": "0xCcCCccccCCCCcCCCCCCcCcCccCcCCCcCcccccccC"}
+MESSAGE = {"voter": VOTER, "candidateId": 2, "deadline": 1760000000}
+SEPARATOR = "20fd273442f8130c18bd4e477335ddc89243b305c26ee708a416d2df3acb91ab"
+DIGEST = "854245cceb01584d8bd1ac11db7eab2b9973494ba939f7d5f3beb73d90a9bbc2"
+SIGNATURE = ("82c7e4ec5d9562390051eb4f7e61d8c01d7a68d9aa1df659e4fcf477c373899e"
+             "5fc3c7a5fd969db400fff7942e32bc22d76307e1e434ebb5a9f8bc6f61f4b41c1c")
+
+
+def digest():
+    separator = domain_separator(DOMAIN["name"], DOMAIN["version"], DOMAIN["chainId"], DOMAIN["verifyingContract"])
+    return ballot_digest(separator, VOTER, MESSAGE["candidateId"], MESSAGE["deadline"])
+
+
+def test_known_vector():
+    separator = domain_separator(DOMAIN["name"], DOMAIN["version"], DOMAIN["chainId"], DOMAIN["verifyingContract"])
+    assert separator.hex() == SEPARATOR
+    assert digest().hex() == DIGEST
+    assert recover_signer(digest(), bytes.fromhex(SIGNATURE)) == VOTER
+
+
+def test_digest_matches_eth_account():
+    types = {name: fields for name, fields in BALLOT_TYPES.items() if name != "EIP712Domain"}
+    signable = encode_typed_data(domain_data=DOMAIN, message_types=types, message_data=MESSAGE)
+    assert digest() == keccak(b"\x19" + signable.version + signable.header + signable.body)
+    signed = Account.sign_typed_data(PRIVATE_KEY, DOMAIN, types, MESSAGE)
+    assert bytes(signed.signature).hex() == SIGNATURE
+
+
+def test_recover_rejects_what_try_recover_rejects():
+    signature = bytes.fromhex(SIGNATURE)
+    r, s, v = signature[:32], int.from_bytes(signature[32:64], "big"), signature[64]
+    # s di paruh atas (malleable) dengan v dibalik: signer sama secara matematis, tapi ditolak
+    high_s = r + (2 * SECP256K1_HALF_N + 1 - s).to_bytes(32, "big") + bytes([55 - v])
+    assert recover_signer(digest(), high_s) is None
+    assert recover_signer(digest(), signature[:64] + b"\x01") is None
+    assert recover_signer(digest(), bytes(32) + signature[32:]) is None
+    # Pesan lain: signer lain, bukan error
+    other = ballot_digest(bytes.fromhex(SEPARATOR), VOTER, 3, MESSAGE["deadline"])
+    assert recover_signer(other, signature) not in (None, VOTER)
+
+
+def test_parse_signature():
+    assert parse_signature("0x" + SIGNATURE) == bytes.fromhex(SIGNATURE)
+    assert parse_signature(SIGNATURE) == bytes.fromhex(SIGNATURE)
+    assert parse_signature("0x" + SIGNATURE[:-2]) is None
+    assert parse_signature("0xzz") is None
+    assert parse_signature(None) is None
+
+
+def test_signature_verifier_batches_in_threads():
+    verifier = SignatureVerifier(workers=0, batch_size=4)
+
+    async def recover_all():
+        signature = bytes.fromhex(SIGNATURE)
+        return await asyncio.gather(*(verifier.recover(digest(), signature) for _ in range(6)),
+                                    verifier.recover(digest(), signature[:64] + b"\x00"))
+
+    assert asyncio.run(recover_all()) == [VOTER] * 6 + [None]
+    assert verifier.get_stats()["verified"] == 7
+    assert verifier.get_stats()["batches"] == 2
@@ -0,0 +1,44 @@
+import asyncio
+import io
+import json
+from starlette.datastructures import UploadFile
+from app.contracts import bulk_import
+
+
+class _Functions:
+    def addCandidates(self, names, image_cids):
+        return ("addCandidates", names, image_cids)
+
+
+class _Contract:
+    functions = _Functions()
+
+
+def run_import(monkeypatch, body):
+    async def next_nonce_async(w3, address, count=1):
+        return 5
+
+    async def build_transact(tx_function, user_address, gas_key=None, nonce=None):
+        return {"data": tx_function, "nonce": nonce}
+
+    monkeypatch.setattr(bulk_import, "next_nonce_async", next_nonce_async)
+    monkeypatch.setattr(bulk_import.pemilu_services_async, "contract", _Contract(), raising=False)
+    monkeypatch.setattr(bulk_import.pemilu_services_async, "build_transact", build_transact)
+
+    async def collect():
+        upload = UploadFile(io.BytesIO(body), filename="candidates.ndjson")
+        return [json.loads(line) async for line in bulk_import.stream_candidate_import(upload, "ndjson", "0xadmin")]
+
+    return asyncio.run(collect())
+
+
+def test_invalid_utf8_line_is_a_row_error(monkeypatch):
+    body = b'\xef\xbb\xbf{"name": "A", "imageCID": "Qa"}\r\n{"name": "\xff\xfe", "imageCID": "Qb"}\n\n{"name": "C", "imageCID": "Qc"}'
+    lines = run_import(monkeypatch, body)
+    errors = [line for line in lines if line["type"] == "error"]
+    assert [error["line"] for error in errors] == [2]
+    assert "Invalid row" in errors[0]["error"]
+    [transaction] = [line for line in lines if line["type"] == "transaction"]
+    assert transaction["lines"] == [1, 4]
+    assert transaction["tx"] == {"data": ["addCandidates", ["A", "C"], ["Qa", "Qc"]], "nonce": 5}
+    assert lines[-1] == {"type": "summary", "rows": 3, "accepted": 2, "errors": 1, "transactions": 1}
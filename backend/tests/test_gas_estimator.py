@@ -0,0 +1,115 @@
+import pytest
+from eth_utils import function_abi_to_4byte_selector
+from app.contracts import pemilu_services
+from app.utils import gas_estimator as gas_estimator_module
+from app.utils.gas_estimator import (
+    REGISTER_VOTER_KEY, GasEstimator, add_candidate_key, gas_key, vote_key,
+)
+
+
+@pytest.fixture
+def estimator():
+    return GasEstimator(ttl=60, default_margin=50000, min_margin=1000, sigmas=4, min_samples=3, window=8)
+
+
+def test_keys_follow_gas_relevant_state():
+    assert vote_key(True) == "vote:1" and vote_key(False) == "vote:0"
+    assert gas_key("registerAsVoter") == REGISTER_VOTER_KEY
+    # Nama < 32 byte berbagi slot dengan panjangnya; CID 46 byte butuh 2 slot
+    assert add_candidate_key("Budi", "Qm" + "a" * 44) == "addCandidate:0:2"
+    assert add_candidate_key("x" * 32, "") == "addCandidate:1:0"
+
+
+def test_cache_hit_after_live_estimate(estimator):
+    assert estimator.get_gas_limit("vote:0") is None
+    assert estimator.record_estimate("vote:0", 60000) == 110000
+    assert estimator.get_gas_limit("vote:0") == 110000
+    assert (estimator.hits, estimator.misses) == (1, 1)
+
+
+def test_estimate_expires_after_ttl(estimator, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(gas_estimator_module.time, "monotonic", lambda: now[0])
+    estimator.record_estimate("vote:0", 60000)
+    now[0] += 61
+    assert estimator.get_gas_limit("vote:0") is None
+
+
+def test_margin_adapts_to_observed_gas(estimator):
+    estimator.record_estimate("vote:0", 60000)
+    for gas_used in (59000, 59000):
+        estimator.observe("vote:0", gas_used)
+    # Sampel belum cukup: margin default
+    assert estimator.get_gas_limit("vote:0") == 110000
+    estimator.observe("vote:0", 59000)
+    # Varians nol: margin minimum
+    assert estimator.get_gas_limit("vote:0") == 61000
+    estimator.observe("vote:0", 59800)
+    stats = estimator.get_stats()["keys"]["vote:0"]
+    assert stats["samples"] == 4 and stats["maxGasUsed"] == 59800
+    assert estimator.get_gas_limit("vote:0") == 60000 + stats["margin"]
+    assert stats["margin"] > 1000
+
+
+def test_receipt_above_estimate_drops_it(estimator):
+    estimator.record_estimate("vote:1", 80000)
+    estimator.observe("vote:1", 80001)
+    assert estimator.get_gas_limit("vote:1") is None
+
+
+def test_load_observations_drops_stale_estimate(estimator):
+    estimator.record_estimate("vote:0", 60000)
+    leader = GasEstimator(min_samples=3, window=8)
+    leader.observe("vote:0", 61000)
+    estimator.load_observations(leader.export_observations())
+    assert estimator.get_stats()["keys"]["vote:0"]["samples"] == 1
+    assert estimator.get_gas_limit("vote:0") is None
+
+
+def _log(index):
+    return {"transactionHash": bytes([index]) * 32}
+
+
+def _tx(function):
+    [entry] = [entry for entry in pemilu_services.abi if entry.get("name") == function]
+    return {"input": function_abi_to_4byte_selector(entry) + bytes(32)}
+
+
+def _receipt(gas_used, sender, status=1):
+    return {"gasUsed": gas_used, "from": sender, "status": status}
+
+
+def test_calibrate_observes_single_calls_only(estimator, monkeypatch):
+    voter = "0x19E7E376E7C213B7E7e7e46cc70A5dD086DAff2A"
+    relayer = "0x" + "00" * 20
+    chain = {
+        "0x" + "01" * 32: (_tx("vote"), _receipt(59000, voter)),
+        "0x" + "02" * 32: (_tx("voteBatch"), _receipt(90000, relayer)),  # voteBatch satu ballot: diabaikan
+        "0x" + "06" * 32: (_tx("vote"), _receipt(59000, relayer)),  # pengirim bukan pemilih: diabaikan
+        "0x" + "03" * 32: (_tx("registerAsVoter"), _receipt(45000, voter)),
+        "0x" + "04" * 32: (_tx("registerVoters"), _receipt(47000, relayer)),  # batch satu baris: diabaikan
+    }
+    requested = []
+
+    def get_transaction_receipts(w3, tx_hashes):
+        requested.append(tx_hashes)
+        return [chain[tx_hash][1] for tx_hash in tx_hashes]
+
+    def get_transactions(w3, tx_hashes):
+        return [chain[tx_hash][0] for tx_hash in tx_hashes]
+
+    monkeypatch.setattr(gas_estimator_module.multicall, "get_transaction_receipts", get_transaction_receipts)
+    monkeypatch.setattr(gas_estimator_module.multicall, "get_transactions", get_transactions)
+    monkeypatch.setattr(gas_estimator_module, "shared_state", None)
+    estimator.calibrate(None, [
+        ("Voted", {"voter": voter}, _log(1), {"voteCount": 2}),
+        ("Voted", {"voter": voter}, _log(2), {"voteCount": 5}),
+        ("Voted", {"voter": voter}, _log(6), {"voteCount": 6}),
+        ("Voted", {"voter": voter}, _log(5), None),  # suara duplikat: tidak ada key
+        ("VoterRegistered", {"voter": voter}, _log(3), None),
+        ("VoterRegistered", {"voter": voter}, _log(4), None),
+    ])
+    assert len(requested) == 1 and len(requested[0]) == 5
+    observations = estimator.export_observations()
+    assert observations["vote:0"]["samples"] == 1 and observations["vote:0"]["maxUsed"] == 59000
+    assert observations[REGISTER_VOTER_KEY]["samples"] == 1
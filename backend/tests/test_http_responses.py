@@ -0,0 +1,72 @@
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app.utils.http_responses import CompressionMiddleware, conditional_json, dumps, etag_matches, make_etag
+
+ETAG = make_etag("candidates", 120)
+
+
+def test_make_etag_is_weak_and_follows_state():
+    assert ETAG.startswith('W/"') and ETAG.endswith('"')
+    assert make_etag("candidates", 120) == ETAG
+    assert make_etag("candidates", 121) != ETAG
+
+
+def test_etag_matches():
+    opaque = ETAG.removeprefix("W/")
+    assert not etag_matches(None, ETAG)
+    assert not etag_matches("", ETAG)
+    assert etag_matches("*", ETAG)
+    assert etag_matches(" * ", ETAG)
+    assert etag_matches(ETAG, ETAG)
+    # Perbandingan lemah: tag strong dengan opaque yang sama juga cocok
+    assert etag_matches(opaque, ETAG)
+    assert etag_matches(f'"other", {ETAG}', ETAG)
+    assert etag_matches(f'W/"other",{opaque}', ETAG)
+    assert not etag_matches('W/"other"', ETAG)
+    assert not etag_matches(opaque.strip('"'), ETAG)
+
+
+def test_dumps_falls_back_for_uint256():
+    assert dumps({"a": 1}) == b'{"a":1}'
+    assert dumps({"big": 2 ** 200}) == b'{"big":%d}' % 2 ** 200
+
+
+def app_with_routes():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    calls = []
+
+    @app.get("/items")
+    async def items(request: Request):
+        def build():
+            calls.append(1)
+            return [{"id": i, "name": f"Kandidat {i}"} for i in range(50)]
+        return await conditional_json(request, ("items", 7), build)
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter(["data: x\n\n" * 50]), media_type="text/event-stream")
+
+    return app, calls
+
+
+def test_conditional_json_answers_304_without_building():
+    app, calls = app_with_routes()
+    client = TestClient(app)
+    first = client.get("/items")
+    assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+    second = client.get("/items", headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 304 and second.content == b""
+    assert second.headers["etag"] == first.headers["etag"]
+    assert len(calls) == 1
+
+
+def test_compression_skips_live_streams():
+    app, _ = app_with_routes()
+    client = TestClient(app)
+    items = client.get("/items", headers={"Accept-Encoding": "gzip"})
+    assert items.headers["content-encoding"] == "gzip"
+    stream = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in stream.headers
+    assert stream.text.startswith("data: x")
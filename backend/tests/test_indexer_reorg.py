@@ -0,0 +1,127 @@
+import pytest
+from app.contracts import indexer as indexer_module
+from app.contracts.indexer import CandidateIndexer
+from app.contracts.results_store import ResultsStore
+
+VOTER = "0x19E7E376E7C213B7E7e7e46cc70A5dD086DAff2A"
+
+
+class _Hash:
+    def __init__(self, value):
+        self.value = value
+
+    def hex(self):
+        return self.value
+
+
+class _Block:
+    def __init__(self, block_hash):
+        self.hash = _Hash(block_hash)
+
+
+class _Eth:
+    """Chain palsu: nomor blok -> hash kanonik"""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def get_block(self, number):
+        return _Block(self.hashes[number])
+
+
+class _Web3:
+    def __init__(self):
+        self.eth = _Eth()
+
+
+class _Contract:
+    address = "0x" + "00" * 20
+
+
+def apply_block(store, number, block_hash, changes):
+    with store.transaction():
+        changes(store)
+        store.commit_checkpoint(number, block_hash)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / "indexer.db"), history_size=4)
+    store.reset("0x" + "00" * 20, 0)
+    yield store
+    store.close()
+
+
+def fill(store):
+    """Blok 1-3: kandidat, pemilih, suara; blok 4 menghapus kandidat 2"""
+    apply_block(store, 1, "h1", lambda s: (s.add_candidate(1, "A", "a", 1, 0), s.add_candidate(2, "B", "b", 1, 1)))
+    apply_block(store, 2, "h2", lambda s: s.register_voter(VOTER, 2))
+    apply_block(store, 3, "h3", lambda s: s.record_vote(VOTER, 1, 3, 0, 1000, "0xt"))
+    apply_block(store, 4, "h4", lambda s: s.remove_candidate(2, 4))
+
+
+def test_rewind_restores_rows(store):
+    fill(store)
+    assert store.rewind(lambda number, block_hash: number <= 2) == (2, "h2")
+    assert store.get_checkpoint()[1:] == (2, "h2")
+    assert [(c["id"], c["voteCount"]) for c in store.get_candidates()] == [(1, 0), (2, 0)]
+    assert store.get_voter(VOTER) == (True, False, 0)
+    assert store.get_vote(VOTER) is None
+    # Checkpoint setelah target ikut dibuang; blok baru bisa diterapkan lagi di atasnya
+    assert store.get_checkpoint_hash(3) is None
+    apply_block(store, 3, "h3b", lambda s: s.record_vote(VOTER, 2, 3, 0, 1001, "0xu"))
+    assert store.get_candidate(2)["voteCount"] == 1
+
+
+def test_rewind_without_canonical_checkpoint(store):
+    fill(store)
+    assert store.rewind(lambda number, block_hash: False) is None
+    assert store.get_checkpoint()[1:] == (4, "h4")
+
+
+def test_history_size_bounds_rewind_depth(store):
+    fill(store)
+    apply_block(store, 5, "h5", lambda s: None)
+    # history_size=4: checkpoint blok 1 sudah dipangkas
+    assert store.get_checkpoint_hash(1) is None
+    assert store.rewind(lambda number, block_hash: number <= 1) is None
+
+
+@pytest.fixture
+def chain_indexer(tmp_path, monkeypatch):
+    w3 = _Web3()
+    monkeypatch.setattr(indexer_module, "w3", w3)
+    monkeypatch.setattr(indexer_module, "contract", _Contract())
+    candidate_indexer = CandidateIndexer(db_path=str(tmp_path / "indexer.db"), start_block=1)
+    candidate_indexer.store.reset(_Contract.address, 0)
+    fill(candidate_indexer.store)
+    candidate_indexer.last_block, candidate_indexer.last_block_hash = 4, "h4"
+    w3.eth.hashes.update({1: "h1", 2: "h2", 3: "h3", 4: "h4"})
+    yield candidate_indexer, w3
+    candidate_indexer.store.close()
+
+
+def test_check_reorg_rewinds_to_canonical_checkpoint(chain_indexer):
+    candidate_indexer, w3 = chain_indexer
+    notified = []
+    candidate_indexer.add_listener(notified.append)
+
+    candidate_indexer._check_reorg()
+    assert candidate_indexer.last_block == 4 and not notified
+
+    # Blok 3 dan 4 diganti cabang lain
+    w3.eth.hashes.update({3: "x3", 4: "x4"})
+    candidate_indexer._check_reorg()
+    assert (candidate_indexer.last_block, candidate_indexer.last_block_hash) == (2, "h2")
+    assert candidate_indexer.get_voter(VOTER) == (True, False, 0)
+    [[snapshot]] = notified
+    assert snapshot["type"] == "snapshot" and snapshot["blockNumber"] == 2
+    assert [c["id"] for c in snapshot["candidates"]] == [1, 2]
+
+
+def test_check_reorg_resets_when_no_checkpoint_survives(chain_indexer):
+    candidate_indexer, w3 = chain_indexer
+    w3.eth.hashes.update({1: "x1", 2: "x2", 3: "x3", 4: "x4"})
+    candidate_indexer._check_reorg()
+    assert (candidate_indexer.last_block, candidate_indexer.last_block_hash) == (0, None)
+    assert candidate_indexer.get_candidates() == []
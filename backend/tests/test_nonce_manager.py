@@ -0,0 +1,126 @@
+import asyncio
+import pytest
+from app.utils import nonce_manager as nonce_module
+from app.utils.nonce_manager import NonceManager, SharedNonceManager
+from app.utils.shared_state import SharedState
+
+ADDRESS = "0x" + "ab" * 20
+
+
+@pytest.fixture(params=["local", "shared"])
+def manager(request, tmp_path):
+    if request.param == "local":
+        yield NonceManager(ttl=30)
+        return
+    state = SharedState(str(tmp_path / "shared.db"))
+    yield SharedNonceManager(state, ttl=30)
+    state.close()
+
+
+def test_reserve_is_sequential(manager):
+    manager.seed(ADDRESS, 7)
+    assert manager.reserve(ADDRESS) == 7
+    assert manager.reserve(ADDRESS, count=3) == 8
+    assert manager.reserve(ADDRESS) == 11
+
+
+def test_seed_within_ttl_is_ignored(manager):
+    manager.seed(ADDRESS, 7)
+    manager.reserve(ADDRESS)
+    manager.seed(ADDRESS, 7)
+    assert not manager.needs_seed(ADDRESS)
+    assert manager.reserve(ADDRESS) == 8
+
+
+def test_reseed_after_ttl(manager):
+    manager.ttl = 0
+    manager.seed(ADDRESS, 7)
+    manager.reserve(ADDRESS)
+    assert manager.needs_seed(ADDRESS)
+    manager.seed(ADDRESS, 20)
+    assert manager.reserve(ADDRESS) == 20
+
+
+def test_release_last_nonce_rolls_back(manager):
+    manager.seed(ADDRESS, 7)
+    nonce = manager.reserve(ADDRESS, count=2)
+    manager.release(ADDRESS, nonce, 2)
+    assert manager.reserve(ADDRESS) == 7
+    assert manager.get_status(ADDRESS)["gaps"] == []
+
+
+def test_release_fills_gap_first(manager):
+    manager.seed(ADDRESS, 7)
+    failed = manager.reserve(ADDRESS)
+    assert manager.reserve(ADDRESS) == 8
+    manager.release(ADDRESS, failed)
+    assert manager.get_status(ADDRESS)["gaps"] == [7]
+    # Reservasi berurutan lebih dari satu tidak boleh memakai celah
+    assert manager.reserve(ADDRESS, count=2) == 9
+    assert manager.reserve(ADDRESS) == 7
+    assert manager.reserve(ADDRESS) == 11
+
+
+def test_release_gap_below_top_merges(manager):
+    manager.seed(ADDRESS, 7)
+    first, second = manager.reserve(ADDRESS), manager.reserve(ADDRESS)
+    manager.release(ADDRESS, first)
+    manager.release(ADDRESS, second)
+    assert manager.get_status(ADDRESS)["gaps"] == []
+    assert manager.reserve(ADDRESS) == 7
+
+
+def test_release_unknown_nonce_is_ignored(manager):
+    manager.seed(ADDRESS, 7)
+    manager.release(ADDRESS, 50)
+    assert manager.reserve(ADDRESS) == 7
+
+
+def test_seed_clears_gaps(manager):
+    manager.ttl = 0
+    manager.seed(ADDRESS, 7)
+    failed = manager.reserve(ADDRESS)
+    manager.reserve(ADDRESS)
+    manager.release(ADDRESS, failed)
+    manager.seed(ADDRESS, 9)
+    assert manager.get_status(ADDRESS)["gaps"] == []
+    assert manager.reserve(ADDRESS) == 9
+
+
+def test_handle_error_resyncs_on_nonce_errors(manager):
+    manager.seed(ADDRESS, 7)
+    assert not manager.handle_error(ADDRESS, ValueError("execution reverted: Voter is not registered"))
+    assert not manager.needs_seed(ADDRESS)
+    assert manager.handle_error(ADDRESS, ValueError("{'code': -32000, 'message': 'nonce too low'}"))
+    assert manager.needs_seed(ADDRESS)
+
+
+class _Eth:
+    def __init__(self, pending):
+        self.pending = pending
+        self.calls = 0
+
+    async def get_transaction_count(self, address, block_identifier):
+        assert block_identifier == "pending"
+        self.calls += 1
+        return self.pending
+
+
+class _Web3:
+    def __init__(self, pending):
+        self.eth = _Eth(pending)
+
+
+def test_next_nonce_async_seeds_once(monkeypatch):
+    monkeypatch.setattr(nonce_module, "nonce_manager", NonceManager(ttl=30))
+    w3 = _Web3(pending=4)
+
+    async def reserve_all():
+        return [
+            await nonce_module.next_nonce_async(w3, ADDRESS),
+            await nonce_module.next_nonce_async(w3, ADDRESS, count=5),
+            await nonce_module.next_nonce_async(w3, ADDRESS),
+        ]
+
+    assert asyncio.run(reserve_all()) == [4, 5, 10]
+    assert w3.eth.calls == 1
@@ -0,0 +1,146 @@
+import asyncio
+import pytest
+from web3.exceptions import TimeExhausted, TransactionNotFound
+from app.contracts import relayer
+from app.contracts.relayer import BallotRejected, BallotRelayer
+
+VOTER = "0x19E7E376E7C213B7E7e7e46cc70A5dD086DAff2A"
+
+
+class _Store:
+    """Indexer yang tertinggal: hanya tahu isi `voters` dan `candidates`"""
+
+    is_ready = True
+
+    def __init__(self, voters=None, candidates=()):
+        self.voters = voters or {}
+        self.candidates = set(candidates)
+
+    def get_voter(self, address):
+        return self.voters.get(address)
+
+    def get_candidate(self, candidate_id):
+        return {"id": candidate_id} if candidate_id in self.candidates else None
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    state = {"voters": {}, "candidates": set()}
+
+    async def get_voter_details(address):
+        return state["voters"].get(address, (False, False, 0))
+
+    async def get_candidate_details(candidate_id):
+        return {"id": candidate_id} if candidate_id in state["candidates"] else None
+
+    monkeypatch.setattr(relayer.pemilu_services_async, "get_voter_details", get_voter_details)
+    monkeypatch.setattr(relayer.pemilu_services_async, "get_candidate_details", get_candidate_details)
+    return state
+
+
+def check(candidate_id=1):
+    return asyncio.run(BallotRelayer(private_key="")._check_state(VOTER, candidate_id))
+
+
+def test_check_state_falls_back_to_chain(monkeypatch, chain):
+    monkeypatch.setattr(relayer, "candidate_indexer", _Store(candidates=[1]))
+    with pytest.raises(BallotRejected, match="not registered"):
+        check()
+    # Baru terdaftar di chain, belum terindeks
+    chain["voters"][VOTER] = (True, False, 0)
+    check()
+    chain["voters"][VOTER] = (True, True, 1)
+    with pytest.raises(BallotRejected, match="already voted"):
+        check()
+
+
+def test_check_state_candidate_not_indexed_yet(monkeypatch, chain):
+    monkeypatch.setattr(relayer, "candidate_indexer", _Store(voters={VOTER: (True, False, 0)}))
+    with pytest.raises(BallotRejected, match="Invalid candidate"):
+        check(candidate_id=4)
+    chain["candidates"].add(4)
+    check(candidate_id=4)
+
+
+def test_statuses_keep_only_recent_settled():
+    ballot_relayer = BallotRelayer(private_key="", max_statuses=3)
+    ballot_relayer._set_status("0x1", "queued")
+    for voter in ("0x2", "0x3", "0x4"):
+        ballot_relayer._set_status(voter, "confirmed")
+    ballot_relayer._set_status("0x5", "submitted")
+    # Yang masih berjalan tidak pernah dibuang, yang selesai paling lama dibuang dulu
+    assert list(ballot_relayer._statuses) == ["0x1", "0x4", "0x5"]
+    ballot_relayer._set_status("0x1", "skipped")
+    ballot_relayer._set_status("0x6", "failed")
+    assert list(ballot_relayer._statuses) == ["0x5", "0x1", "0x6"]
+
+
+class _Eth:
+    """Node palsu tanpa receipt untuk batch yang dilacak"""
+
+    def __init__(self, known=True, mined_nonce=0, receipt=None):
+        self.known = known
+        self.mined_nonce = mined_nonce
+        self.receipt = receipt
+
+    async def wait_for_transaction_receipt(self, tx_hash, timeout, poll_latency):
+        raise TimeExhausted(f"no receipt after {timeout}s")
+
+    async def get_transaction_receipt(self, tx_hash):
+        if self.receipt is None:
+            raise TransactionNotFound(tx_hash)
+        return self.receipt
+
+    async def get_transaction(self, tx_hash):
+        if not self.known:
+            raise TransactionNotFound(tx_hash)
+        return {"hash": tx_hash}
+
+    async def get_transaction_count(self, address):
+        return self.mined_nonce
+
+
+class _Web3:
+    def __init__(self, **fields):
+        self.eth = _Eth(**fields)
+
+
+def track_timed_out(monkeypatch, nonce=3, **fields):
+    monkeypatch.setattr(relayer, "w3", _Web3(**fields))
+    resynced = []
+    monkeypatch.setattr(relayer.nonce_manager, "resync", resynced.append)
+    ballot_relayer = BallotRelayer(private_key="0x" + "11" * 32, max_attempts=3)
+    ballots = [relayer._Ballot(VOTER, 1, 2**32, b"")]
+    ballot_relayer._set_status(VOTER, "submitted", txHash="0xabc")
+    asyncio.run(ballot_relayer._track_receipt("0xabc", nonce, ballots))
+    return ballot_relayer, resynced
+
+
+def test_timed_out_batch_dropped_is_requeued(monkeypatch):
+    ballot_relayer, resynced = track_timed_out(monkeypatch, known=False, mined_nonce=3)
+    assert ballot_relayer.get_ballot(VOTER)["status"] == "queued"
+    assert list(ballot_relayer._queue) == [VOTER]
+    # Nonce 3 belum terpakai: manager di-seed ulang dari chain
+    assert resynced == [ballot_relayer.account.address]
+
+
+def test_timed_out_batch_replaced_is_requeued(monkeypatch):
+    ballot_relayer, resynced = track_timed_out(monkeypatch, known=True, mined_nonce=4)
+    assert ballot_relayer.get_ballot(VOTER)["status"] == "queued"
+    assert resynced == []
+
+
+def test_timed_out_batch_still_pending_fails(monkeypatch):
+    ballot_relayer, _ = track_timed_out(monkeypatch, known=True, mined_nonce=3)
+    status = ballot_relayer.get_ballot(VOTER)
+    assert status["status"] == "failed" and "still pending" in status["reason"]
+    assert not ballot_relayer._queue
+    # Pemilih boleh mengirim ballot lagi
+    assert not ballot_relayer._is_pending(VOTER)
+
+
+def test_receipt_after_timeout_settles_batch(monkeypatch):
+    receipt = {"status": 1, "logs": [], "blockNumber": 9, "gasUsed": 80000}
+    ballot_relayer, _ = track_timed_out(monkeypatch, mined_nonce=4, receipt=receipt)
+    assert ballot_relayer.get_ballot(VOTER)["status"] == "confirmed"
+    assert ballot_relayer.get_ballot(VOTER)["blockNumber"] == 9
@@ -0,0 +1,96 @@
+import pytest
+from app.contracts.results import ResultsEngine, rank_candidates
+from app.contracts.results_store import ResultsStore
+
+START = 1_700_000_000
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    store.reset("0x" + "00" * 20, 0)
+    with store.transaction():
+        store.add_candidate(1, "A", "cid-a", 1, 0)
+        store.add_candidate(2, "B", "cid-b", 1, 1)
+        store.add_candidate(3, "C", "cid-c", 1, 2)
+        store.set_voting_period(START, START + 3600, 1)
+        store.set_registered_voters(10, 1)
+        store.commit_checkpoint(1, "0x01")
+    yield store
+    store.close()
+
+
+def vote(store, block_number, voter, candidate_id, timestamp):
+    with store.transaction():
+        store.record_vote(voter, candidate_id, block_number, 0, timestamp, f"0x{block_number:064x}")
+        store.commit_checkpoint(block_number, f"0x{block_number:02x}")
+
+
+def test_rank_candidates_competition_ranks():
+    ranked = rank_candidates([
+        {"id": 1, "voteCount": 2}, {"id": 2, "voteCount": 5}, {"id": 3, "voteCount": 2}, {"id": 4, "voteCount": 0},
+    ], 9)
+    assert [(c["id"], c["rank"]) for c in ranked] == [(2, 1), (1, 2), (3, 2), (4, 4)]
+    assert ranked[0]["share"] == round(5 / 9, 4)
+
+
+def test_results_totals_and_buckets(store):
+    vote(store, 2, "0xa", 1, START + 10)
+    vote(store, 3, "0xb", 2, START + 70)
+    vote(store, 4, "0xc", 1, START + 130)
+    data = ResultsEngine(store, use_numpy=False).get_results(bucket_seconds=60)
+    assert data["totalVotes"] == 3
+    assert data["turnout"] == 0.3
+    assert data["winner"]["id"] == 1
+    assert [bucket["votes"] for bucket in data["votesOverTime"]["buckets"]] == [1, 1, 1]
+    assert [bucket["cumulative"] for bucket in data["votesOverTime"]["buckets"]] == [1, 2, 3]
+    assert data["votesOverTime"]["buckets"][1]["byCandidate"] == {2: 1}
+
+
+def test_results_are_incremental(store):
+    engine = ResultsEngine(store, use_numpy=False)
+    vote(store, 2, "0xa", 1, START + 10)
+    assert engine.get_results(bucket_seconds=60)["totalVotes"] == 1
+    vote(store, 3, "0xb", 1, START + 20)
+    vote(store, 4, "0xc", 3, START + 200)
+    buckets = engine.get_results(bucket_seconds=60)["votesOverTime"]["buckets"]
+    assert [bucket["byCandidate"] for bucket in buckets] == [{1: 2}, {}, {}, {3: 1}]
+
+
+def test_votes_for_removed_candidate_count_as_other(store):
+    vote(store, 2, "0xa", 2, START + 10)
+    vote(store, 3, "0xb", 1, START + 20)
+    with store.transaction():
+        store.remove_candidate(2, 4)
+        store.commit_checkpoint(4, "0x04")
+    bucket = ResultsEngine(store, use_numpy=False).get_results(bucket_seconds=60)["votesOverTime"]["buckets"][0]
+    assert bucket == {**bucket, "votes": 2, "byCandidate": {1: 1}, "other": 1}
+
+
+def test_results_reload_after_rewind(store):
+    engine = ResultsEngine(store, use_numpy=False)
+    vote(store, 2, "0xa", 1, START + 10)
+    vote(store, 3, "0xb", 2, START + 20)
+    assert engine.get_results()["totalVotes"] == 2
+    store.rewind(lambda number, block_hash: number <= 2)
+    data = engine.get_results()
+    assert data["blockNumber"] == 2
+    assert data["totalVotes"] == 1
+    assert [c["voteCount"] for c in data["candidates"] if c["id"] == 2] == [0]
+
+
+def test_numpy_and_python_counts_agree(store):
+    pytest.importorskip("numpy")
+    for block_number, candidate_id in enumerate([1, 3, 7, 2, 1, 0, 3], start=2):
+        vote(store, block_number, f"0x{block_number:x}", candidate_id, START + block_number * 25)
+    python = ResultsEngine(store, use_numpy=False).get_results(bucket_seconds=60)
+    vectorized = ResultsEngine(store, use_numpy=True).get_results(bucket_seconds=60)
+    assert python["votesOverTime"] == vectorized["votesOverTime"]
+    assert sum(bucket["other"] for bucket in python["votesOverTime"]["buckets"]) == 2
+
+
+def test_count_without_candidates(store):
+    vote(store, 2, "0xa", 1, START + 10)
+    engine = ResultsEngine(store, use_numpy=False)
+    engine.get_results()
+    assert engine._count(0, [], START, 60, 1) == [[1]]
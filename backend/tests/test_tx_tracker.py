@@ -0,0 +1,121 @@
+import asyncio
+import pytest
+from web3 import Web3
+from app.contracts import tx_tracker as tracker_module
+from app.contracts.tx_tracker import TrackerFull, TransactionTracker, TransactionUnknown, normalize_tx_hash
+
+RATE_LIMITED = {"code": -32005, "message": "rate limit exceeded"}
+VOTE_SELECTOR = "0x" + Web3.keccak(text="vote(uint256)")[:4].hex().removeprefix("0x")
+
+
+def tx_hash(n):
+    return f"0x{n:064x}"
+
+
+class _Provider:
+    """Node palsu untuk batch JSON-RPC mentah: hash -> hasil, atau error per item"""
+
+    def __init__(self):
+        self.transactions = {}
+        self.receipts = {}
+        self.errors = {}
+
+    async def make_batch_request(self, requests):
+        responses = []
+        for request_id, (method, (tx_hash,)) in enumerate(requests):
+            if (method, tx_hash) in self.errors:
+                responses.append({"jsonrpc": "2.0", "id": request_id, "error": self.errors[(method, tx_hash)]})
+                continue
+            source = self.receipts if method == "eth_getTransactionReceipt" else self.transactions
+            responses.append({"jsonrpc": "2.0", "id": request_id, "result": source.get(tx_hash)})
+        return responses
+
+
+class _Web3:
+    def __init__(self):
+        self.provider = _Provider()
+
+
+@pytest.fixture
+def node(monkeypatch):
+    w3 = _Web3()
+    monkeypatch.setattr(tracker_module, "w3", w3)
+    return w3.provider
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    return TransactionTracker(db_path=str(tmp_path / "tx.db"), max_pending=3, drop_after=0, retention=3600)
+
+
+def broadcast(node, n):
+    node.transactions[tx_hash(n)] = {"hash": tx_hash(n), "input": VOTE_SELECTOR + "00" * 32}
+    return tx_hash(n)
+
+
+def test_normalize_tx_hash():
+    assert normalize_tx_hash(" 0x" + "AB" * 32) == "0x" + "ab" * 32
+    assert normalize_tx_hash("ab" * 32) == "0x" + "ab" * 32
+    with pytest.raises(ValueError):
+        normalize_tx_hash("0x1234")
+
+
+def test_track_requires_known_transaction(node, tracker):
+    with pytest.raises(TransactionUnknown):
+        asyncio.run(tracker.track(tx_hash(1)))
+    assert tracker.get(tx_hash(1)) is None
+    assert asyncio.run(tracker.track(broadcast(node, 1)))["status"] == "pending"
+    # Melaporkan ulang tidak mengubah apa pun
+    assert asyncio.run(tracker.track(tx_hash(1)))["status"] == "pending"
+
+
+def test_track_lookup_error_is_not_unknown(node, tracker):
+    node.errors[("eth_getTransactionByHash", tx_hash(1))] = RATE_LIMITED
+    with pytest.raises(Exception, match="rate limit"):
+        asyncio.run(tracker.track(tx_hash(1)))
+
+
+def test_track_limits_pending(node, tracker):
+    for n in range(3):
+        asyncio.run(tracker.track(broadcast(node, n)))
+    with pytest.raises(TrackerFull):
+        asyncio.run(tracker.track(broadcast(node, 3)))
+
+
+def test_resolve_settles_mined_and_dropped(node, tracker):
+    mined, reverted, gone = (broadcast(node, n) for n in range(3))
+    for hash_ in (mined, reverted, gone):
+        asyncio.run(tracker.track(hash_))
+    node.receipts[mined] = {"status": "0x1", "gasUsed": "0x5208", "blockNumber": "0x10", "from": "0xabc"}
+    node.receipts[reverted] = {"status": "0x0", "gasUsed": "0x6000", "blockNumber": "0x10"}
+    del node.transactions[gone]
+
+    assert asyncio.run(tracker.resolve()) == 3
+    assert tracker.get(mined) == {**tracker.get(mined), "status": "confirmed", "gasUsed": 21000,
+                                  "blockNumber": 16, "function": "vote", "from": "0xabc"}
+    assert tracker.get(reverted)["status"] == "failed"
+    assert tracker.get(gone)["status"] == "dropped"
+
+
+def test_resolve_keeps_pending_on_rpc_errors(node, tracker):
+    rate_limited, lookup_failed = broadcast(node, 1), broadcast(node, 2)
+    for hash_ in (rate_limited, lookup_failed):
+        asyncio.run(tracker.track(hash_))
+    # Receipt gagal dibaca, dan untuk hash kedua lookup mempool juga gagal
+    node.errors[("eth_getTransactionReceipt", rate_limited)] = RATE_LIMITED
+    node.errors[("eth_getTransactionByHash", lookup_failed)] = RATE_LIMITED
+    del node.transactions[rate_limited]
+    del node.transactions[lookup_failed]
+
+    assert asyncio.run(tracker.resolve()) == 0
+    assert tracker.count_by_status() == {"pending": 2}
+
+    node.errors.clear()
+    assert asyncio.run(tracker.resolve()) == 2
+    assert tracker.count_by_status() == {"dropped": 2}
+
+
+def test_get_many_keeps_request_order(node, tracker):
+    asyncio.run(tracker.track(broadcast(node, 2)))
+    statuses = tracker.get_many([tx_hash(1), tx_hash(2)])
+    assert [(s["txHash"], s["status"]) for s in statuses] == [(tx_hash(1), "unknown"), (tx_hash(2), "pending")]
@@ -0,0 +1,55 @@
+import asyncio
+import json
+import pytest
+from app.contracts import pemilu_services_async
+
+VOTERS = [
+    {"address": f"0x{i:040x}", "isRegistered": True, "hasVoted": i % 2 == 0, "voteCandidateId": 1 if i % 2 == 0 else 0}
+    for i in range(7)
+]
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    reads = []
+
+    async def get_voters_page(offset, limit, block_identifier="latest"):
+        reads.append((offset, block_identifier))
+        page = VOTERS[offset:offset + limit]
+        return page, offset + len(page)
+
+    monkeypatch.setattr(pemilu_services_async.config, "VOTERS_PAGE_SIZE", 3)
+    monkeypatch.setattr(pemilu_services_async, "get_voters_page", get_voters_page)
+    return reads
+
+
+def stream(cursor, limit, block_identifier="latest", **filters):
+    async def collect():
+        first_page = await pemilu_services_async.get_voters_page(cursor, 3, block_identifier)
+        parts = pemilu_services_async.stream_voters_json(first_page, cursor, limit, block_identifier=block_identifier, **filters)
+        return "".join([part async for part in parts])
+    return json.loads(asyncio.run(collect()))
+
+
+def test_limit_on_last_voter_has_no_cursor(chain):
+    assert stream(0, 7)["nextCursor"] is None
+    assert stream(4, 3) == {"voters": VOTERS[4:], "count": 3, "nextCursor": None}
+
+
+def test_cursor_points_at_next_voter(chain):
+    page = stream(0, 3)
+    assert page == {"voters": VOTERS[:3], "count": 3, "nextCursor": 3}
+    assert stream(page["nextCursor"], 3)["nextCursor"] == 6
+
+
+def test_filtered_cursor_skips_non_matching(chain):
+    # Pemilih genap sudah memilih: 0, 2, 4, 6
+    page = stream(0, 2, has_voted=True)
+    assert [voter["address"] for voter in page["voters"]] == [VOTERS[0]["address"], VOTERS[2]["address"]]
+    assert page["nextCursor"] == 4
+    assert stream(4, 2, has_voted=True) == {"voters": [VOTERS[4], VOTERS[6]], "count": 2, "nextCursor": None}
+
+
+def test_pages_are_read_at_one_block(chain):
+    stream(0, 7, block_identifier=42)
+    assert chain == [(0, 42), (3, 42), (6, 42)]
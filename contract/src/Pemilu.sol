@@ -2,12 +2,23 @@
 pragma solidity ^0.8.20;
 
 import "@openzeppelin/contracts/access/Ownable.sol";
+import "@openzeppelin/contracts/utils/cryptography/ECDSA.sol";
+import "@openzeppelin/contracts/utils/cryptography/EIP712.sol";
+import "@openzeppelin/contracts/utils/cryptography/MerkleProof.sol";
+
+contract Pemilu is Ownable, EIP712 {
+    // ============ Constants ============
+    bytes32 public constant BALLOT_TYPEHASH =
+        keccak256("Ballot(address voter,uint256 candidateId,uint256 deadline)");
 
-contract Pemilu is Ownable {
     // ============ State Variables ============
     uint public startTime;
     uint public endTime;
     uint public candidateCount;
+
+    // Allowlist pemilih: root Merkle dari daftar pemilih, tanpa registrasi per pemilih
+    bytes32 public voterMerkleRoot;
+    uint public voterAllowlistSize;
     
     // Mappings
     mapping(uint => bool) private idExistsCandidate;
@@ -15,6 +26,8 @@ contract Pemilu is Ownable {
     mapping(uint => Candidate) public candidates;
     mapping(address => Voter) public voters;
     mapping(address => bool) public admins;
+    // Pemilih yang dihapus admin tidak bisa masuk lagi lewat allowlist
+    mapping(address => bool) public removedVoters;
     
     // Arrays
     address[] private registeredVoters;
@@ -34,6 +47,24 @@ contract Pemilu is Ownable {
         uint voteCandidateId;
     }
 
+    // Suara yang ditandatangani pemilih (EIP-712) dan dikirim relayer lewat voteBatch
+    struct SignedBallot {
+        address voter;
+        uint candidateId;
+        uint deadline;
+        bytes signature;
+    }
+
+    // Alasan satu ballot di voteBatch dilewati; Valid berarti suara dihitung
+    enum BallotStatus {
+        Valid,
+        InvalidSignature,
+        Expired,
+        NotRegistered,
+        AlreadyVoted,
+        InvalidCandidate
+    }
+
     // ============ Events ============
     // Admin Events
     event AdminAdded(address indexed admin);
@@ -47,6 +78,8 @@ contract Pemilu is Ownable {
     event VoterRegistered(address indexed voter);
     event VoterRemoved(address indexed voter);
     event Voted(address indexed voter, uint candidateId);
+    event BallotSkipped(address indexed voter, BallotStatus reason);
+    event VoterMerkleRootSet(bytes32 root, uint voterCount);
     
     // Voting Events
     event WinnerDeclared(uint id, string name, uint voteCount);
@@ -70,7 +103,7 @@ contract Pemilu is Ownable {
     }
 
     // ============ Constructor ============
-    constructor() Ownable(msg.sender) {
+    constructor() Ownable(msg.sender) EIP712("Pemilu", "1") {
         admins[msg.sender] = true;
         emit AdminAdded(msg.sender);
     }
@@ -92,15 +125,14 @@ contract Pemilu is Ownable {
     }
 
     function addCandidate(string memory _name, string memory _imageCID) public onlyAdmin {
-        uint id = generateId();
-        while (idExistsCandidate[id]) {
-            id = uint(keccak256(abi.encodePacked(id, block.prevrandao))) % 10**10;
-        }
+        _addCandidate(_name, _imageCID);
+    }
 
-        candidateCount++;
-        idExistsCandidate[id] = true;
-        candidates[id] = Candidate(id, _name, 0, _imageCID);
-        emit CandidateAdded(id, _name, _imageCID);
+    function addCandidates(string[] memory _names, string[] memory _imageCIDs) public onlyAdmin {
+        require(_names.length == _imageCIDs.length, "Jumlah nama dan imageCID tidak sama");
+        for (uint i = 0; i < _names.length; i++) {
+            _addCandidate(_names[i], _imageCIDs[i]);
+        }
     }
 
     function removeCandidate(uint _candidateId) public onlyAdmin {
@@ -115,11 +147,25 @@ contract Pemilu is Ownable {
         emit CandidateRemoved(_candidateId, candidateName);
     }
 
+    function registerVoters(address[] memory _voterAddresses) public onlyAdmin {
+        for (uint i = 0; i < _voterAddresses.length; i++) {
+            address voterAddress = _voterAddresses[i];
+            // Lewati alamat yang sudah terdaftar agar satu duplikat tidak menggagalkan batch
+            if (voterAddress == address(0) || voters[voterAddress].isRegistered) {
+                continue;
+            }
+            voters[voterAddress].isRegistered = true;
+            registeredVoters.push(voterAddress);
+            emit VoterRegistered(voterAddress);
+        }
+    }
+
     function removeVoter(address _voterAddress) public onlyAdmin {
         require(voters[_voterAddress].isRegistered, "Pemilih tidak terdaftar");
         require(!voters[_voterAddress].hasVoted, "Tidak dapat menghapus pemilih yang sudah memilih");
         
         delete voters[_voterAddress];
+        removedVoters[_voterAddress] = true;
         emit VoterRemoved(_voterAddress);
     }
 
@@ -130,6 +176,14 @@ contract Pemilu is Ownable {
         endTime = _endTime;
     }
 
+    // The root is built off-chain from the voter roll (leaf = keccak256(keccak256(abi.encode(voter))),
+    // sorted pairs, as OpenZeppelin's MerkleProof expects). Setting it to zero turns the allowlist off.
+    function setVoterMerkleRoot(bytes32 _root, uint _voterCount) public onlyAdmin {
+        voterMerkleRoot = _root;
+        voterAllowlistSize = _voterCount;
+        emit VoterMerkleRootSet(_root, _voterCount);
+    }
+
     function getVoteCount(uint _candidateId) public view onlyAdmin returns (uint) {
         require(_candidateId > 0 && _candidateId <= candidateCount, "Kandidat tidak valid");
         return candidates[_candidateId].voteCount;
@@ -149,11 +203,67 @@ contract Pemilu is Ownable {
         require(!sender.hasVoted, "Sudah memilih");
         require(candidates[_candidateId].id != 0, "Kandidat tidak valid");
 
-        sender.hasVoted = true;
-        sender.voteCandidateId = _candidateId;
-        candidates[_candidateId].voteCount++;
+        _castVote(msg.sender, _candidateId);
+    }
+
+    // Vote as a voter on the allowlist: the proof replaces the registerAsVoter() transaction.
+    // The voter is registered on the way, like registerAsVoter(), unless an admin removed them.
+    function voteWithProof(uint _candidateId, bytes32[] calldata _proof) public onlyDuringVoting {
+        Voter storage sender = voters[msg.sender];
+        if (!sender.isRegistered) {
+            require(!removedVoters[msg.sender], "Pemilih telah dihapus");
+            require(isAllowlisted(msg.sender, _proof), "Anda tidak terdaftar sebagai pemilih");
+            sender.isRegistered = true;
+            registeredVoters.push(msg.sender);
+            emit VoterRegistered(msg.sender);
+        }
+        require(!sender.hasVoted, "Sudah memilih");
+        require(candidates[_candidateId].id != 0, "Kandidat tidak valid");
+
+        _castVote(msg.sender, _candidateId);
+    }
+
+    // ============ Relayer Functions ============
+    // Count ballots signed off-chain by their voters; anyone may submit them.
+    // Invalid ballots are skipped with a BallotSkipped event instead of reverting,
+    // so one bad signature or duplicate does not fail the whole batch.
+    function voteBatch(SignedBallot[] calldata _ballots) public onlyDuringVoting returns (uint accepted) {
+        for (uint i = 0; i < _ballots.length; i++) {
+            SignedBallot calldata ballot = _ballots[i];
+            BallotStatus status = checkBallot(ballot);
+            if (status != BallotStatus.Valid) {
+                emit BallotSkipped(ballot.voter, status);
+                continue;
+            }
+            _castVote(ballot.voter, ballot.candidateId);
+            accepted++;
+        }
+    }
+
+    function hashBallot(address _voter, uint _candidateId, uint _deadline) public view returns (bytes32) {
+        return _hashTypedDataV4(keccak256(abi.encode(BALLOT_TYPEHASH, _voter, _candidateId, _deadline)));
+    }
 
-        emit Voted(msg.sender, _candidateId);
+    function checkBallot(SignedBallot calldata _ballot) public view returns (BallotStatus) {
+        bytes32 digest = hashBallot(_ballot.voter, _ballot.candidateId, _ballot.deadline);
+        (address signer, ECDSA.RecoverError error, ) = ECDSA.tryRecover(digest, _ballot.signature);
+        if (error != ECDSA.RecoverError.NoError || signer != _ballot.voter) {
+            return BallotStatus.InvalidSignature;
+        }
+        if (block.timestamp > _ballot.deadline) {
+            return BallotStatus.Expired;
+        }
+        Voter storage voter = voters[_ballot.voter];
+        if (!voter.isRegistered) {
+            return BallotStatus.NotRegistered;
+        }
+        if (voter.hasVoted) {
+            return BallotStatus.AlreadyVoted;
+        }
+        if (candidates[_ballot.candidateId].id == 0) {
+            return BallotStatus.InvalidCandidate;
+        }
+        return BallotStatus.Valid;
     }
 
     // ============ Public View Functions ============
@@ -161,6 +271,14 @@ contract Pemilu is Ownable {
         return admins[_address] || owner() == _address;
     }
 
+    function isAllowlisted(address _voter, bytes32[] calldata _proof) public view returns (bool) {
+        if (voterMerkleRoot == bytes32(0)) {
+            return false;
+        }
+        bytes32 leaf = keccak256(bytes.concat(keccak256(abi.encode(_voter))));
+        return MerkleProof.verifyCalldata(_proof, voterMerkleRoot, leaf);
+    }
+
     function getCandidateDetails(uint _candidateId) public view returns (
         uint id,
         string memory name,
@@ -223,6 +341,38 @@ contract Pemilu is Ownable {
         return (voterAddresses, voterIsRegistered, voterHasVoted, voterCandidateIds);
     }
 
+    function getVotersPage(uint _offset, uint _limit) public view returns (
+        address[] memory addresses,
+        bool[] memory isRegistered,
+        bool[] memory hasVoted,
+        uint[] memory voteCandidateIds,
+        uint nextOffset
+    ) {
+        uint totalVoters = registeredVoters.length;
+        if (_offset > totalVoters) {
+            _offset = totalVoters;
+        }
+        uint size = _limit < totalVoters - _offset ? _limit : totalVoters - _offset;
+        uint end = _offset + size;
+
+        addresses = new address[](size);
+        isRegistered = new bool[](size);
+        hasVoted = new bool[](size);
+        voteCandidateIds = new uint[](size);
+
+        for (uint i = 0; i < size; i++) {
+            address voterAddress = registeredVoters[_offset + i];
+            Voter memory voter = voters[voterAddress];
+
+            addresses[i] = voterAddress;
+            isRegistered[i] = voter.isRegistered;
+            hasVoted[i] = voter.hasVoted;
+            voteCandidateIds[i] = voter.voteCandidateId;
+        }
+
+        return (addresses, isRegistered, hasVoted, voteCandidateIds, end);
+    }
+
     function getVoterDetails(address _voterAddress) public view returns (
         bool isRegistered,
         bool hasVoted,
@@ -267,6 +417,27 @@ contract Pemilu is Ownable {
     }
 
     // ============ Private Functions ============
+    function _castVote(address _voter, uint _candidateId) private {
+        Voter storage voter = voters[_voter];
+        voter.hasVoted = true;
+        voter.voteCandidateId = _candidateId;
+        candidates[_candidateId].voteCount++;
+
+        emit Voted(_voter, _candidateId);
+    }
+
+    function _addCandidate(string memory _name, string memory _imageCID) private {
+        uint id = generateId();
+        while (idExistsCandidate[id]) {
+            id = uint(keccak256(abi.encodePacked(id, block.prevrandao))) % 10**10;
+        }
+
+        candidateCount++;
+        idExistsCandidate[id] = true;
+        candidates[id] = Candidate(id, _name, 0, _imageCID);
+        emit CandidateAdded(id, _name, _imageCID);
+    }
+
     function generateId() private view returns (uint) {
         uint randomId = uint(keccak256(abi.encodePacked(msg.sender, block.timestamp, candidateCount))) % 10**10;
         return randomId;
@@ -11,6 +11,8 @@ contract PemiluTest is Test {
     address voter1;
     address voter2;
 
+    event BallotSkipped(address indexed voter, Pemilu.BallotStatus reason);
+
     function setUp() public {
     owner = address(this);         // test contract = owner
     voter1 = vm.addr(1);           // voter terisolasi
@@ -70,5 +72,241 @@ contract PemiluTest is Test {
         pemilu.vote(1);
     }
 
+    function test_addCandidates() public {
+        string[] memory names = new string[](2);
+        string[] memory imageCIDs = new string[](2);
+        names[0] = "Candidate 1";
+        names[1] = "Candidate 2";
+        imageCIDs[0] = "imageCID1";
+        imageCIDs[1] = "imageCID2";
+
+        pemilu.addCandidates(names, imageCIDs);
+
+        assertEq(pemilu.candidateCount(), 2);
+    }
+
+    function test_addCandidates_length_mismatch() public {
+        string[] memory names = new string[](2);
+        string[] memory imageCIDs = new string[](1);
+
+        vm.expectRevert("Jumlah nama dan imageCID tidak sama");
+        pemilu.addCandidates(names, imageCIDs);
+    }
+
+    function test_registerVoters_skips_duplicates() public {
+        address[] memory batch = new address[](3);
+        batch[0] = voter1;
+        batch[1] = voter2;
+        batch[2] = voter1;
+
+        pemilu.registerVoters(batch);
+
+        assertEq(pemilu.getTotalRegisteredVoters(), 2);
+        (bool isRegistered,,) = pemilu.getVoterDetails(voter2);
+        assertTrue(isRegistered);
+    }
+
+    function test_registerVoters_only_admin() public {
+        address[] memory batch = new address[](1);
+        batch[0] = voter2;
+
+        vm.prank(voter1);
+        vm.expectRevert("Not an admin");
+        pemilu.registerVoters(batch);
+    }
+
+    function test_getVotersPage() public {
+        address[] memory batch = new address[](3);
+        batch[0] = voter1;
+        batch[1] = voter2;
+        batch[2] = vm.addr(3);
+        pemilu.registerVoters(batch);
+
+        (address[] memory addresses,,,, uint nextOffset) = pemilu.getVotersPage(0, 2);
+        assertEq(addresses.length, 2);
+        assertEq(addresses[1], voter2);
+        assertEq(nextOffset, 2);
+
+        (addresses,,,, nextOffset) = pemilu.getVotersPage(nextOffset, 2);
+        assertEq(addresses.length, 1);
+        assertEq(addresses[0], vm.addr(3));
+        assertEq(nextOffset, 3);
+
+        (addresses,,,, nextOffset) = pemilu.getVotersPage(10, 2);
+        assertEq(addresses.length, 0);
+        assertEq(nextOffset, 3);
+    }
+
+    function _startVoting() internal returns (uint candidateId) {
+        pemilu.addCandidate("Candidate 1", "imageCID");
+        (uint[] memory ids,,,) = pemilu.getAllCandidates();
+        candidateId = ids[0];
+
+        uint startTime = block.timestamp + 1;
+        pemilu.setVotingPeriod(startTime, startTime + 100);
+        vm.warp(startTime + 1);
+    }
+
+    function _signBallot(uint privateKey, uint candidateId, uint deadline)
+        internal view returns (Pemilu.SignedBallot memory)
+    {
+        address voter = vm.addr(privateKey);
+        (uint8 v, bytes32 r, bytes32 s) = vm.sign(privateKey, pemilu.hashBallot(voter, candidateId, deadline));
+        return Pemilu.SignedBallot(voter, candidateId, deadline, abi.encodePacked(r, s, v));
+    }
+
+    function test_voteBatch_counts_signed_ballots() public {
+        uint candidateId = _startVoting();
+        address[] memory batch = new address[](2);
+        batch[0] = voter1;
+        batch[1] = voter2;
+        pemilu.registerVoters(batch);
+
+        Pemilu.SignedBallot[] memory ballots = new Pemilu.SignedBallot[](2);
+        ballots[0] = _signBallot(1, candidateId, block.timestamp + 60);
+        ballots[1] = _signBallot(2, candidateId, block.timestamp + 60);
+
+        // Relayer bukan pemilih: siapa pun boleh mengirim ballot yang sudah ditandatangani
+        vm.prank(vm.addr(9));
+        uint accepted = pemilu.voteBatch(ballots);
+
+        assertEq(accepted, 2);
+        (,, uint votes,) = pemilu.getCandidateDetails(candidateId);
+        assertEq(votes, 2);
+        (, bool hasVoted, uint voteCandidateId) = pemilu.getVoterDetails(voter2);
+        assertTrue(hasVoted);
+        assertEq(voteCandidateId, candidateId);
+    }
+
+    function test_voteBatch_skips_invalid_ballots() public {
+        uint candidateId = _startVoting();
+        address[] memory batch = new address[](3);
+        batch[0] = voter1;
+        batch[1] = voter2;
+        batch[2] = vm.addr(3);
+        pemilu.registerVoters(batch);
+
+        Pemilu.SignedBallot[] memory ballots = new Pemilu.SignedBallot[](6);
+        ballots[0] = _signBallot(1, candidateId, block.timestamp + 60);
+        ballots[1] = _signBallot(1, candidateId, block.timestamp + 60);   // duplikat
+        ballots[2] = _signBallot(2, candidateId, block.timestamp - 1);    // kedaluwarsa
+        ballots[3] = _signBallot(3, 12345, block.timestamp + 60);         // kandidat tidak ada
+        ballots[4] = _signBallot(4, candidateId, block.timestamp + 60);   // tidak terdaftar
+        ballots[5] = _signBallot(2, candidateId, block.timestamp + 60);
+        ballots[5].candidateId = candidateId + 1;                         // tanda tangan tidak cocok
+
+        vm.expectEmit(true, false, false, true);
+        emit BallotSkipped(voter1, Pemilu.BallotStatus.AlreadyVoted);
+        vm.expectEmit(true, false, false, true);
+        emit BallotSkipped(voter2, Pemilu.BallotStatus.Expired);
+        vm.expectEmit(true, false, false, true);
+        emit BallotSkipped(vm.addr(3), Pemilu.BallotStatus.InvalidCandidate);
+        vm.expectEmit(true, false, false, true);
+        emit BallotSkipped(vm.addr(4), Pemilu.BallotStatus.NotRegistered);
+        vm.expectEmit(true, false, false, true);
+        emit BallotSkipped(voter2, Pemilu.BallotStatus.InvalidSignature);
+        uint accepted = pemilu.voteBatch(ballots);
+
+        assertEq(accepted, 1);
+        (,, uint votes,) = pemilu.getCandidateDetails(candidateId);
+        assertEq(votes, 1);
+        (, bool hasVoted,) = pemilu.getVoterDetails(voter2);
+        assertFalse(hasVoted);
+    }
+
+    function test_voteBatch_outside_voting_period() public {
+        pemilu.addCandidate("Candidate 1", "imageCID");
+        Pemilu.SignedBallot[] memory ballots = new Pemilu.SignedBallot[](0);
+
+        vm.expectRevert("Waktu pemilihan belum diatur");
+        pemilu.voteBatch(ballots);
+    }
+
+    function _leaf(address voter) internal pure returns (bytes32) {
+        return keccak256(bytes.concat(keccak256(abi.encode(voter))));
+    }
+
+    function _hashPair(bytes32 a, bytes32 b) internal pure returns (bytes32) {
+        return a < b ? keccak256(abi.encodePacked(a, b)) : keccak256(abi.encodePacked(b, a));
+    }
+
+    // Pohon 3 pemilih: (voter1, voter2) lalu addr(3) naik satu tingkat tanpa pasangan
+    function _setAllowlist() internal returns (bytes32[] memory proof) {
+        bytes32 root = _hashPair(_hashPair(_leaf(voter1), _leaf(voter2)), _leaf(vm.addr(3)));
+        pemilu.setVoterMerkleRoot(root, 3);
+
+        proof = new bytes32[](2);
+        proof[0] = _leaf(voter2);
+        proof[1] = _leaf(vm.addr(3));
+    }
+
+    function test_voteWithProof_allowlisted_voter() public {
+        uint candidateId = _startVoting();
+        bytes32[] memory proof = _setAllowlist();
+
+        vm.prank(voter1);
+        pemilu.voteWithProof(candidateId, proof);
+
+        (,, uint votes,) = pemilu.getCandidateDetails(candidateId);
+        assertEq(votes, 1);
+        (bool isRegistered, bool hasVoted,) = pemilu.getVoterDetails(voter1);
+        assertTrue(isRegistered);
+        assertTrue(hasVoted);
+        assertEq(pemilu.voterAllowlistSize(), 3);
+
+        // Ikut terhitung di registeredVoters, seperti registerAsVoter()
+        assertEq(pemilu.getTotalRegisteredVoters(), 1);
+        (address[] memory addresses,,,, uint nextOffset) = pemilu.getVotersPage(0, 10);
+        assertEq(addresses.length, 1);
+        assertEq(addresses[0], voter1);
+        assertEq(nextOffset, 1);
+    }
+
+    function test_voteWithProof_rejects_invalid_proof() public {
+        uint candidateId = _startVoting();
+        bytes32[] memory proof = _setAllowlist();
+
+        vm.prank(voter2);
+        vm.expectRevert("Anda tidak terdaftar sebagai pemilih");
+        pemilu.voteWithProof(candidateId, proof);
+
+        vm.prank(vm.addr(4));
+        vm.expectRevert("Anda tidak terdaftar sebagai pemilih");
+        pemilu.voteWithProof(candidateId, proof);
+    }
+
+    function test_voteWithProof_double_vote() public {
+        uint candidateId = _startVoting();
+        bytes32[] memory proof = _setAllowlist();
+
+        vm.prank(voter1);
+        pemilu.voteWithProof(candidateId, proof);
+
+        vm.prank(voter1);
+        vm.expectRevert("Sudah memilih");
+        pemilu.voteWithProof(candidateId, proof);
+    }
+
+    function test_voteWithProof_rejects_removed_voter() public {
+        uint candidateId = _startVoting();
+        bytes32[] memory proof = _setAllowlist();
+
+        address[] memory addresses = new address[](1);
+        addresses[0] = voter1;
+        pemilu.registerVoters(addresses);
+        pemilu.removeVoter(voter1);
+        assertTrue(pemilu.removedVoters(voter1));
+
+        vm.prank(voter1);
+        vm.expectRevert("Pemilih telah dihapus");
+        pemilu.voteWithProof(candidateId, proof);
+    }
+
+    function test_setVoterMerkleRoot_only_admin() public {
+        vm.prank(voter1);
+        vm.expectRevert("Not an admin");
+        pemilu.setVoterMerkleRoot(bytes32(uint(1)), 1);
+    }
+
 }
 